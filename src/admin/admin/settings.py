@@ -17,6 +17,35 @@ from dotenv import load_dotenv
 load_dotenv()
 
 RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+# unacked messages delivered to each consumer and threads processing them;
+# keep the prefetch count above SMS_BATCH_SIZE or batches flush on time alone
+RABBITMQ_PREFETCH_COUNT = int(os.getenv("RABBITMQ_PREFETCH_COUNT", 100))
+CONSUMER_WORKER_THREADS = int(os.getenv("CONSUMER_WORKER_THREADS", 8))
+# failed notifications are retried after RETRY_BASE_DELAY * RETRY_BACKOFF_MULTIPLIER ** attempt
+# seconds, then dead-lettered once RETRY_MAX_ATTEMPTS retries are used up
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 5))
+RETRY_BACKOFF_MULTIPLIER = float(os.getenv("RETRY_BACKOFF_MULTIPLIER", 4))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 4))
+
+# notifications already sent are remembered per order_id in a local LRU and in Redis
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost")
+DEDUP_TTL = int(os.getenv("DEDUP_TTL", 7 * 24 * 3600))
+DEDUP_PENDING_TTL = int(os.getenv("DEDUP_PENDING_TTL", 300))
+DEDUP_LOCAL_MAXSIZE = int(os.getenv("DEDUP_LOCAL_MAXSIZE", 10000))
+
+# Africa's Talking SMS API
+AFRICASTALKING_USERNAME = os.getenv("AFRICASTALKING_USERNAME", "sandbox")
+AFRICASTALKING_API_KEY = os.getenv("AFRICASTALKING_API_KEY")
+# "africastalking", or "fake" to measure throughput offline without sending SMS
+SMS_PROVIDER = os.getenv("SMS_PROVIDER", "africastalking")
+SMS_FAKE_LATENCY = float(os.getenv("SMS_FAKE_LATENCY", 0.05))
+SMS_SENDER = os.getenv("SMS_SENDER", "TC4A")
+# identical texts are sent together once a batch is full or its oldest SMS waited this long
+SMS_BATCH_SIZE = int(os.getenv("SMS_BATCH_SIZE", 50))
+SMS_BATCH_MAX_WAIT = float(os.getenv("SMS_BATCH_MAX_WAIT", 0.5))
+# provider API calls per second, and the burst allowed above that rate
+SMS_RATE_LIMIT = float(os.getenv("SMS_RATE_LIMIT", 10))
+SMS_RATE_BURST = float(os.getenv("SMS_RATE_BURST", 10))
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -1,3 +1,5 @@
+import multiprocessing
+
 from django.core.management.base import BaseCommand
 from src.admin.app.consumer import start_rabbitmq_consumer
 
@@ -5,5 +7,33 @@ from src.admin.app.consumer import start_rabbitmq_consumer
 class Command(BaseCommand):
     help = 'Run RabbitMQ consumer to listen for order notifications'
 
-    def handle(self, *args, **kwargs):
-        start_rabbitmq_consumer()
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of consumer processes to run, one connection each')
+        parser.add_argument('--prefetch', type=int, default=None,
+                            help='Unacked messages delivered to each consumer (RABBITMQ_PREFETCH_COUNT)')
+        parser.add_argument('--threads', type=int, default=None,
+                            help='Worker threads per consumer process (CONSUMER_WORKER_THREADS)')
+
+    def handle(self, *args, **options):
+        consumer_options = dict(prefetch_count=options['prefetch'], worker_threads=options['threads'])
+        if options['workers'] <= 1:
+            start_rabbitmq_consumer(**consumer_options)
+            return
+
+        # scale out across cores: each process runs its own connection and worker pool
+        processes = [
+            multiprocessing.Process(target=start_rabbitmq_consumer, kwargs=consumer_options, name=f'consumer-{i}')
+            for i in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} consumer processes")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
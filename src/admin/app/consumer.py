@@ -1,64 +1,133 @@
 # src/admin/app/consumers.py
 
+import functools
 import pika
-import africastalking
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
 
-# Initialize Africa's Talking API
-africastalking.initialize(
-    username=settings.AFRICASTALKING_USERNAME,
-    api_key=settings.AFRICASTALKING_API_KEY
-)
+from .dedup import DUPLICATE, IN_FLIGHT, DedupStore
+from .sms import SMSDispatcher, TokenBucket, get_sms_provider
+from .topology import ORDER_QUEUE, declare_topology, dead_letter, retry_or_dead_letter
 
-sms = africastalking.SMS
 log = logging.getLogger(__name__)
 
+# orders whose notification was already sent, shared by all consumer processes
+dedup_store = DedupStore.from_settings()
 
-# Function to send SMS using Africa's Talking
-def send_sms(phone_number, message):
 
-    try:
-        response = sms.send(message, [phone_number], sender="TC4A")
-        log.info(f"SMS sent to {phone_number}: {response}")
-    except Exception as e:
-        log.error(f"Failed to send SMS: {e}")
-
-
-# RabbitMQ callback function
-def process_order(ch, method, properties, body):
-    """Callback function for processing order messages from RabbitMQ."""
-    try:
-        order_data = json.loads(body)
-        log.info(f"Received order: {order_data}")
+# Build the SMS for an order message; raises if the message is malformed
+def build_notification(body):
+    order_data = json.loads(body)
+    log.info(f"Received order: {order_data}")
 
-        # Prepare the SMS message
-        message = f"Hello! Your order for {order_data['item']} worth {order_data['amount']} has been placed successfully."  # noqa: E501
+    # Prepare the SMS message
+    message = f"Hello! Your order for {order_data['item']} worth {order_data['amount']} has been placed successfully."  # noqa: E501
+    return order_data.get("order_id"), order_data["phone_number"], message
 
-        # Send SMS to the customer
-        send_sms(order_data["+254723262333"], message)
 
+# Claim the order's notification; settles the delivery and returns False if it must not be sent again
+def _claim_notification(ch, method, properties, body, order_id):
+    if order_id is None:
+        return True
+    claim = dedup_store.claim(order_id)
+    if claim == DUPLICATE:
+        log.info(f"Notification for order {order_id} already sent, acking redelivery")
         ch.basic_ack(delivery_tag=method.delivery_tag)
+        return False
+    if claim == IN_FLIGHT:
+        retry_or_dead_letter(ch, method.delivery_tag, properties, body, f"order {order_id} notification in flight")
+        return False
+    return True
+
+
+def _record_notification(order_id, ok):
+    if order_id is None:
+        return
+    if ok:
+        dedup_store.confirm(order_id)
+    else:
+        dedup_store.release(order_id)
+
+
+# Runs on a dispatcher thread; acks and retries are handed back to the connection thread
+def _settle(connection, ch, method, properties, body, order_id, ok):
+    _record_notification(order_id, ok)
+    if ok:
+        settle = functools.partial(ch.basic_ack, delivery_tag=method.delivery_tag)
+    else:
+        settle = functools.partial(
+            retry_or_dead_letter, ch, method.delivery_tag, properties, body, "SMS not accepted by the provider"
+        )
+    connection.add_callback_threadsafe(settle)
+
+
+# RabbitMQ callback that queues the SMS on the dispatcher; the message is acked once its batch is sent
+def dispatch_order(ch, method, properties, body, connection, dispatcher):
+    try:
+        order_id, phone_number, message = build_notification(body)
     except Exception as e:
+        # a malformed message will never succeed, so it skips the retries
         log.error(f"Error processing order: {e}")
-        ch.basic_nack(delivery_tag=method.delivery_tag)
+        dead_letter(ch, method.delivery_tag, properties, body, e)
+        return
+    if not _claim_notification(ch, method, properties, body, order_id):
+        return
+    dispatcher.submit(
+        phone_number, message, functools.partial(_settle, connection, ch, method, properties, body, order_id)
+    )
 
 
 # Function to start consuming messages from RabbitMQ
-def start_rabbitmq_consumer():
-    """Connect to RabbitMQ and start consuming messages."""
+def start_rabbitmq_consumer(prefetch_count=None, worker_threads=None):
+    """
+    Connect to RabbitMQ and start consuming messages.
+
+    Up to `prefetch_count` unacked messages are delivered at a time. Their
+    SMS go through an SMSDispatcher, which groups identical texts into
+    multi-recipient provider calls under the provider's rate limit and sends
+    the batches on a pool of `worker_threads` threads. Failed messages are
+    retried with exponential backoff through delay queues and end up in the
+    dead-letter queue once their retries are used up.
+    """
+    prefetch_count = prefetch_count or settings.RABBITMQ_PREFETCH_COUNT
+    worker_threads = worker_threads or settings.CONSUMER_WORKER_THREADS
+
     connection_params = pika.URLParameters(settings.RABBITMQ_URL)
     connection = pika.BlockingConnection(connection_params)
     channel = connection.channel()
 
-    channel.queue_declare(queue='order_notifications_queue', durable=True)
+    declare_topology(channel)
+    channel.basic_qos(prefetch_count=prefetch_count)
+    # retries and dead letters are confirmed by the broker before the original is acked
+    channel.confirm_delivery()
+
+    executor = ThreadPoolExecutor(max_workers=worker_threads, thread_name_prefix="sms-sender")
+    dispatcher = SMSDispatcher(
+        get_sms_provider(),
+        max_batch_size=settings.SMS_BATCH_SIZE,
+        max_wait=settings.SMS_BATCH_MAX_WAIT,
+        rate_limiter=TokenBucket(settings.SMS_RATE_LIMIT, settings.SMS_RATE_BURST),
+        executor=executor,
+    )
+    dispatcher.start()
 
     # Start consuming messages from the queue
     channel.basic_consume(
-        queue='order_notifications_queue',
-        on_message_callback=process_order
+        queue=ORDER_QUEUE,
+        on_message_callback=functools.partial(dispatch_order, connection=connection, dispatcher=dispatcher)
     )
 
-    log.info("Started consuming messages from RabbitMQ")
-    channel.start_consuming()
+    log.info(f"Started consuming messages from RabbitMQ (prefetch={prefetch_count}, threads={worker_threads})")
+    try:
+        channel.start_consuming()
+    finally:
+        dispatcher.stop()
+        executor.shutdown(wait=True)
+        log.info(f"SMS dispatcher sent {dispatcher.sent} messages in {dispatcher.batches} batches, "
+                 f"{dispatcher.failed} failed; dedup {dedup_store.stats()}")
+        if connection.is_open:
+            # flush acks queued by batches that finished during shutdown
+            connection.process_data_events(time_limit=0)
+            connection.close()
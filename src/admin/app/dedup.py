@@ -0,0 +1,127 @@
+# src/admin/app/dedup.py
+
+import logging
+import threading
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+# results of DedupStore.claim
+CLAIMED = 'claimed'
+DUPLICATE = 'duplicate'
+IN_FLIGHT = 'in_flight'
+
+_PENDING = b'pending'
+_SENT = b'sent'
+
+
+class DedupStore:
+    """
+    Remembers which orders already had their notification sent.
+
+    A bounded in-process LRU answers repeated deliveries without a network
+    call; Redis SET NX with a TTL shares the record across consumer processes
+    and restarts. A claim is first recorded as pending with a short TTL, so an
+    order whose consumer died mid-send becomes claimable again once that TTL
+    runs out. When Redis is unavailable the store fails open: a duplicate SMS
+    is better than a missing one.
+    """
+
+    stats_key = 'notifications:dedup:stats'
+
+    def __init__(self, client, maxsize=10000, ttl=7 * 24 * 3600, pending_ttl=300, prefix='notified:order:'):
+        self.client = client
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.prefix = prefix
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.in_flight = 0
+        self.claims = 0
+        self._sent = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            redis.Redis.from_url(settings.REDIS_URL),
+            maxsize=settings.DEDUP_LOCAL_MAXSIZE,
+            ttl=settings.DEDUP_TTL,
+            pending_ttl=settings.DEDUP_PENDING_TTL,
+        )
+
+    def _remember(self, order_id):
+        with self._lock:
+            self._sent[order_id] = True
+            self._sent.move_to_end(order_id)
+            while len(self._sent) > self.maxsize:
+                self._sent.popitem(last=False)
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+        try:
+            self.client.hincrby(self.stats_key, field, 1)
+        except redis.RedisError:
+            pass
+
+    def claim(self, order_id):
+        """Claim the notification for `order_id`: CLAIMED, DUPLICATE or IN_FLIGHT."""
+        with self._lock:
+            if order_id in self._sent:
+                self._sent.move_to_end(order_id)
+                seen_locally = True
+            else:
+                seen_locally = False
+        if seen_locally:
+            self._count('local_hits')
+            return DUPLICATE
+
+        key = f'{self.prefix}{order_id}'
+        try:
+            if self.client.set(key, _PENDING, nx=True, ex=self.pending_ttl):
+                self._count('claims')
+                return CLAIMED
+            state = self.client.get(key)
+        except redis.RedisError as e:
+            log.warning(f"Dedup store unavailable, sending order {order_id} unchecked: {e}")
+            return CLAIMED
+
+        if state == _SENT:
+            self._remember(order_id)
+            self._count('redis_hits')
+            return DUPLICATE
+        if state is None:
+            # the pending claim expired between the two calls
+            return self.claim(order_id)
+        self._count('in_flight')
+        return IN_FLIGHT
+
+    # the notification was sent: remember it for the full TTL
+    def confirm(self, order_id):
+        self._remember(order_id)
+        try:
+            self.client.set(f'{self.prefix}{order_id}', _SENT, ex=self.ttl)
+        except redis.RedisError as e:
+            log.warning(f"Dedup store unavailable, order {order_id} not recorded: {e}")
+
+    # the notification failed: let the next delivery claim it again
+    def release(self, order_id):
+        try:
+            self.client.delete(f'{self.prefix}{order_id}')
+        except redis.RedisError as e:
+            log.warning(f"Dedup store unavailable, order {order_id} claim kept until it expires: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'local_hits': self.local_hits,
+                'redis_hits': self.redis_hits,
+                'hits': self.local_hits + self.redis_hits,
+                'in_flight': self.in_flight,
+                'claims': self.claims,
+            }
@@ -0,0 +1,48 @@
+import json
+
+import pika
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.topology import (
+    DEAD_LETTER_QUEUE, INSPECT_LIMIT, declare_topology, inspect_dead_letters, replay_dead_letters,
+)
+
+
+class Command(BaseCommand):
+    help = 'Inspect or replay failed order notifications from the dead-letter queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['inspect', 'replay'])
+        limit = parser.add_mutually_exclusive_group()
+        limit.add_argument('--limit', type=int, default=None,
+                           help=f'Maximum number of messages to inspect or replay (inspect default: {INSPECT_LIMIT})')
+        limit.add_argument('--all', action='store_true',
+                           help='Inspect or replay every message in the queue')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            limit = None
+        elif options['limit'] is not None:
+            limit = options['limit']
+        elif options['action'] == 'replay':
+            # a replay can't be taken back, so how much to replay must be spelled out
+            raise CommandError('replay needs --limit N or --all')
+        else:
+            limit = INSPECT_LIMIT
+
+        connection = pika.BlockingConnection(pika.URLParameters(settings.RABBITMQ_URL))
+        try:
+            channel = connection.channel()
+            declare_topology(channel)
+
+            if options['action'] == 'inspect':
+                messages = inspect_dead_letters(channel, limit=limit)
+                for message in messages:
+                    self.stdout.write(json.dumps(message))
+                self.stdout.write(f"{len(messages)} messages shown from {DEAD_LETTER_QUEUE}")
+            else:
+                replayed = replay_dead_letters(channel, limit=limit)
+                self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} messages from {DEAD_LETTER_QUEUE}"))
+        finally:
+            connection.close()
@@ -0,0 +1,183 @@
+# src/admin/app/sms.py
+
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+import africastalking
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+# Africa's Talking recipient status codes: Processed, Sent, Queued
+AFRICASTALKING_ACCEPTED = {100, 101, 102}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AfricasTalkingProvider:
+    """Sends one message to many recipients with a single Africa's Talking API call."""
+
+    def __init__(self, sender: str):
+        self.sender = sender
+
+    def send(self, message: str, recipients: list) -> dict:
+        response = africastalking.SMS.send(message, recipients, sender=self.sender)
+        log.info(f"SMS sent to {len(recipients)} recipients: {response}")
+        statuses = {
+            recipient["number"]: recipient["statusCode"] in AFRICASTALKING_ACCEPTED
+            for recipient in response["SMSMessageData"]["Recipients"]
+        }
+        # recipients the provider did not report on were part of an accepted request
+        return {number: statuses.get(number, True) for number in recipients}
+
+
+class FakeSMSProvider:
+    """Offline stand-in for the SMS API, used to measure consumer throughput without sending SMS."""
+
+    def __init__(self, latency: float = 0.05, fail_numbers: Optional[set] = None):
+        self.latency = latency
+        self.fail_numbers = fail_numbers or set()
+        self.calls = 0
+        self.recipients = 0
+        self._lock = threading.Lock()
+
+    def send(self, message: str, recipients: list) -> dict:
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.recipients += len(recipients)
+        return {number: number not in self.fail_numbers for number in recipients}
+
+
+# Build the provider selected by SMS_PROVIDER
+def get_sms_provider():
+    if settings.SMS_PROVIDER == "fake":
+        return FakeSMSProvider(latency=settings.SMS_FAKE_LATENCY)
+    africastalking.initialize(username=settings.AFRICASTALKING_USERNAME, api_key=settings.AFRICASTALKING_API_KEY)
+    return AfricasTalkingProvider(sender=settings.SMS_SENDER)
+
+
+class SMSDispatcher:
+    """
+    Groups SMS with identical text into multi-recipient provider calls.
+
+    A group is flushed once it holds `max_batch_size` recipients or its oldest
+    message has waited `max_wait` seconds. Each flush takes a token from the
+    rate limiter before calling the provider, and reports the per-recipient
+    result to the callback given to `submit`, so the caller can ack a message
+    only after its batch succeeded. Flushes run on `executor` when one is given.
+    """
+
+    def __init__(
+            self,
+            provider,
+            max_batch_size: int = 50,
+            max_wait: float = 0.5,
+            rate_limiter: Optional[TokenBucket] = None,
+            executor: Optional[Executor] = None,
+    ):
+        self.provider = provider
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.rate_limiter = rate_limiter
+        self.executor = executor
+        self.batches = 0
+        self.sent = 0
+        self.failed = 0
+        self._pending: dict = {}
+        self._first_queued: dict = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="sms-dispatcher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    # flush everything still queued and stop the dispatcher thread
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+
+    def submit(self, phone_number: str, message: str, on_done: Callable[[bool], None]) -> None:
+        with self._cond:
+            group = self._pending.setdefault(message, [])
+            if not group:
+                self._first_queued[message] = time.monotonic()
+            group.append((phone_number, on_done))
+            if len(group) >= self.max_batch_size:
+                self._cond.notify()
+
+    def _take_ready(self, now: float) -> list:
+        ready = []
+        for message, group in list(self._pending.items()):
+            if self._stopping or len(group) >= self.max_batch_size \
+                    or now - self._first_queued[message] >= self.max_wait:
+                del self._pending[message]
+                del self._first_queued[message]
+                for start in range(0, len(group), self.max_batch_size):
+                    ready.append((message, group[start:start + self.max_batch_size]))
+        return ready
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    ready = self._take_ready(now)
+                    if ready or self._stopping:
+                        break
+                    timeout = None
+                    if self._first_queued:
+                        timeout = min(self._first_queued.values()) + self.max_wait - now
+                    self._cond.wait(timeout)
+                stopping = self._stopping
+            for message, batch in ready:
+                if self.executor is not None:
+                    self.executor.submit(self._flush, message, batch)
+                else:
+                    self._flush(message, batch)
+            if stopping:
+                return
+
+    def _flush(self, message: str, batch: list) -> None:
+        recipients = [phone_number for phone_number, _ in batch]
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        try:
+            results = self.provider.send(message, recipients)
+        except Exception as e:
+            log.error(f"Failed to send SMS batch to {len(recipients)} recipients: {e}")
+            results = {}
+        outcomes = [(on_done, results.get(phone_number, False)) for phone_number, on_done in batch]
+        with self._cond:
+            self.batches += 1
+            self.sent += sum(1 for _, ok in outcomes if ok)
+            self.failed += sum(1 for _, ok in outcomes if not ok)
+        for on_done, ok in outcomes:
+            on_done(ok)
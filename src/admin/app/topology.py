@@ -0,0 +1,143 @@
+# src/admin/app/topology.py
+
+import logging
+
+import pika
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+ORDER_QUEUE = 'order_notifications_queue'
+RETRY_EXCHANGE = 'order_notifications.retry'
+DEAD_LETTER_EXCHANGE = 'order_notifications.dlx'
+DEAD_LETTER_QUEUE = 'order_notifications_queue.dead'
+
+RETRY_COUNT_HEADER = 'x-retry-count'
+LAST_ERROR_HEADER = 'x-last-error'
+
+# Messages inspected when no limit is given; inspect holds every fetched message in memory
+INSPECT_LIMIT = 50
+
+
+# Delay before each retry in milliseconds, growing exponentially
+def retry_delays_ms():
+    return [
+        int(settings.RETRY_BASE_DELAY * settings.RETRY_BACKOFF_MULTIPLIER ** attempt * 1000)
+        for attempt in range(settings.RETRY_MAX_ATTEMPTS)
+    ]
+
+
+def retry_queue_name(delay_ms):
+    return f'{ORDER_QUEUE}.retry.{delay_ms}ms'
+
+
+def declare_topology(channel):
+    """
+    Declare the order queue with its retry tiers and dead-letter queue.
+
+    Each retry tier is a queue without consumers whose message TTL is the tier's
+    delay; expired messages are dead-lettered back onto the order queue. One
+    queue per tier keeps a long delay from holding up messages behind it.
+    """
+    channel.queue_declare(queue=ORDER_QUEUE, durable=True)
+
+    channel.exchange_declare(exchange=RETRY_EXCHANGE, exchange_type='direct', durable=True)
+    for delay_ms in retry_delays_ms():
+        name = retry_queue_name(delay_ms)
+        channel.queue_declare(queue=name, durable=True, arguments={
+            'x-message-ttl': delay_ms,
+            'x-dead-letter-exchange': '',
+            'x-dead-letter-routing-key': ORDER_QUEUE,
+        })
+        channel.queue_bind(queue=name, exchange=RETRY_EXCHANGE, routing_key=name)
+
+    channel.exchange_declare(exchange=DEAD_LETTER_EXCHANGE, exchange_type='fanout', durable=True)
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+    channel.queue_bind(queue=DEAD_LETTER_QUEUE, exchange=DEAD_LETTER_EXCHANGE)
+
+
+def _republish(ch, exchange, routing_key, properties, body, headers):
+    ch.basic_publish(
+        exchange=exchange,
+        routing_key=routing_key,
+        body=body,
+        properties=pika.BasicProperties(
+            delivery_mode=2,
+            content_type=getattr(properties, 'content_type', None),
+            headers=headers,
+        )
+    )
+
+
+def dead_letter(ch, delivery_tag, properties, body, reason):
+    """Move a message to the dead-letter queue and ack the original."""
+    headers = dict(getattr(properties, 'headers', None) or {})
+    headers[LAST_ERROR_HEADER] = str(reason)[:255]
+    try:
+        _republish(ch, DEAD_LETTER_EXCHANGE, '', properties, body, headers)
+    except Exception as e:
+        log.error(f"Failed to dead-letter message: {e}")
+        ch.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        return
+    log.warning(f"Dead-lettered order message after {headers.get(RETRY_COUNT_HEADER, 0)} retries: {reason}")
+    ch.basic_ack(delivery_tag=delivery_tag)
+
+
+def retry_or_dead_letter(ch, delivery_tag, properties, body, reason):
+    """
+    Schedule a failed message for a delayed retry, or dead-letter it once
+    RETRY_MAX_ATTEMPTS retries are used up. The attempt count travels in the
+    message headers; the original delivery is acked once the copy is published.
+    """
+    headers = dict(getattr(properties, 'headers', None) or {})
+    attempts = int(headers.get(RETRY_COUNT_HEADER, 0))
+    delays = retry_delays_ms()
+    if attempts >= len(delays):
+        dead_letter(ch, delivery_tag, properties, body, reason)
+        return
+
+    headers[RETRY_COUNT_HEADER] = attempts + 1
+    headers[LAST_ERROR_HEADER] = str(reason)[:255]
+    try:
+        _republish(ch, RETRY_EXCHANGE, retry_queue_name(delays[attempts]), properties, body, headers)
+    except Exception as e:
+        log.error(f"Failed to schedule retry: {e}")
+        ch.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        return
+    log.info(f"Retrying order message in {delays[attempts]}ms (attempt {attempts + 1}): {reason}")
+    ch.basic_ack(delivery_tag=delivery_tag)
+
+
+# Dead-lettered messages, left in the queue; limit=None fetches all of them
+def inspect_dead_letters(channel, limit=INSPECT_LIMIT):
+    messages = []
+    while limit is None or len(messages) < limit:
+        method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+        if method is None:
+            break
+        messages.append({
+            'body': body.decode('utf-8', errors='replace'),
+            'retries': (properties.headers or {}).get(RETRY_COUNT_HEADER, 0),
+            'last_error': (properties.headers or {}).get(LAST_ERROR_HEADER),
+        })
+    # hand every fetched message back to the queue
+    if messages:
+        channel.basic_nack(delivery_tag=0, multiple=True, requeue=True)
+    return messages
+
+
+# Move dead-lettered messages back onto the order queue with a fresh retry budget; limit=None replays all
+def replay_dead_letters(channel, limit):
+    channel.confirm_delivery()
+    replayed = 0
+    while limit is None or replayed < limit:
+        method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+        if method is None:
+            break
+        headers = dict(properties.headers or {})
+        headers.pop(RETRY_COUNT_HEADER, None)
+        headers['x-replayed'] = int(headers.get('x-replayed', 0)) + 1
+        _republish(channel, '', ORDER_QUEUE, properties, body, headers)
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+    return replayed
@@ -1,14 +1,53 @@
-from unittest.mock import patch
-from src.admin.app.consumer import process_order
+from unittest.mock import MagicMock, patch
+from src.admin.app.consumer import dispatch_order
 
 
-@patch('app.consumers.send_sms')
-def test_process_order(mock_send_sms):
-    ch = None
-    method = type('obj', (object,), {'delivery_tag': 1})
-    properties = None
+def test_dispatch_order_acks_on_connection_thread_after_batch():
+    connection = MagicMock()
+    ch = MagicMock()
+    dispatcher = MagicMock()
+    method = type('obj', (object,), {'delivery_tag': 7})
     body = b'{"phone_number": "+254723262333", "item": "Laptop", "amount": 1000}'
 
-    process_order(ch, method, properties, body)
+    dispatch_order(ch, method, None, body, connection=connection, dispatcher=dispatcher)
 
-    mock_send_sms.assert_called_once_with("+254723262333", "Hello! Your order for Laptop worth 1000 has been placed successfully.")  # noqa: E501
+    phone_number, message, on_done = dispatcher.submit.call_args.args
+    assert phone_number == "+254723262333"
+    assert message == "Hello! Your order for Laptop worth 1000 has been placed successfully."
+
+    # the batch result is only scheduled from the sender thread; it runs when the connection thread calls it
+    on_done(True)
+    ch.basic_ack.assert_not_called()
+    connection.add_callback_threadsafe.call_args.args[0]()
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
+
+
+def test_dispatch_order_retries_failed_batch():
+    connection = MagicMock()
+    ch = MagicMock()
+    dispatcher = MagicMock()
+    method = type('obj', (object,), {'delivery_tag': 8})
+    body = b'{"phone_number": "+254723262333", "item": "Laptop", "amount": 1000}'
+
+    dispatch_order(ch, method, None, body, connection=connection, dispatcher=dispatcher)
+    dispatcher.submit.call_args.args[2](False)
+
+    connection.add_callback_threadsafe.call_args.args[0]()
+    ch.basic_nack.assert_not_called()
+    assert ch.basic_publish.call_args.kwargs["exchange"] == "order_notifications.retry"
+    ch.basic_ack.assert_called_once_with(delivery_tag=8)
+
+
+@patch('src.admin.app.consumer.dedup_store')
+def test_dispatch_order_acks_already_notified_order(mock_dedup_store):
+    mock_dedup_store.claim.return_value = "duplicate"
+    ch = MagicMock()
+    dispatcher = MagicMock()
+    method = type('obj', (object,), {'delivery_tag': 9})
+    body = b'{"order_id": 5, "phone_number": "+254723262333", "item": "Laptop", "amount": 1000}'
+
+    dispatch_order(ch, method, None, body, connection=MagicMock(), dispatcher=dispatcher)
+
+    mock_dedup_store.claim.assert_called_once_with(5)
+    dispatcher.submit.assert_not_called()
+    ch.basic_ack.assert_called_once_with(delivery_tag=9)
@@ -0,0 +1,74 @@
+import redis
+
+from src.admin.app.dedup import CLAIMED, DUPLICATE, IN_FLIGHT, DedupStore
+
+
+# In-memory stand-in for the subset of redis.Redis used by the dedup store
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.calls = 0
+
+    def set(self, key, value, nx=False, ex=None):
+        self.calls += 1
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def get(self, key):
+        self.calls += 1
+        return self.store.get(key)
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+    def hincrby(self, key, field, amount):
+        pass
+
+
+class BrokenRedis(FakeRedis):
+    def set(self, key, value, nx=False, ex=None):
+        raise redis.ConnectionError("redis down")
+
+
+def test_redelivered_order_is_a_duplicate_after_confirm():
+    store = DedupStore(FakeRedis())
+    assert store.claim(10) == CLAIMED
+    store.confirm(10)
+    assert store.claim(10) == DUPLICATE
+    assert store.stats()["local_hits"] == 1
+
+
+def test_other_process_sees_sent_order_through_redis():
+    client = FakeRedis()
+    first, second = DedupStore(client), DedupStore(client)
+    assert first.claim(11) == CLAIMED
+    assert second.claim(11) == IN_FLIGHT
+    first.confirm(11)
+    assert second.claim(11) == DUPLICATE
+    assert second.stats() == {"local_hits": 0, "redis_hits": 1, "hits": 1, "in_flight": 1, "claims": 0}
+
+
+def test_released_claim_can_be_claimed_again():
+    store = DedupStore(FakeRedis())
+    assert store.claim(12) == CLAIMED
+    store.release(12)
+    assert store.claim(12) == CLAIMED
+
+
+def test_local_lru_answers_without_redis_and_stays_bounded():
+    client = FakeRedis()
+    store = DedupStore(client, maxsize=2)
+    for order_id in (1, 2, 3):
+        store.claim(order_id)
+        store.confirm(order_id)
+    calls = client.calls
+    assert store.claim(3) == DUPLICATE
+    assert client.calls == calls
+    assert len(store._sent) == 2
+
+
+def test_store_fails_open_without_redis():
+    store = DedupStore(BrokenRedis())
+    assert store.claim(13) == CLAIMED
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from src.admin.app.sms import FakeSMSProvider, SMSDispatcher, TokenBucket
+
+
+def test_dispatcher_groups_identical_messages():
+    provider = FakeSMSProvider(latency=0)
+    results = {}
+    done = threading.Event()
+
+    def on_done(phone_number):
+        def callback(ok):
+            results[phone_number] = ok
+            if len(results) == 4:
+                done.set()
+        return callback
+
+    dispatcher = SMSDispatcher(provider, max_batch_size=3, max_wait=0.05)
+    dispatcher.start()
+    for phone_number in ["+2541", "+2542", "+2543"]:
+        dispatcher.submit(phone_number, "order placed", on_done(phone_number))
+    dispatcher.submit("+2544", "other order placed", on_done("+2544"))
+
+    assert done.wait(2)
+    dispatcher.stop()
+
+    # a full batch of three and a lone message flushed on time
+    assert provider.calls == 2
+    assert provider.recipients == 4
+    assert all(results.values())
+
+
+def test_dispatcher_reports_failed_recipients():
+    provider = FakeSMSProvider(latency=0, fail_numbers={"+2542"})
+    results = {}
+
+    dispatcher = SMSDispatcher(provider, max_batch_size=10, max_wait=10)
+    dispatcher.start()
+    for phone_number in ["+2541", "+2542"]:
+        dispatcher.submit(phone_number, "order placed", lambda ok, p=phone_number: results.__setitem__(p, ok))
+    dispatcher.stop()
+
+    assert results == {"+2541": True, "+2542": False}
+    assert dispatcher.sent == 1
+    assert dispatcher.failed == 1
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.04
@@ -1,13 +1,31 @@
 from unittest.mock import patch
-from src.admin.app.consumer import send_sms
+from src.admin.app.sms import AfricasTalkingProvider, SMSDispatcher
 
 
-@patch('app.consumers.sms.send')
-def test_send_sms(mock_send):
-    phone_number = "+254723262333"
+@patch('src.admin.app.sms.africastalking.SMS')
+def test_send_sms(mock_sms):
+    mock_sms.send.return_value = {"SMSMessageData": {"Recipients": [
+        {"number": "+254723262333", "statusCode": 101},
+        {"number": "+254723262334", "statusCode": 403},
+    ]}}
     message = "Your order has been placed!"
 
-    # Call the send_sms function
-    send_sms(phone_number, message)
+    results = AfricasTalkingProvider(sender="TC4A").send(message, ["+254723262333", "+254723262334"])
 
-    mock_send.assert_called_once_with(message, [phone_number], sender="TC4A")
+    mock_sms.send.assert_called_once_with(message, ["+254723262333", "+254723262334"], sender="TC4A")
+    assert results == {"+254723262333": True, "+254723262334": False}
+
+
+@patch('src.admin.app.sms.africastalking.SMS')
+def test_provider_error_is_reported_as_not_sent(mock_sms):
+    mock_sms.send.side_effect = Exception("provider down")
+    results = {}
+
+    dispatcher = SMSDispatcher(AfricasTalkingProvider(sender="TC4A"), max_batch_size=10, max_wait=10)
+    dispatcher.start()
+    dispatcher.submit("+254723262333", "order placed", lambda ok: results.__setitem__("+254723262333", ok))
+    dispatcher.stop()
+
+    # the consumer releases the order's dedup claim instead of recording it as sent
+    assert results == {"+254723262333": False}
+    assert dispatcher.failed == 1
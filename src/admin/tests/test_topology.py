@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock
+
+import pika
+
+from src.admin.app.topology import (
+    DEAD_LETTER_EXCHANGE, INSPECT_LIMIT, RETRY_COUNT_HEADER, RETRY_EXCHANGE, inspect_dead_letters, retry_delays_ms,
+    retry_or_dead_letter,
+)
+
+
+def test_retry_delays_grow_exponentially():
+    delays = retry_delays_ms()
+    assert delays == sorted(delays)
+    assert all(later == earlier * (delays[1] // delays[0]) for earlier, later in zip(delays, delays[1:]))
+
+
+def test_failed_message_is_scheduled_for_retry():
+    ch = MagicMock()
+    properties = pika.BasicProperties(headers={RETRY_COUNT_HEADER: 1})
+
+    retry_or_dead_letter(ch, 3, properties, b'{}', "provider down")
+
+    publish = ch.basic_publish.call_args.kwargs
+    assert publish["exchange"] == RETRY_EXCHANGE
+    assert publish["routing_key"].endswith(f".{retry_delays_ms()[1]}ms")
+    assert publish["properties"].headers[RETRY_COUNT_HEADER] == 2
+    ch.basic_ack.assert_called_once_with(delivery_tag=3)
+
+
+def test_message_is_dead_lettered_after_last_retry():
+    ch = MagicMock()
+    properties = pika.BasicProperties(headers={RETRY_COUNT_HEADER: len(retry_delays_ms())})
+
+    retry_or_dead_letter(ch, 4, properties, b'{}', "provider down")
+
+    assert ch.basic_publish.call_args.kwargs["exchange"] == DEAD_LETTER_EXCHANGE
+    ch.basic_ack.assert_called_once_with(delivery_tag=4)
+
+
+def test_message_is_requeued_when_retry_cannot_be_published():
+    ch = MagicMock()
+    ch.basic_publish.side_effect = pika.exceptions.UnroutableError([])
+
+    retry_or_dead_letter(ch, 5, None, b'{}', "provider down")
+
+    ch.basic_ack.assert_not_called()
+    ch.basic_nack.assert_called_once_with(delivery_tag=5, requeue=True)
+
+
+def test_inspect_stops_at_default_limit():
+    channel = MagicMock()
+    channel.basic_get.return_value = (MagicMock(), pika.BasicProperties(headers={}), b'{}')
+
+    messages = inspect_dead_letters(channel)
+
+    assert len(messages) == INSPECT_LIMIT
+    channel.basic_nack.assert_called_once_with(delivery_tag=0, multiple=True, requeue=True)
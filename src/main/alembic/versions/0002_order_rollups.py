@@ -0,0 +1,66 @@
+"""order rollup table, backfilled from existing orders
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all may already have made the table at app startup; rebuild it from orders then
+    if sa.inspect(op.get_bind()).has_table("order_rollups"):
+        op.execute("TRUNCATE order_rollups")
+        _backfill()
+        return
+
+    op.create_table(
+        "order_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("grain", sa.String(8), nullable=False),
+        sa.Column("dimension", sa.String(16), nullable=False),
+        sa.Column("key", sa.String(), nullable=False, server_default=""),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("order_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("revenue", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("created_by", sa.Integer(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_by", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_order_rollups_id", "order_rollups", ["id"])
+    op.create_index(
+        "ux_order_rollups_bucket", "order_rollups", ["grain", "dimension", "key", "bucket_start"], unique=True
+    )
+    op.create_index(
+        "ix_order_rollups_grain_dimension_bucket", "order_rollups", ["grain", "dimension", "bucket_start"]
+    )
+
+    _backfill()
+
+
+# every grain and dimension from the orders already stored
+def _backfill() -> None:
+    for grain in ("hour", "day"):
+        for dimension, key in (("total", "''"), ("customer", "customer_id::text"), ("item", "coalesce(item, '')")):
+            op.execute(
+                f"INSERT INTO order_rollups (grain, dimension, key, bucket_start, order_count, revenue) "
+                f"SELECT '{grain}', '{dimension}', {key}, date_trunc('{grain}', time AT TIME ZONE 'UTC') "
+                f"AT TIME ZONE 'UTC', count(*), coalesce(sum(amount), 0) "
+                f"FROM orders WHERE time IS NOT NULL GROUP BY 3, 4"
+            )
+
+
+def downgrade() -> None:
+    op.drop_table("order_rollups")
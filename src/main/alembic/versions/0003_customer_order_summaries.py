@@ -0,0 +1,46 @@
+"""per-customer order summary, backfilled from existing orders
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all may already have made the table at app startup; rebuild it from orders then
+    if sa.inspect(op.get_bind()).has_table("customer_order_summaries"):
+        op.execute("DELETE FROM customer_order_summaries")
+    else:
+        op.create_table(
+            "customer_order_summaries",
+            sa.Column(
+                "customer_id", sa.Integer(), sa.ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True
+            ),
+            sa.Column("order_count", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column("total_amount", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column("last_order_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+            sa.Column("created_by", sa.Integer(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_by", sa.Integer(), nullable=True),
+        )
+    op.execute(
+        "INSERT INTO customer_order_summaries (customer_id, order_count, total_amount, last_order_at) "
+        "SELECT customer_id, count(*), coalesce(sum(amount), 0), max(time) FROM orders GROUP BY customer_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("customer_order_summaries")
@@ -0,0 +1,107 @@
+"""partition orders by month on time
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:00:00.000000
+
+The existing table becomes the first partition, covering everything before
+the first month without rows, so no row is copied: a validated CHECK
+constraint lets ATTACH PARTITION skip its scan, and the parent's indexes
+adopt the matching indexes the table already has. Monthly partitions follow
+it; the app creates further ones ahead of time (orders/partitions.py).
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# the indexes of orders, recreated on the partitioned parent
+INDEXES = {
+    "ix_orders_id": "(id)",
+    "ix_orders_item": "(item)",
+    "ix_orders_amount": "(amount)",
+    "ix_orders_time": "(time)",
+    "ix_orders_phone_number": "(phone_number)",
+    "ix_orders_customer_id": "(customer_id)",
+    "ix_orders_time_id": "(time, id)",
+    "ix_orders_customer_id_time_id": "(customer_id, time, id)",
+    "ix_orders_item_trgm": "USING gin (item gin_trgm_ops)",
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # the partition key is part of the primary key, so it cannot be NULL
+    op.execute("UPDATE orders SET time = coalesce(created_at AT TIME ZONE 'UTC', now()) WHERE time IS NULL")
+    op.execute("ALTER TABLE orders ALTER COLUMN time SET NOT NULL")
+
+    # the legacy partition ends at the first month start after every existing row
+    boundary = bind.execute(sa.text(
+        "SELECT (date_trunc('month', greatest(max(time), now()) AT TIME ZONE 'UTC') + interval '1 month') "
+        "AT TIME ZONE 'UTC' FROM orders"
+    )).scalar().astimezone(timezone.utc)
+    bound = boundary.isoformat()
+
+    op.execute(f"ALTER TABLE orders ADD CONSTRAINT orders_legacy_range CHECK (time < '{bound}') NOT VALID")
+    op.execute("ALTER TABLE orders VALIDATE CONSTRAINT orders_legacy_range")
+    op.execute("ALTER TABLE orders DROP CONSTRAINT orders_pkey")
+    op.execute("ALTER TABLE orders ADD CONSTRAINT orders_legacy_pkey PRIMARY KEY (id, time)")
+
+    # free the index names for the parent
+    op.execute("ALTER TABLE orders RENAME TO orders_legacy")
+    for name in INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name.replace('ix_orders_', 'ix_orders_legacy_')}")
+
+    op.execute("CREATE TABLE orders (LIKE orders_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (time)")
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.execute(f"ALTER TABLE orders ATTACH PARTITION orders_legacy FOR VALUES FROM (MINVALUE) TO ('{bound}')")
+    op.execute("ALTER TABLE orders_legacy DROP CONSTRAINT orders_legacy_range")
+
+    # each attaches the partition's matching index instead of building a new one
+    op.execute("ALTER TABLE orders ADD CONSTRAINT orders_pkey PRIMARY KEY (id, time)")
+    op.execute("ALTER TABLE orders ADD CONSTRAINT orders_customer_id_fkey "
+               "FOREIGN KEY (customer_id) REFERENCES customers (id)")
+    for name, columns in INDEXES.items():
+        op.execute(f"CREATE INDEX {name} ON orders {columns}")
+
+    # rows outside every monthly partition land here instead of failing the insert
+    op.execute("CREATE TABLE orders_default PARTITION OF orders DEFAULT")
+
+    for month in range(MONTHS_AHEAD + 1):
+        start, end = _add_months(boundary, month), _add_months(boundary, month + 1)
+        op.execute(
+            f"CREATE TABLE orders_y{start.year:04d}m{start.month:02d} PARTITION OF orders "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def downgrade() -> None:
+    # fold every partition back into one plain table
+    op.execute("ALTER TABLE orders RENAME TO orders_partitioned")
+    op.execute("CREATE TABLE orders (LIKE orders_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO orders SELECT * FROM orders_partitioned")
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.execute("DROP TABLE orders_partitioned")
+    op.execute("ALTER TABLE orders ALTER COLUMN time DROP NOT NULL")
+    op.execute("ALTER TABLE orders ADD CONSTRAINT orders_pkey PRIMARY KEY (id)")
+    op.execute("ALTER TABLE orders ADD CONSTRAINT orders_customer_id_fkey "
+               "FOREIGN KEY (customer_id) REFERENCES customers (id)")
+    for name, columns in INDEXES.items():
+        op.execute(f"CREATE INDEX {name} ON orders {columns}")
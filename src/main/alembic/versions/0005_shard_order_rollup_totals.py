@@ -0,0 +1,52 @@
+"""spread the total order rollups over shard rows
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 17:00:00.000000
+
+Existing rows become shard 0; the app adds to random shards of the total
+buckets from now on and sums them when reading.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all may already have made the column at app startup
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("order_rollups")}
+    if "shard" not in columns:
+        op.add_column("order_rollups", sa.Column("shard", sa.SmallInteger(), nullable=False, server_default="0"))
+    op.drop_index("ux_order_rollups_bucket", table_name="order_rollups")
+    op.create_index(
+        "ux_order_rollups_bucket", "order_rollups", ["grain", "dimension", "key", "bucket_start", "shard"], unique=True
+    )
+
+
+def downgrade() -> None:
+    # one row per bucket again, re-aggregated over every shard; a bucket need not have a shard 0 row
+    op.execute(
+        "CREATE TEMPORARY TABLE order_rollups_merged AS "
+        "SELECT grain, dimension, key, bucket_start, sum(order_count) AS order_count, sum(revenue) AS revenue "
+        "FROM order_rollups GROUP BY grain, dimension, key, bucket_start"
+    )
+    op.execute("DELETE FROM order_rollups")
+    op.drop_index("ux_order_rollups_bucket", table_name="order_rollups")
+    op.drop_column("order_rollups", "shard")
+    op.create_index(
+        "ux_order_rollups_bucket", "order_rollups", ["grain", "dimension", "key", "bucket_start"], unique=True
+    )
+    op.execute(
+        "INSERT INTO order_rollups (grain, dimension, key, bucket_start, order_count, revenue) "
+        "SELECT grain, dimension, key, bucket_start, order_count, revenue FROM order_rollups_merged"
+    )
+    op.execute("DROP TABLE order_rollups_merged")
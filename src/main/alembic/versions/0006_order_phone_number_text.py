@@ -0,0 +1,41 @@
+"""store order phone numbers as text
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:00:00.000000
+
+Numbers such as "+254700000000" don't fit an integer column. Altering the
+partitioned parent alters every partition and rebuilds ix_orders_phone_number.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all may already have made the column as text at app startup
+    columns = {column["name"]: column["type"] for column in sa.inspect(op.get_bind()).get_columns("orders")}
+    if isinstance(columns["phone_number"], sa.String):
+        return
+    op.alter_column(
+        "orders", "phone_number", type_=sa.String(), existing_nullable=False,
+        postgresql_using="phone_number::text",
+    )
+
+
+def downgrade() -> None:
+    # back to a number, dropping the "+" and any separators (0 if nothing is left);
+    # bigint, as full international numbers overflow an integer
+    op.alter_column(
+        "orders", "phone_number", type_=sa.BigInteger(), existing_nullable=False,
+        postgresql_using="coalesce(nullif(regexp_replace(phone_number, '[^0-9]', '', 'g'), ''), '0')::bigint",
+    )
@@ -0,0 +1,123 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Generic, Iterable, Type, TypeVar, Union
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .model import OrderRollup
+from ..config import Settings, get_settings
+from ..database.base import Base
+
+settings: Settings = get_settings()
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+GRAINS = ("hour", "day")
+DIMENSIONS = ("total", "customer", "item")
+
+
+# start of the hour and of the day an order falls in, in UTC
+def bucket_starts(time: datetime) -> dict[str, datetime]:
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    hour = time.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return {"hour": hour, "day": hour.replace(hour=0)}
+
+
+class CRUDOrderRollup(Generic[ModelType]):
+    """
+    Order count and revenue per hour and per day, in total, per customer and per item.
+
+    Rollups are maintained incrementally in the transaction of the order write:
+    each created, changed or deleted order contributes a +1/-1 delta to the six
+    buckets it falls in, applied with a single INSERT ... ON CONFLICT DO UPDATE.
+
+    Every order write touches the total buckets of its hour and day, so those
+    are split over `total_shards` rows: each write adds to a random shard and
+    stats sum the shards back up. Customer and item buckets use shard 0 only.
+    """
+
+    def __init__(self, model: Type[ModelType], total_shards: int = 1) -> None:
+        self.model = model
+        self.total_shards = max(1, total_shards)
+
+    # the (grain, dimension, key, bucket) an order counts towards
+    @staticmethod
+    def buckets_of(order: Any) -> list[tuple[str, str, str, datetime]]:
+        if order.time is None:
+            return []
+        keys = {"total": "", "customer": str(order.customer_id), "item": order.item or ""}
+        starts = bucket_starts(order.time)
+        return [(grain, dimension, keys[dimension], starts[grain]) for grain in GRAINS for dimension in DIMENSIONS]
+
+    # net order count and revenue change per bucket, in a fixed order; total buckets go to `shard`
+    def deltas(self, changes: Iterable[tuple[Any, int]], shard: int = 0) -> list[dict[str, Any]]:
+        totals: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+        for order, sign in changes:
+            for bucket in self.buckets_of(order):
+                totals[bucket][0] += sign
+                totals[bucket][1] += sign * (order.amount or 0)
+        return [
+            {"grain": grain, "dimension": dimension, "key": key, "bucket_start": start,
+             "shard": shard if dimension == "total" else 0, "order_count": count, "revenue": revenue}
+            for (grain, dimension, key, start), (count, revenue) in sorted(totals.items())
+            if count or revenue
+        ]
+
+    async def apply(self, async_db: AsyncSession, changes: Iterable[tuple[Any, int]]) -> None:
+        """Add `sign` (+1 or -1) times each order to its buckets; orders are anything with the Order fields."""
+        # sorted rows keep concurrent writers from deadlocking on the same buckets
+        rows = self.deltas(changes, shard=random.randrange(self.total_shards))
+        if not rows:
+            return
+        query = insert(self.model).values(rows)
+        query = query.on_conflict_do_update(
+            index_elements=["grain", "dimension", "key", "bucket_start", "shard"],
+            set_={
+                "order_count": self.model.order_count + query.excluded.order_count,
+                "revenue": self.model.revenue + query.excluded.revenue,
+            },
+        )
+        await async_db.execute(query)
+
+    async def get_stats(
+            self,
+            async_db: AsyncSession,
+            *,
+            bucket: str = "day",
+            group_by: Union[str, None] = None,
+            start_date: Union[datetime, None] = None,
+            end_date: Union[datetime, None] = None,
+            key: Union[str, None] = None,
+            limit: int = 1000
+    ) -> list[dict[str, Any]]:
+        dimension = group_by or "total"
+        # sum() of bigint is numeric in Postgres
+        order_count = cast(func.sum(self.model.order_count), BigInteger)
+        query = select(
+            self.model.bucket_start,
+            self.model.key,
+            order_count.label("order_count"),
+            cast(func.sum(self.model.revenue), BigInteger).label("revenue"),
+        ).where(
+            self.model.grain == bucket,
+            self.model.dimension == dimension,
+        )
+        if start_date:
+            query = query.where(self.model.bucket_start >= start_date)
+        if end_date:
+            query = query.where(self.model.bucket_start < end_date)
+        if key is not None:
+            query = query.where(self.model.key == key)
+        query = query.group_by(self.model.bucket_start, self.model.key).having(order_count != 0)
+        query = query.order_by(self.model.bucket_start, self.model.key).limit(limit)
+        result = await async_db.execute(query)
+        return [
+            {**row, "key": row["key"] if group_by else None}
+            for row in result.mappings().all()
+        ]
+
+
+order_rollup = CRUDOrderRollup(OrderRollup, total_shards=settings.ORDERS_ROLLUP_TOTAL_SHARDS)
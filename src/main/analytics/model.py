@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Index, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database.base import Base
+
+
+class OrderRollup(Base):
+    __tablename__ = "order_rollups"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    grain: Mapped[str] = mapped_column(String(8))  # hour or day
+    dimension: Mapped[str] = mapped_column(String(16))  # total, customer or item
+    key: Mapped[str] = mapped_column(default="", server_default="")
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    shard: Mapped[int] = mapped_column(SmallInteger, default=0, server_default="0")  # only totals use more than 0
+    order_count: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    revenue: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+
+    # one row per bucket, group and shard; stats queries scan a (grain, dimension) range by time
+    __table_args__ = (
+        Index("ux_order_rollups_bucket", "grain", "dimension", "key", "bucket_start", "shard", unique=True),
+        Index("ix_order_rollups_grain_dimension_bucket", "grain", "dimension", "bucket_start"),
+    )
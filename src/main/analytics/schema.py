@@ -0,0 +1,13 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import Union
+
+
+# One bucket of order stats; key is the customer id or item when grouped
+class OrderStatsBucket(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bucket_start: datetime
+    key: Union[str, None] = None
+    order_count: int
+    revenue: int
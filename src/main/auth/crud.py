@@ -1,28 +1,35 @@
+import asyncio
+import logging
 from typing import Any, Union, Generic, Type, TypeVar
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from . import model as user_model, schema as user_schema
 from ..database.base import Base
+from ..database.session import async_session_local
 from .model import User
-from .jwt_security import verify_password, get_password_hash
+from .jwt_security import verify_password_async, get_password_hash_async, needs_rehash
+from .principal import principal_cache
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+log = logging.getLogger("uvicorn")
+
 
 class CRUDUser(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]) -> None:
         self.model = model
+        self._rehash_tasks: set[asyncio.Task] = set()
 
     async def create_user(
             self, async_db: AsyncSession, *, obj_in: Union[user_schema.UserCreate, dict[str, Any]]
     ) -> user_model.User:
         user_data = obj_in.model_dump(exclude_unset=True)
         if user_data.get("password"):
-            user_data["password"] = get_password_hash(user_data["password"])
+            user_data["password"] = await get_password_hash_async(user_data["password"])
 
         db_user = self.model(**user_data)
         async_db.add(db_user)
@@ -47,19 +54,45 @@ class CRUDUser(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
     # delete a user
     async def delete_user(self, async_db: AsyncSession, user_id: int) -> user_model.User:
-        user = await self.get_user(async_db, user_id)
-        if user:
-            await async_db.delete(user)
-            await async_db.commit()
-        return user
+        user_list = await self.get_user(async_db, user_id)
+        if user_list == []:
+            return None
+        await async_db.delete(user_list[0])
+        await async_db.commit()
+        principal_cache.invalidate_user(user_id)
+        return user_list[0]
 
     # authenticate a user
     async def authenticate(self, async_db: AsyncSession, *, email: str, password: str) -> Union[User | None]:
         user_list: list[User] = await self.get_user_by_email(async_db=async_db, email=email)
         if user_list == []:
             return None
-        if not verify_password(password, user_list[0].password):
-            return user_list[0]
+        if not await verify_password_async(password, user_list[0].password):
+            return None
+
+        # move hashes made at another cost to the current one, without delaying the login
+        if needs_rehash(user_list[0].password):
+            task = asyncio.create_task(self.rehash_password(user_list[0].id, user_list[0].password, password))
+            self._rehash_tasks.add(task)
+            task.add_done_callback(self._rehash_tasks.discard)
+        return user_list[0]
+
+    # replace a verified password's hash, unless the password changed in the meantime
+    async def rehash_password(self, user_id: int, old_hash: str, password: str) -> bool:
+        try:
+            new_hash = await get_password_hash_async(password)
+            async with async_session_local() as session:
+                result = await session.execute(
+                    update(self.model)
+                    .where(self.model.id == user_id, self.model.password == old_hash)
+                    .values(password=new_hash)
+                )
+                await session.commit()
+        except Exception as e:
+            log.warning(f"Failed to rehash password of user {user_id}: {e}")
+            return False
+        principal_cache.invalidate_user(user_id)
+        return result.rowcount == 1
 
 
 user = CRUDUser(User)
@@ -2,11 +2,11 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.main.config import Settings, get_settings
-from src.main.core.dependencies import get_session
-from . import crud, model, schema, jwt_security
+from src.main.database.session import async_session_local
+from . import crud, schema, jwt_security
+from .principal import principal_cache
 
 settings: Settings = get_settings()
 
@@ -15,9 +15,12 @@ reusable_oauth2 = OAuth2PasswordBearer(
 )
 
 
-async def get_current_user(
-    async_db: AsyncSession = Depends(get_session), token: str = Depends(reusable_oauth2)
-) -> model.User:
+async def get_current_user(token: str = Depends(reusable_oauth2)) -> schema.Principal:
+    # a token seen recently was already verified; its principal needs no decode or query
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -28,7 +31,12 @@ async def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user_list = await crud.user.get_users(async_db, id=token_data.sub)  # type: ignore
+    # a session of its own: the route's get_session context manager can only be entered once
+    async with async_session_local() as session:
+        user_list = await crud.user.get_user(session, user_id=token_data.sub)
     if user_list == []:
         raise HTTPException(status_code=404, detail="User not found")
-    return user_list[0]
\ No newline at end of file
+
+    principal = schema.Principal.model_validate(user_list[0])
+    principal_cache.set(token, principal, token_exp=payload.get("exp"))
+    return principal
\ No newline at end of file
@@ -1,14 +1,20 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, TypeVar, Union
 import bcrypt
 from fastapi import HTTPException
 from jose import jwt
 
 
 from ..config import Settings, get_settings
+from ..core.metrics import observe_password_hash, registry, stats_families
 
 settings: Settings = get_settings()
 
+T = TypeVar("T")
+
 
 # function to create access token
 def create_token(
@@ -36,10 +42,55 @@ def verify_token(token: str) -> Union[str, None]:
         raise HTTPException(status_code=400, detail="Invalid token")
 
 
+# bcrypt cost for new hashes; settled at startup by calibrate_bcrypt_rounds
+_bcrypt_rounds: int = settings.BCRYPT_ROUNDS or 12
+
+
+def get_bcrypt_rounds() -> int:
+    return _bcrypt_rounds
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    global _bcrypt_rounds
+    _bcrypt_rounds = rounds
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """
+    Pick the highest bcrypt cost whose hash time fits `target_ms` on this machine.
+
+    One hash is timed at `min_rounds`; each extra round doubles the work, so the
+    time of every higher cost follows from that single measurement. Never goes
+    below `min_rounds`, even on hardware too slow to meet the target.
+    """
+    started_at = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds=min_rounds))
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    return rounds
+
+
+# the cost a bcrypt hash was made with, read from its "$2b$<cost>$" prefix
+def hash_rounds(hashed_password: str) -> Union[int, None]:
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+# only upgrades: workers calibrate independently and may settle a round apart, so a hash is
+# rehashed when its cost is more than `tolerance` rounds below this worker's, never lowered
+def needs_rehash(hashed_password: str, tolerance: int = settings.BCRYPT_REHASH_TOLERANCE) -> bool:
+    rounds = hash_rounds(hashed_password)
+    return rounds is None or rounds < _bcrypt_rounds - tolerance
+
+
 # Hash a password using bcrypt
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: Union[int, None] = None) -> str:
     pwd_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or _bcrypt_rounds)
     hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
     return hashed_password.decode(encoding="utf-8")
 
@@ -52,3 +103,102 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         password=password_byte_enc, hashed_password=hashed_pass_byte_enc
     )
 
+
+class HashingStats:
+    """Queue time, run time and concurrency of the password hashing pool."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.waiting = 0
+        self.running = 0
+        self.queue_time_sum = 0.0
+        self.queue_time_max = 0.0
+        self.run_time_sum = 0.0
+        self.run_time_max = 0.0
+
+    def observe(self, queue_time: float, run_time: float) -> None:
+        self.calls += 1
+        self.queue_time_sum += queue_time
+        self.queue_time_max = max(self.queue_time_max, queue_time)
+        self.run_time_sum += run_time
+        self.run_time_max = max(self.run_time_max, run_time)
+
+    def as_dict(self) -> dict[str, Union[int, float]]:
+        return {
+            "calls": self.calls,
+            "waiting": self.waiting,
+            "running": self.running,
+            "queue_time_avg": self.queue_time_sum / self.calls if self.calls else 0.0,
+            "queue_time_max": self.queue_time_max,
+            "run_time_avg": self.run_time_sum / self.calls if self.calls else 0.0,
+            "run_time_max": self.run_time_max,
+        }
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL while it hashes, so threads give real parallelism
+    without the cost of pickling to worker processes. At most `max_workers`
+    hashes run at once; further callers wait on a semaphore rather than piling
+    up in the executor queue, and the time they waited is recorded in `stats`.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self.max_workers = max_workers
+        self.stats = HashingStats()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = asyncio.Semaphore(max_workers)
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        queued_at = time.perf_counter()
+        self.stats.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats.waiting -= 1
+        self.stats.running += 1
+        started_at = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.stats.running -= 1
+            run_time = time.perf_counter() - started_at
+            self.stats.observe(started_at - queued_at, run_time)
+            observe_password_hash(started_at - queued_at, run_time)
+            self._slots.release()
+
+    # settle the bcrypt cost for this process: BCRYPT_ROUNDS if set, otherwise measured
+    async def calibrate(self) -> int:
+        if settings.BCRYPT_ROUNDS:
+            rounds = settings.BCRYPT_ROUNDS
+        else:
+            rounds = await self._run(
+                calibrate_bcrypt_rounds,
+                settings.BCRYPT_TARGET_MS, settings.BCRYPT_MIN_ROUNDS, settings.BCRYPT_MAX_ROUNDS,
+            )
+        set_bcrypt_rounds(rounds)
+        return rounds
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
+registry.register_collector(lambda: stats_families(
+    "password_hashing", "bcrypt hashing pool", [({}, password_hasher.stats.as_dict())], counters=("calls",)
+))
+
+
+# Hash a password without blocking the event loop
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+# Check a password without blocking the event loop
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
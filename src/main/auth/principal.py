@@ -0,0 +1,76 @@
+import hashlib
+import time
+from typing import Union
+
+from src.main.config import Settings, get_settings
+from src.main.core.cache import CacheStats, LRUCache
+from . import schema
+
+settings: Settings = get_settings()
+
+
+class PrincipalCache:
+    """
+    Per-process cache of authenticated principals, keyed by a hash of the bearer token.
+
+    An entry holds a snapshot of the user the token resolved to and lives until
+    the earlier of `ttl` seconds and the token's own expiry, so a cached token is
+    never accepted after its `exp`. Entries are indexed by user id as well, so a
+    change to a user drops every token cached for them.
+    """
+
+    def __init__(self, ttl: int = 60, maxsize: int = 10000) -> None:
+        self.ttl = ttl
+        self.stats = CacheStats("principal")
+        self._entries = LRUCache(maxsize)
+        self._tokens_by_user: dict[int, set[str]] = {}
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Union[schema.Principal, None]:
+        key = self.key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.time():
+            self._drop(key, principal.id)
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return principal
+
+    def set(self, token: str, principal: schema.Principal, token_exp: Union[float, None] = None) -> None:
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = self.key(token)
+        self._entries.set(key, (expires_at, principal))
+        # keep the per-user index free of tokens the LRU already evicted
+        keys = {k for k in self._tokens_by_user.get(principal.id, ()) if k in self._entries}
+        keys.add(key)
+        self._tokens_by_user[principal.id] = keys
+
+    def _drop(self, key: str, user_id: int) -> None:
+        self._entries.pop(key)
+        keys = self._tokens_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tokens_by_user[user_id]
+
+    # forget every cached token of a user after the user changed
+    def invalidate_user(self, user_id: int) -> None:
+        for key in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(key)
+        self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+
+principal_cache = PrincipalCache(ttl=settings.AUTH_CACHE_TTL, maxsize=settings.AUTH_CACHE_MAXSIZE)
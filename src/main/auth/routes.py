@@ -54,6 +54,6 @@ async def login_for_access_token(async_db: AsyncSession = Depends(get_session),
 
 
 # Example route that requires authentication
-@router.get("/users/me", response_model=schema.User)
+@router.get("/users/me", response_model=schema.Principal)
 def read_users_me(current_user: model.User = Depends(dependencies.get_current_user)):
     return current_user
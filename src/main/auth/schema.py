@@ -45,6 +45,15 @@ class UserInDB(UserInDBBase):
     pass
 
 
+# the user a verified token resolves to, as cached per token: no password hash
+class Principal(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    email: str
+
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -0,0 +1,334 @@
+"""
+Throughput and latency of the main service's HTTP routes under concurrent load.
+
+Seeds customers, orders and users into the configured database. It then runs
+each scenario for a fixed duration with --concurrency clients. Requests go
+either straight to the ASGI app in this process (--transport asgi) or to a
+uvicorn server started in a subprocess (--transport uvicorn). In both cases
+the app runs with the local broker from http_app.py in place of RabbitMQ.
+
+For each scenario the JSON report gives throughput and p50/p95/p99 latency.
+Requests made during the warmup are not counted. --save-baseline stores the
+report. --compare diffs a run against a stored baseline and exits with status
+1 when a scenario's throughput dropped, or its p95 rose, by more than
+--tolerance.
+
+Seeded rows are tagged per run and left in place, so point --database-url at a
+scratch database.
+
+    python -m src.main.benchmarks.bench_http --database-url postgresql+asyncpg://.../bench \\
+        --transport uvicorn --duration 30 --concurrency 32 --save-baseline baseline.json
+    python -m src.main.benchmarks.bench_http --database-url ... --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import httpx
+
+SCENARIOS = ("login", "create_order", "list_orders", "date_search", "customer_list")
+COUNTRIES = ("KE", "UG", "TZ", "RW", "NG", "GH", "ZA", "ET")
+ITEMS = ("laptop", "phone", "charger", "monitor", "keyboard", "mouse", "headset", "camera")
+SEED_CHUNK = 5000
+
+
+class Dataset:
+    """What the scenarios need to know about the seeded rows."""
+
+    def __init__(self, customer_ids: list[int], credentials: list[tuple[str, str]], start: datetime, end: datetime):
+        self.customer_ids = customer_ids
+        self.credentials = credentials
+        self.start = start
+        self.end = end
+        self.auth_headers: dict[str, str] = {}
+        self.use_cache = True
+
+
+async def seed(customers: int, orders: int, users: int, bcrypt_rounds: int) -> Dataset:
+    # imported here: the settings and engine are built from the environment main() sets up
+    from sqlalchemy import insert
+    from src.main.auth.jwt_security import get_password_hash
+    from src.main.auth.model import User
+    from src.main.customer.model import Customer
+    from src.main.database.base import Base
+    from src.main.database.session import async_engine
+    from src.main.orders.model import Order
+
+    tag = uuid.uuid4().hex[:8]
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - timedelta(days=90)
+    rng = random.Random(tag)
+    hashed = get_password_hash("bench-password", bcrypt_rounds)
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        customer_ids = list((await conn.execute(
+            insert(Customer).returning(Customer.id),
+            [
+                {
+                    "name": f"Bench Customer {tag} {n}", "country": rng.choice(COUNTRIES),
+                    "email": f"customer-{tag}-{n}@bench.invalid", "phone_number": f"+{tag}{n}",
+                    "hashed_password": hashed,
+                }
+                for n in range(customers)
+            ],
+        )).scalars())
+        await conn.execute(insert(User), [
+            {"username": f"bench-{tag}-{n}", "email": f"user-{tag}-{n}@bench.invalid", "password": hashed}
+            for n in range(users)
+        ])
+        span = int((end - start).total_seconds())
+        for offset in range(0, orders, SEED_CHUNK):
+            await conn.execute(insert(Order), [
+                {
+                    "item": f"{rng.choice(ITEMS)} {rng.choice(ITEMS)} {n}", "amount": rng.randint(1, 5000),
+                    "time": start + timedelta(seconds=rng.randrange(span)), "phone_number": "254700000000",
+                    "customer_id": rng.choice(customer_ids),
+                }
+                for n in range(offset, min(offset + SEED_CHUNK, orders))
+            ])
+    credentials = [(f"user-{tag}-{n}@bench.invalid", "bench-password") for n in range(users)]
+    return Dataset(customer_ids, credentials, start, end)
+
+
+# each scenario turns a random generator and the dataset into (method, url, request options)
+def login(rng: random.Random, data: Dataset) -> tuple[str, str, dict]:
+    email, password = rng.choice(data.credentials)
+    return "POST", "/Token", {"data": {"username": email, "password": password}}
+
+
+def create_order(rng: random.Random, data: Dataset) -> tuple[str, str, dict]:
+    order = {
+        "item": f"{rng.choice(ITEMS)} {rng.choice(ITEMS)}", "amount": rng.randint(1, 5000),
+        "time": datetime.now(timezone.utc).isoformat(), "phone_number": "254700000000",
+        "customer_id": rng.choice(data.customer_ids),
+    }
+    return "POST", "/orders", {"json": order, "headers": data.auth_headers}
+
+
+def list_orders(rng: random.Random, data: Dataset) -> tuple[str, str, dict]:
+    params = {"customer_id": rng.choice(data.customer_ids), "limit": 50, "use_cache": data.use_cache}
+    return "GET", "/orders", {"params": params}
+
+
+def date_search(rng: random.Random, data: Dataset) -> tuple[str, str, dict]:
+    start = data.start + timedelta(seconds=rng.randrange(int((data.end - data.start).total_seconds())))
+    params = {"start_date": start.isoformat(), "end_date": (start + timedelta(days=7)).isoformat(), "limit": 100}
+    return "GET", "/orders/search", {"params": params}
+
+
+def customer_list(rng: random.Random, data: Dataset) -> tuple[str, str, dict]:
+    params = {"country": rng.choice(COUNTRIES), "limit": 50, "use_cache": data.use_cache}
+    return "GET", "/customer", {"params": params}
+
+
+SCENARIO_REQUESTS: dict[str, Callable[[random.Random, Dataset], tuple[str, str, dict]]] = {
+    "login": login,
+    "create_order": create_order,
+    "list_orders": list_orders,
+    "date_search": date_search,
+    "customer_list": customer_list,
+}
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+# throughput and latency of one scenario from its per-request latencies, in seconds
+def summarize(latencies: list[float], errors: int, duration: float) -> dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput": round(len(ordered) / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+async def run_scenario(
+        client: httpx.AsyncClient, name: str, data: Dataset, duration: float, warmup: float, concurrency: int
+) -> dict[str, Any]:
+    make_request = SCENARIO_REQUESTS[name]
+    latencies: list[float] = []
+    errors = 0
+    started_at = time.perf_counter()
+    measure_from = started_at + warmup
+    stop_at = measure_from + duration
+
+    async def worker(seed: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.perf_counter() < stop_at:
+            method, url, options = make_request(rng, data)
+            sent_at = time.perf_counter()
+            try:
+                response = await client.request(method, url, **options)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if sent_at < measure_from:
+                continue
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - sent_at)
+
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    return summarize(latencies, errors, duration)
+
+
+async def run_all(client: httpx.AsyncClient, data: Dataset, args: argparse.Namespace) -> dict[str, Any]:
+    email, password = data.credentials[0]
+    response = await client.post("/Token", data={"username": email, "password": password})
+    response.raise_for_status()
+    data.auth_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    results = {}
+    for name in args.scenarios:
+        results[name] = await run_scenario(client, name, data, args.duration, args.warmup, args.concurrency)
+        print(f"{name:>14}: {json.dumps(results[name])}", file=sys.stderr, flush=True)
+    return results
+
+
+async def run_in_process(data: Dataset, args: argparse.Namespace) -> dict[str, Any]:
+    from src.main.benchmarks.http_app import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_all(client, data, args)
+    finally:
+        await app.router.shutdown()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_over_socket(data: Dataset, args: argparse.Namespace) -> dict[str, Any]:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main.benchmarks.http_app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    await client.get("/metrics")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("uvicorn did not start")
+                    await asyncio.sleep(0.2)
+            return await run_all(client, data, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+# scenarios whose throughput dropped or p95 rose by more than `tolerance` against the baseline
+def compare(baseline: dict[str, Any], report: dict[str, Any], tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["throughput"] and result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']} -> {result['throughput']} req/s")
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to the service's SQLALCHEMY_DATABASE_URI")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the seeded and rehashed passwords")
+    parser.add_argument("--broker-latency", type=float, default=0.002, help="seconds before the local broker confirms")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the query caches on list routes")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH", help="baseline report to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    # the service reads these when it is imported, here and in the uvicorn subprocess
+    if args.database_url:
+        os.environ["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ["BENCH_BROKER_LATENCY"] = str(args.broker_latency)
+
+    async def run() -> dict[str, Any]:
+        data = await seed(args.customers, args.orders, args.users, args.bcrypt_rounds)
+        data.use_cache = not args.no_cache
+        runner = run_in_process if args.transport == "asgi" else run_over_socket
+        return await runner(data, args)
+
+    report = {
+        "transport": args.transport,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: getattr(args, key) for key in (
+                "workers", "customers", "orders", "users", "duration", "warmup", "concurrency",
+                "bcrypt_rounds", "broker_latency", "no_cache",
+            )
+        },
+        "scenarios": asyncio.run(run()),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"] or baseline.get("transport") != report["transport"]:
+            print("note: the baseline was recorded with different settings", file=sys.stderr)
+        regressions = compare(baseline, report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
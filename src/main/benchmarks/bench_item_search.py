@@ -0,0 +1,91 @@
+"""
+Latency of order item search against table size, with and without the trigram index.
+
+Seeds a scratch table shaped like orders.item in the configured database, then
+times the substring and prefix queries CRUDOrder issues at each size, first on
+a sequential scan and then with the pg_trgm GIN index. The scratch table is
+dropped afterwards; the orders table is not touched.
+
+    python -m src.main.benchmarks.bench_item_search --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.main.config import Settings, get_settings
+
+settings: Settings = get_settings()
+
+TABLE = "bench_order_items"
+WORDS = [
+    "laptop", "phone", "charger", "monitor", "keyboard", "mouse", "headset", "camera",
+    "printer", "router", "speaker", "tablet", "cable", "adapter", "battery", "stand",
+]
+QUERIES = {
+    "substring": ("item ILIKE :pattern", "%board%"),
+    "prefix": ("item ILIKE :pattern", "lapt%"),
+}
+
+
+async def seed(conn: AsyncConnection, size: int) -> None:
+    await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await conn.execute(text(f"CREATE TABLE {TABLE} (id bigserial PRIMARY KEY, item text)"))
+    # "<word> <word> <n>" gives a realistic spread of trigrams
+    words = "ARRAY[" + ", ".join(f"'{word}'" for word in WORDS) + "]"
+    await conn.execute(text(
+        f"INSERT INTO {TABLE} (item) "
+        f"SELECT ({words})[1 + (random() * {len(WORDS) - 1})::int] || ' ' || "
+        f"({words})[1 + (random() * {len(WORDS) - 1})::int] || ' ' || n "
+        f"FROM generate_series(1, {size}) AS n"
+    ))
+    await conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+async def time_query(conn: AsyncConnection, where: str, pattern: str, repeat: int) -> float:
+    query = text(
+        f"SELECT id, item, similarity(item, :q) AS rank FROM {TABLE} WHERE {where} "
+        f"ORDER BY rank DESC, id LIMIT 20"
+    )
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await conn.execute(query, {"pattern": pattern, "q": pattern.strip("%")})
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(timings)
+
+
+async def run(sizes: list[int], repeat: int) -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, isolation_level="AUTOCOMMIT")
+    print(f"{'rows':>10} {'query':>10} {'seq scan ms':>12} {'trigram ms':>11}")
+    async with engine.connect() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        try:
+            for size in sizes:
+                await seed(conn, size)
+                scan = {name: await time_query(conn, *query, repeat) for name, query in QUERIES.items()}
+                await conn.execute(text(
+                    f"CREATE INDEX {TABLE}_trgm ON {TABLE} USING gin (item gin_trgm_ops)"
+                ))
+                await conn.execute(text(f"ANALYZE {TABLE}"))
+                for name, query in QUERIES.items():
+                    indexed = await time_query(conn, *query, repeat)
+                    print(f"{size:>10} {name:>10} {scan[name]:>12.2f} {indexed:>11.2f}")
+        finally:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query; the median is reported")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Date-range query latency on a monthly partitioned orders table versus a plain one.
+
+Seeds two scratch tables shaped like orders with the same rows spread over
+--months months: one plain, one partitioned by month on time as revision 0004
+does to orders. For a one-day, one-week and one-month range it reports the
+median latency of the get_orders_by_date_range query and how many partitions
+the plan touched, read from EXPLAIN (ANALYZE, FORMAT JSON). The scratch tables
+are dropped afterwards.
+
+    python -m src.main.benchmarks.bench_partition_pruning --rows 5000000 --months 24
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.main.config import Settings, get_settings
+from src.main.orders.partitions import add_months
+
+settings: Settings = get_settings()
+
+PLAIN = "bench_orders_plain"
+PARTITIONED = "bench_orders_partitioned"
+COLUMNS = "id bigint NOT NULL, item text, amount integer, time timestamptz NOT NULL, customer_id integer"
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+async def seed(conn: AsyncConnection, rows: int, months: int) -> None:
+    end = add_months(START, months)
+    await conn.execute(text(f"DROP TABLE IF EXISTS {PLAIN}, {PARTITIONED}"))
+    await conn.execute(text(f"CREATE TABLE {PLAIN} ({COLUMNS}, PRIMARY KEY (id))"))
+    await conn.execute(text(
+        f"CREATE TABLE {PARTITIONED} ({COLUMNS}, PRIMARY KEY (id, time)) PARTITION BY RANGE (time)"
+    ))
+    for month in range(months):
+        start = add_months(START, month)
+        await conn.execute(text(
+            f"CREATE TABLE {PARTITIONED}_{month} PARTITION OF {PARTITIONED} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{add_months(start, 1).isoformat()}')"
+        ))
+    seconds = int((end - START).total_seconds())
+    await conn.execute(text(
+        f"INSERT INTO {PLAIN} SELECT n, 'item ' || (n % 1000), (n % 5000) + 1, "
+        f"TIMESTAMPTZ '{START.isoformat()}' + make_interval(secs => (random() * {seconds - 1})::bigint), n % 10000 "
+        f"FROM generate_series(1, {rows}) AS n"
+    ))
+    await conn.execute(text(f"INSERT INTO {PARTITIONED} SELECT * FROM {PLAIN}"))
+    for table in (PLAIN, PARTITIONED):
+        await conn.execute(text(f"CREATE INDEX ON {table} (time, id)"))
+        await conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+
+def _scanned_relations(plan: dict) -> set[str]:
+    relations = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        relations |= _scanned_relations(child)
+    return relations
+
+
+async def measure(conn: AsyncConnection, table: str, start: datetime, end: datetime, repeat: int) -> tuple:
+    query = (
+        f"SELECT * FROM {table} WHERE time BETWEEN :start AND :end ORDER BY time, id LIMIT 100"
+    )
+    params = {"start": start, "end": end}
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await conn.execute(text(query), params)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    plan = (await conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), params)).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    return statistics.median(timings), len(_scanned_relations(plan[0]["Plan"]))
+
+
+async def run(rows: int, months: int, repeat: int) -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, isolation_level="AUTOCOMMIT")
+    middle = add_months(START, months // 2)
+    ranges = {
+        "1 day": (middle, middle + timedelta(days=1)),
+        "1 week": (middle, middle + timedelta(weeks=1)),
+        "1 month": (middle, add_months(middle, 1)),
+    }
+    async with engine.connect() as conn:
+        try:
+            await seed(conn, rows, months)
+            print(f"{rows} rows over {months} months")
+            print(f"{'range':>8} {'plain ms':>9} {'partitioned ms':>15} {'partitions scanned':>19}")
+            for label, (start, end) in ranges.items():
+                plain_ms, _ = await measure(conn, PLAIN, start, end, repeat)
+                partitioned_ms, scanned = await measure(conn, PARTITIONED, start, end, repeat)
+                print(f"{label:>8} {plain_ms:>9.2f} {partitioned_ms:>15.2f} {scanned:>12} of {months}")
+        finally:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {PLAIN}, {PARTITIONED}"))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query; the median is reported")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.months, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+The main service app with a local stand-in for RabbitMQ, for the HTTP benchmarks.
+
+The order event publisher gets in-process channels whose exchange confirms
+every publish after BENCH_BROKER_LATENCY seconds, so the outbox relay and the
+publisher run their real code without a broker. SMS are sent by the admin
+service from the queue this broker would feed; it is not part of these
+benchmarks, so no SMS provider is called. Postgres is still required, and
+Redis is used if it is reachable (the caches fall back to the database if not).
+
+    uvicorn src.main.benchmarks.http_app:app
+"""
+import asyncio
+import os
+
+from src.main.core.rabbitmq import OrderEventPublisher, publisher
+
+
+class LocalExchange:
+    """Default exchange of a stand-in channel: confirms each message after a fixed delay."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.published = 0
+
+    async def publish(self, message, routing_key: str) -> None:
+        await asyncio.sleep(self.latency)
+        self.published += 1
+
+
+class LocalChannel:
+    def __init__(self, latency: float) -> None:
+        self.default_exchange = LocalExchange(latency)
+
+    async def close(self) -> None:
+        pass
+
+
+# a publisher with channels already in place treats itself as started and never connects
+def install_local_broker(event_publisher: OrderEventPublisher, latency: float) -> None:
+    event_publisher.channels = [LocalChannel(latency) for _ in range(event_publisher.pool_size)]
+
+
+install_local_broker(publisher, float(os.getenv("BENCH_BROKER_LATENCY", 0.002)))
+
+from src.main.main import app  # noqa: E402
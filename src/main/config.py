@@ -19,7 +19,30 @@ class Settings(BaseSettings):
     API_V1_STR: str = ""
 
     RABBITMQ_URL: str = os.getenv("RABBITMQ_URL")
-
+    RABBITMQ_CHANNEL_POOL_SIZE: int = 4
+    RABBITMQ_MAX_IN_FLIGHT: int = 1000
+    RABBITMQ_BACKPRESSURE_TIMEOUT: float = 5.0
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_RETENTION_HOURS: int = 24
+
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost")
+    ORDERS_CACHE_TTL: int = 60
+    ORDERS_BULK_CHUNK_SIZE: int = 500
+    ORDERS_BULK_MAX_ITEMS: int = 5000
+    ORDERS_EXPORT_BATCH_SIZE: int = 1000
+    ORDERS_PARTITION_MONTHS_AHEAD: int = 3
+    # rows each hourly and daily total rollup is spread over, so concurrent order writes don't queue on one row
+    ORDERS_ROLLUP_TOTAL_SHARDS: int = 8
+    CUSTOMER_CACHE_TTL: int = 60
+    CUSTOMER_CACHE_STALE_TTL: int = 300
+    CUSTOMER_IMPORT_BATCH_SIZE: int = 5000
+    CUSTOMER_IMPORT_HASH_WORKERS: Union[int, None] = None
+    CUSTOMER_IMPORT_MAX_ERRORS: int = 100
+    # seconds the status of an import started over HTTP stays available
+    CUSTOMER_IMPORT_JOB_TTL: int = 86400
+    LOCAL_CACHE_TTL: int = 5
+    LOCAL_CACHE_MAXSIZE: int = 1024
 
     # Use this to periodically generate secret at a python cli
     # SECRET_KEY = secret_key_generator.generate(len_of_secret_key=64, file_name=".secret.txt")
@@ -57,10 +80,43 @@ class Settings(BaseSettings):
         print(f"connection url: {conn_url}")
         return str(conn_url)
 
+    # a streaming replica for read-only routes; a replica lagging more than REPLICA_MAX_LAG
+    # seconds is skipped, and a client reads from the primary for READ_YOUR_WRITES_WINDOW
+    # seconds after each of its writes
+    SQLALCHEMY_REPLICA_URI: Union[str, None] = None
+    REPLICA_MAX_LAG: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL: float = 2.0
+    REPLICA_LAG_CHECK_TIMEOUT: float = 1.0
+    READ_YOUR_WRITES_WINDOW: float = 10.0
+
+    # development only: record every statement per request and flag repeats, N+1 patterns and lazy loads
+    QUERY_PROFILER_ENABLED: bool = False
+    QUERY_PROFILER_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # connections held per process: DB_POOL_SIZE + DB_MAX_OVERFLOW, times workers and replicas,
+    # has to stay under the server's max_connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
     TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 3
     ACTIVATION_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    AUTH_CACHE_TTL: int = 60
+    AUTH_CACHE_MAXSIZE: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4
+    # fixed bcrypt cost; when unset the cost is calibrated at startup against BCRYPT_TARGET_MS
+    BCRYPT_ROUNDS: Union[int, None] = None
+    BCRYPT_TARGET_MS: float = 250.0
+    BCRYPT_MIN_ROUNDS: int = 10
+    BCRYPT_MAX_ROUNDS: int = 16
+    # rounds a stored hash may fall below the cost of new hashes before a login rehashes it
+    BCRYPT_REHASH_TOLERANCE: int = 1
 
 
 @lru_cache()
@@ -0,0 +1,458 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Union
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from src.main.config import Settings, get_settings
+from src.main.core.metrics import observe_redis, registry, stats_families
+
+settings: Settings = get_settings()
+log = logging.getLogger("uvicorn")
+
+# delete a lock only while it still holds our token; it may have expired and been taken by another worker
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that times every command it sends, pipelines aside."""
+
+    async def execute_command(self, *args, **options):
+        started_at = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            observe_redis(str(args[0]), time.perf_counter() - started_at)
+
+
+# shared asynchronous Redis client for every cache in the service
+redis_client = InstrumentedRedis.from_url(settings.REDIS_URL)
+
+# every cache registers its counters here so they can be exposed in one place
+_stats_registry: dict[str, "CacheStats"] = {}
+
+
+class CacheStats:
+    """Hit, miss and invalidation counters for a single cache namespace."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+        _stats_registry[name] = self
+
+    def as_dict(self) -> dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# snapshot of the counters of all registered caches
+def cache_stats() -> dict[str, dict[str, Union[int, float]]]:
+    return {name: stats.as_dict() for name, stats in _stats_registry.items()}
+
+
+registry.register_collector(lambda: stats_families(
+    "cache", "cache lookups", [({"cache": name}, stats) for name, stats in cache_stats().items()],
+    counters=(
+        "hits", "misses", "invalidations", "errors", "local_hits", "redis_hits", "stale_served", "coalesced",
+        "refreshes",
+    ),
+))
+
+
+class QueryCache:
+    """
+    Redis cache for query results, keyed by a canonical form of the query parameters.
+
+    Keys embed a generation counter instead of relying on expiry for freshness:
+    a write bumps the global generation and the generation of the scope it touched
+    (e.g. the customer an order belongs to), so every entry built from the old
+    generation becomes unreachable at once. Scoped queries only depend on their
+    scope's generation and survive writes to unrelated scopes.
+    """
+
+    def __init__(self, namespace: str, ttl: int = 60, client: redis.Redis = redis_client) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.client = client
+        self.stats = CacheStats(namespace)
+
+    def _generation_key(self, scope: Any = None) -> str:
+        if scope is None:
+            return f"{self.namespace}:gen"
+        return f"{self.namespace}:gen:{scope}"
+
+    @staticmethod
+    def canonical(params: dict[str, Any]) -> str:
+        return json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+    # build the cache key for a query, None if Redis is unavailable
+    async def build_key(self, params: dict[str, Any], scope: Any = None) -> Union[str, None]:
+        try:
+            generation = await self.client.get(self._generation_key(scope))
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' unavailable: {e}")
+            return None
+        digest = hashlib.sha1(self.canonical(params).encode("utf-8")).hexdigest()
+        scope_part = "*" if scope is None else scope
+        return f"{self.namespace}:{scope_part}:g{int(generation or 0)}:{digest}"
+
+    async def get(self, key: str) -> Any:
+        try:
+            cached_data = await self.client.get(key)
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' unavailable: {e}")
+            return None
+        if cached_data is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(cached_data)
+
+    async def set(self, key: str, value: Any) -> None:
+        try:
+            await self.client.set(key, json.dumps(value, default=str), ex=self.ttl)
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' unavailable: {e}")
+
+    # make every entry of the scope (and every unscoped entry) stale
+    async def invalidate(self, scope: Any = None) -> None:
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.incr(self._generation_key())
+                if scope is not None:
+                    pipe.incr(self._generation_key(scope))
+                await pipe.execute()
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' invalidation failed: {e}")
+            return
+        self.stats.invalidations += 1
+
+
+class TieredCacheStats(CacheStats):
+    """Counters of a two-tier cache, split by the tier that answered."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.stale_served = 0
+        self.coalesced = 0
+        self.refreshes = 0
+
+    def as_dict(self) -> dict[str, Union[int, float]]:
+        data = super().as_dict()
+        data.update(
+            local_hits=self.local_hits,
+            redis_hits=self.redis_hits,
+            stale_served=self.stale_served,
+            coalesced=self.coalesced,
+            refreshes=self.refreshes,
+        )
+        return data
+
+
+class LRUCache:
+    """Bounded in-process LRU mapping; the least recently used key is evicted first."""
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, Any] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single execution.
+
+    The call runs in its own task, so a caller that is cancelled, the first
+    one included, leaves it running for the others.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def _done(self, key: Hashable, call: asyncio.Task) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            call.exception()  # mark as retrieved when every caller was cancelled
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(call)
+
+
+class TwoTierCache:
+    """
+    Entity cache with a bounded per-process LRU in front of Redis.
+
+    Entries are fresh for `ttl` seconds and may be served stale for another
+    `stale_ttl` seconds while one task refreshes them in the background.
+    Concurrent misses for a key share one load: inside a process through
+    single-flight, across workers through a short Redis lock. Local entries
+    live at most `local_ttl` seconds, which bounds how long another process
+    keeps serving an entry after it was invalidated.
+
+    Each invalidation bumps a per-key generation in Redis; a load that saw an
+    older generation, or an older namespace version, drops its value instead
+    of writing it over the invalidation.
+
+    Loaders must not depend on the caller's database session, because stale
+    entries are refreshed after the request that noticed them has finished.
+    """
+
+    lock_timeout_ms = 2000
+    lock_wait_attempts = 5
+    lock_wait_interval = 0.05
+
+    def __init__(
+            self,
+            namespace: str,
+            ttl: int = 60,
+            stale_ttl: int = 300,
+            local_ttl: int = 5,
+            maxsize: int = 1024,
+            client: redis.Redis = redis_client,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local_ttl = local_ttl
+        self.client = client
+        self.local = LRUCache(maxsize)
+        self.flight = SingleFlight()
+        self.stats = TieredCacheStats(namespace)
+        self._version: tuple[int, float] = (0, 0.0)
+        self._refresh_tasks: set[asyncio.Task] = set()
+
+    async def _redis_key(self, key: str) -> str:
+        version, checked_at = self._version
+        now = time.time()
+        if now - checked_at >= self.local_ttl:
+            try:
+                version = int(await self.client.get(f"{self.namespace}:version") or 0)
+            except RedisError as e:
+                self.stats.errors += 1
+                log.warning(f"Cache '{self.namespace}' unavailable: {e}")
+            if version != self._version[0]:
+                self.local.clear()
+            self._version = (version, now)
+        return f"{self.namespace}:v{version}:{key}"
+
+    def _store_local(self, key: str, value: Any, fresh_until: float) -> None:
+        self.local.set(key, (value, fresh_until, time.time() + self.local_ttl))
+
+    async def _read_redis(self, redis_key: str) -> Union[tuple[Any, float], None]:
+        try:
+            raw = await self.client.get(redis_key)
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' unavailable: {e}")
+            return None
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        return payload["value"], payload["fresh_until"]
+
+    async def _write(self, key: str, redis_key: str, value: Any) -> None:
+        fresh_until = time.time() + self.ttl
+        self._store_local(key, value, fresh_until)
+        payload = json.dumps({"value": value, "fresh_until": fresh_until}, default=str)
+        try:
+            await self.client.set(redis_key, payload, ex=self.ttl + self.stale_ttl)
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' unavailable: {e}")
+
+    def _generation_key(self, key: str) -> str:
+        return f"{self.namespace}:generation:{key}"
+
+    # times the key was invalidated recently; None when Redis can't tell
+    async def _generation(self, key: str) -> Union[int, None]:
+        try:
+            return int(await self.client.get(self._generation_key(key)) or 0)
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' unavailable: {e}")
+            return None
+
+    # write a loaded value unless the key was invalidated since the load started
+    async def _write_if_current(self, key: str, redis_key: str, generation: Union[int, None], value: Any) -> None:
+        if await self._redis_key(key) != redis_key or await self._generation(key) != generation:
+            log.debug(f"Cache '{self.namespace}' dropped a value of {key} loaded before an invalidation")
+            return
+        await self._write(key, redis_key, value)
+
+    # a token to release the lock with, or None when another worker holds it
+    async def _try_lock(self, redis_key: str) -> Union[str, None]:
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.client.set(f"{redis_key}:lock", token, nx=True, px=self.lock_timeout_ms)
+        except RedisError:
+            return token
+        return token if acquired else None
+
+    async def _release_lock(self, redis_key: str, token: str) -> None:
+        try:
+            await self.client.eval(RELEASE_LOCK_SCRIPT, 1, f"{redis_key}:lock", token)
+        except RedisError:
+            pass
+
+    async def _load(self, key: str, redis_key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        # another worker is loading the same key: give it a moment to publish the value
+        token = await self._try_lock(redis_key)
+        if token is None:
+            for _ in range(self.lock_wait_attempts):
+                await asyncio.sleep(self.lock_wait_interval)
+                cached = await self._read_redis(redis_key)
+                if cached is not None:
+                    self._store_local(key, *cached)
+                    self.stats.coalesced += 1
+                    return cached[0]
+        try:
+            generation = await self._generation(key)
+            value = await loader()
+            if value is not None:
+                await self._write_if_current(key, redis_key, generation, value)
+            return value
+        finally:
+            # the wait ran out while the other worker still holds the lock: it is not ours to release
+            if token is not None:
+                await self._release_lock(redis_key, token)
+
+    async def _refresh(self, key: str, redis_key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        token = await self._try_lock(redis_key)
+        if token is None:
+            return
+        try:
+            generation = await self._generation(key)
+            value = await loader()
+            if value is None:
+                await self.invalidate(key)
+            else:
+                await self._write_if_current(key, redis_key, generation, value)
+            self.stats.refreshes += 1
+        except Exception as e:
+            log.warning(f"Cache '{self.namespace}' refresh of {key} failed: {e}")
+        finally:
+            await self._release_lock(redis_key, token)
+
+    def _refresh_in_background(self, key: str, redis_key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        self.stats.stale_served += 1
+        # a flight of its own: a miss must not join a refresh, which returns nothing
+        flight_key = ("refresh", key)
+        if self.flight.in_flight(flight_key):
+            return
+        task = asyncio.create_task(self.flight.do(flight_key, lambda: self._refresh(key, redis_key, loader)))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    # return the cached value for key, calling loader on a miss
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.time()
+        redis_key = await self._redis_key(key)
+
+        entry = self.local.get(key)
+        if entry is not None and entry[2] > now:
+            value, fresh_until, _ = entry
+            self.stats.hits += 1
+            self.stats.local_hits += 1
+            if fresh_until <= now:
+                self._refresh_in_background(key, redis_key, loader)
+            return value
+
+        cached = await self._read_redis(redis_key)
+        if cached is not None:
+            value, fresh_until = cached
+            self._store_local(key, value, fresh_until)
+            self.stats.hits += 1
+            self.stats.redis_hits += 1
+            if fresh_until <= now:
+                self._refresh_in_background(key, redis_key, loader)
+            return value
+
+        self.stats.misses += 1
+        if self.flight.in_flight(key):
+            self.stats.coalesced += 1
+        return await self.flight.do(key, lambda: self._load(key, redis_key, loader))
+
+    # drop a single entry from both tiers, and the value of any load already running for it
+    async def invalidate(self, key: str) -> None:
+        self.local.pop(key)
+        try:
+            redis_key = await self._redis_key(key)
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.delete(redis_key)
+                pipe.incr(self._generation_key(key))
+                # a load outlives neither the lock nor the entry; the generation needn't either
+                pipe.expire(self._generation_key(key), self.ttl + self.stale_ttl)
+                await pipe.execute()
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' invalidation failed: {e}")
+        self.stats.invalidations += 1
+
+    # drop every entry of the namespace by moving to a new key version
+    async def invalidate_all(self) -> None:
+        self.local.clear()
+        try:
+            version = int(await self.client.incr(f"{self.namespace}:version"))
+            self._version = (version, time.time())
+        except RedisError as e:
+            self.stats.errors += 1
+            log.warning(f"Cache '{self.namespace}' invalidation failed: {e}")
+        self.stats.invalidations += 1
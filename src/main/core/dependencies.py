@@ -1,9 +1,11 @@
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database.session import async_session_local
+from ..database.replica import replica_router
 from ..config import Settings, get_settings
 
 settings: Settings = get_settings()
@@ -17,3 +19,13 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             yield db
         finally:
             await db.close()
+
+
+# dependency for a read-only session, on the replica when it is caught up and the client has not just written
+@asynccontextmanager
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with await replica_router.session_for(request) as db:
+        try:
+            yield db
+        finally:
+            await db.close()
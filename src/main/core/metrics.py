@@ -0,0 +1,293 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# request latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# a family as exposed: name, type, help and (labels, value) samples
+Family = tuple[str, str, str, Iterable[tuple[dict[str, Any], float]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labelvalues: Any, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: Any) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def expose(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(dict(zip(self.labelnames, values)))} {_number(value)}"
+            for values, value in self._values.items()
+        ]
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, one series per combination of label values.
+
+    Observing is a bisect and two additions, cheap enough for every request
+    and every query.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+            self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # per label values: [count per bucket (the last one +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues: Any) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labelvalues: Any) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def sum(self, *labelvalues: Any) -> float:
+        series = self._series.get(labelvalues)
+        return series[1] if series else 0.0
+
+    def expose(self) -> list[str]:
+        lines = []
+        for values, (counts, total) in self._series.items():
+            labels = dict(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': _number(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics of this process, rendered in the Prometheus text format.
+
+    Counters and histograms are updated as things happen. Collectors are
+    called at scrape time and turn the stats objects the service already keeps
+    (caches, publisher, pools, ...) into families, so nothing is counted twice.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Union[Counter, Histogram]] = {}
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, labelnames, **kwargs))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        self._collectors.append(collector)
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += metric.expose()
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# families from the as_dict() snapshots of a stats object, one per field; `counters` name the monotonic fields
+def stats_families(
+        prefix: str, help: str, snapshots: Iterable[tuple[dict[str, Any], dict[str, Any]]], counters: tuple = ()
+) -> list[Family]:
+    samples: dict[str, list] = {}
+    for labels, snapshot in snapshots:
+        for field, value in snapshot.items():
+            if value is not None:
+                samples.setdefault(field, []).append((labels, value))
+    return [
+        (
+            f"{prefix}_{field}_total" if field in counters else f"{prefix}_{field}",
+            "counter" if field in counters else "gauge",
+            f"{help}: {field.replace('_', ' ')}",
+            values,
+        )
+        for field, values in samples.items()
+    ]
+
+
+class RequestTimings:
+    """Time a single request spent in the database, in Redis and hashing passwords."""
+
+    __slots__ = ("db_queries", "db_time", "redis_calls", "redis_time", "password_hash_time")
+
+    def __init__(self) -> None:
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.redis_calls = 0
+        self.redis_time = 0.0
+        self.password_hash_time = 0.0
+
+
+# timings of the request being served; SQLAlchemy runs queries in a greenlet that shares this context
+current_request: ContextVar[Union[RequestTimings, None]] = ContextVar("current_request", default=None)
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests served", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ("route",), buckets=QUERY_COUNT_BUCKETS
+)
+http_request_db_time = registry.histogram(
+    "http_request_db_seconds", "Time per HTTP request spent executing SQL", ("route",)
+)
+http_request_redis_time = registry.histogram(
+    "http_request_redis_seconds", "Time per HTTP request spent on Redis commands", ("route",)
+)
+http_request_password_hash_time = registry.histogram(
+    "http_request_password_hash_seconds", "Time per HTTP request spent waiting for bcrypt", ("route",)
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("database",)
+)
+redis_command_duration = registry.histogram(
+    "redis_command_duration_seconds", "Redis command round trip time", ("command",)
+)
+rabbitmq_publish_duration = registry.histogram(
+    "rabbitmq_publish_confirm_seconds", "Time from publishing an order event to the broker's confirm"
+)
+password_hash_duration = registry.histogram(
+    "password_hash_seconds", "Time bcrypt calls spent queued for a worker and running", ("stage",)
+)
+
+
+# attribute the SQL an engine runs to the current request, `database` naming the engine
+def instrument_engine(engine: Engine, database: str) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        db_query_duration.observe(elapsed, database)
+        timings = current_request.get()
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_time += elapsed
+
+    # a failed statement never reaches after_cursor_execute
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+
+def observe_redis(command: str, elapsed: float) -> None:
+    redis_command_duration.observe(elapsed, command)
+    timings = current_request.get()
+    if timings is not None:
+        timings.redis_calls += 1
+        timings.redis_time += elapsed
+
+
+def observe_password_hash(queue_time: float, run_time: float) -> None:
+    password_hash_duration.observe(queue_time, "queue")
+    password_hash_duration.observe(run_time, "run")
+    timings = current_request.get()
+    if timings is not None:
+        timings.password_hash_time += queue_time + run_time
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and DB and Redis time per route.
+
+    Requests are labelled with the route's path template rather than the raw
+    path, so /orders/1 and /orders/2 share a series; requests that match no
+    route are labelled "unmatched". Latency runs until the response has been
+    sent, so streamed bodies count in full.
+    """
+
+    def __init__(self, app, exclude: tuple[str, ...] = ("/metrics",)) -> None:
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_request.set(timings)
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc(method, route, status)
+            http_request_duration.observe(elapsed, method, route)
+            http_request_db_queries.observe(timings.db_queries, route)
+            http_request_db_time.observe(timings.db_time, route)
+            http_request_redis_time.observe(timings.redis_time, route)
+            http_request_password_hash_time.observe(timings.password_hash_time, route)
@@ -0,0 +1,102 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Union
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.orm import ColumnProperty, InstrumentedAttribute
+
+# response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: dict[str, Any]) -> str:
+    raw = json.dumps(jsonable_encoder(position), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        valid = isinstance(position, dict) and "v" in position and isinstance(position.get("id"), int)
+    except (binascii.Error, UnicodeError, ValueError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if position.get("s") != sort_by or position.get("o") != order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor was issued for a different sort_by/order",
+        )
+    return position
+
+
+def sort_column(model: Any, sort_by: str) -> InstrumentedAttribute:
+    column = getattr(model, sort_by, None)
+    if not isinstance(column, InstrumentedAttribute) or not isinstance(column.property, ColumnProperty):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot sort by '{sort_by}'")
+    return column
+
+
+# turn a cursor value back into the column's python type; a value that doesn't convert is a bad cursor
+def _column_value(column: InstrumentedAttribute, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_query(
+        query: Select, model: Any, sort_by: str, order: str, cursor: Union[str, None] = None
+) -> Select:
+    """
+    Order `query` by (sort_by, id) and, given a cursor, keep only rows after it.
+
+    Rows are compared as (sort_by, id) pairs, which Postgres answers from an
+    index on those columns, so every page costs the same however deep it is.
+    NULL sort values follow Postgres' default placement: last when ascending,
+    first when descending.
+    """
+    column = sort_column(model, sort_by)
+    descending = order == "desc"
+
+    if cursor is not None:
+        position = decode_cursor(cursor, sort_by, order)
+        value, last_id = _column_value(column, position["v"]), position["id"]
+        if descending:
+            if value is None:
+                query = query.where(or_(and_(column.is_(None), model.id < last_id), column.is_not(None)))
+            else:
+                query = query.where(tuple_(column, model.id) < tuple_(value, last_id))
+        else:
+            if value is None:
+                query = query.where(and_(column.is_(None), model.id > last_id))
+            else:
+                query = query.where(or_(tuple_(column, model.id) > tuple_(value, last_id), column.is_(None)))
+
+    if descending:
+        return query.order_by(column.desc(), model.id.desc())
+    return query.order_by(column.asc(), model.id.asc())
+
+
+# cursor of the page after `rows`, None when this was the last page
+def next_cursor(rows: list[Any], sort_by: str, order: str, limit: int) -> Union[str, None]:
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if isinstance(last, dict):
+        value, last_id = last.get(sort_by), last["id"]
+    else:
+        value, last_id = getattr(last, sort_by), last.id
+    return encode_cursor({"s": sort_by, "o": order, "v": value, "id": last_id})
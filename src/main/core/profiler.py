@@ -0,0 +1,227 @@
+import logging
+import os
+import sys
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+try:
+    from greenlet import getcurrent
+except ImportError:  # pragma: no cover
+    getcurrent = None
+
+log = logging.getLogger("uvicorn")
+
+# frames under this directory are the service's own code; the first one up the stack is the call site
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIPPED_FILES = {os.path.abspath(__file__), os.path.join(APP_ROOT, "core", "metrics.py")}
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+class QueryRecord:
+    """One SQL statement issued while profiling."""
+
+    __slots__ = ("statement", "parameters", "duration", "call_site", "lazy_load")
+
+    def __init__(
+            self, statement: str, parameters: Any, duration: float, call_site: str, lazy_load: Union[str, None]
+    ) -> None:
+        self.statement = statement
+        self.parameters = parameters
+        self.duration = duration
+        self.call_site = call_site
+        self.lazy_load = lazy_load
+
+
+class QueryProfile:
+    """
+    Statements issued during one request or profiled block, with timing and call site.
+
+    A statement run again with the same parameters is reported as repeated; the
+    same statement run `n_plus_one_threshold` times or more with different
+    parameters is reported as a likely N+1. Statements emitted by lazy
+    relationship loads are tagged with the relationship they loaded.
+    """
+
+    def __init__(self, label: str = "", n_plus_one_threshold: int = 5) -> None:
+        self.label = label
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.queries: list[QueryRecord] = []
+        self._lazy_load: Union[str, None] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_time(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def repeated(self) -> list[tuple[str, int]]:
+        tally = Tally((query.statement, repr(query.parameters)) for query in self.queries)
+        return [(statement, count) for (statement, _), count in tally.items() if count > 1]
+
+    def n_plus_one(self) -> list[tuple[str, int]]:
+        tally = Tally(query.statement for query in self.queries)
+        return [(statement, count) for statement, count in tally.items() if count >= self.n_plus_one_threshold]
+
+    def lazy_loads(self) -> list[QueryRecord]:
+        return [query for query in self.queries if query.lazy_load]
+
+    @property
+    def flagged(self) -> bool:
+        return bool(self.repeated() or self.n_plus_one() or self.lazy_loads())
+
+    def report(self) -> str:
+        lines = [f"{self.label or 'profile'}: {self.count} queries in {self.total_time * 1000:.1f} ms"]
+        for index, query in enumerate(self.queries, 1):
+            lazy = f" [lazy load of {query.lazy_load}]" if query.lazy_load else ""
+            lines.append(
+                f"  {index}. {query.duration * 1000:.2f} ms at {query.call_site}{lazy}: {_one_line(query.statement)}"
+            )
+        for statement, count in self.repeated():
+            lines.append(f"  repeated {count}x with the same parameters: {_one_line(statement)}")
+        for statement, count in self.n_plus_one():
+            lines.append(f"  possible N+1, run {count}x: {_one_line(statement)}")
+        return "\n".join(lines)
+
+
+def _one_line(statement: str, width: int = 160) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= width else statement[:width - 3] + "..."
+
+
+# the profile statements are recorded into, if any
+current_profile: ContextVar[Union[QueryProfile, None]] = ContextVar("current_profile", default=None)
+
+# lists receiving every finished request profile, see capture_profiles()
+_captures: list[list[QueryProfile]] = []
+
+
+def _is_app_frame(filename: str) -> bool:
+    return filename.startswith(APP_ROOT) and filename not in _SKIPPED_FILES
+
+
+# the innermost frame of the service's own code, following async sessions out of SQLAlchemy's greenlet
+def call_site() -> str:
+    frame = sys._getframe(1)
+    current = getcurrent() if getcurrent else None
+    while True:
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if _is_app_frame(filename):
+                return f"{os.path.relpath(filename, APP_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        current = current.parent if current is not None else None
+        if current is None:
+            return "unknown"
+        frame = current.gr_frame
+
+
+def _on_orm_execute(orm_execute_state: ORMExecuteState) -> None:
+    profile = current_profile.get()
+    if profile is not None and orm_execute_state.is_relationship_load and orm_execute_state.lazy_loaded_from:
+        path = orm_execute_state.loader_strategy_path
+        profile._lazy_load = str(path[-1]) if path else str(orm_execute_state.lazy_loaded_from.class_.__name__)
+
+
+_session_hooked = False
+
+
+def install_profiler(engine: Engine) -> None:
+    """Record the statements `engine` runs into the current profile; without one the hooks do nothing."""
+    global _session_hooked
+    if not _session_hooked:
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
+        _session_hooked = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            conn.info.setdefault("profile_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile.get()
+        if profile is None or not conn.info.get("profile_started_at"):
+            return
+        duration = time.perf_counter() - conn.info["profile_started_at"].pop()
+        profile.queries.append(QueryRecord(statement, parameters, duration, call_site(), profile._lazy_load))
+        profile._lazy_load = None
+
+
+# profile the statements run inside the block, including those of coroutines started from it
+@contextmanager
+def profile_queries(label: str = "", n_plus_one_threshold: int = 5) -> Iterator[QueryProfile]:
+    profile = QueryProfile(label, n_plus_one_threshold)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+# collect the profile of every request the profiler middleware finishes inside the block
+@contextmanager
+def capture_profiles() -> Iterator[list[QueryProfile]]:
+    profiles: list[QueryProfile] = []
+    _captures.append(profiles)
+    try:
+        yield profiles
+    finally:
+        _captures.remove(profiles)
+
+
+# fail when a request inside the block runs more than `limit` statements, e.g. to pin an endpoint's query budget
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[list[QueryProfile]]:
+    with capture_profiles() as profiles:
+        yield profiles
+    for profile in profiles:
+        if profile.count > limit:
+            raise AssertionError(f"expected at most {limit} queries\n{profile.report()}")
+
+
+class QueryProfilerMiddleware:
+    """
+    ASGI middleware profiling the SQL of each request, for development.
+
+    The query count so far is sent in the X-Query-Count response header, and
+    requests with repeated statements, likely N+1 patterns or lazy loads are
+    logged with their full report. Added only when QUERY_PROFILER_ENABLED is set.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = 5) -> None:
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(f"{scope['method']} {scope['path']}", self.n_plus_one_threshold)
+        token = current_profile.set(profile)
+
+        async def send_with_count(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.lower().encode(), str(profile.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            current_profile.reset(token)
+            if profile.flagged:
+                log.warning(profile.report())
+            for profiles in _captures:
+                profiles.append(profile)
@@ -1,10 +1,23 @@
 
+import asyncio
+import itertools
+import logging
+import time
 import pika
 import json
 import traceback
+from typing import Union
+
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractRobustConnection
+from aio_pika.exceptions import DeliveryError
 
 from src.main.config import get_settings, Settings
+from src.main.core.metrics import rabbitmq_publish_duration, registry, stats_families
 settings: Settings = get_settings()
+log = logging.getLogger("uvicorn")
+
+ORDER_NOTIFICATIONS_QUEUE = 'order_notifications_queue'
 
 
 def get_rabbitmq_channel():
@@ -14,7 +27,7 @@ def get_rabbitmq_channel():
     channel = connection.channel()
 
     # Declare the queue
-    channel.queue_declare(queue='order_notifications_queue', durable=True)
+    channel.queue_declare(queue=ORDER_NOTIFICATIONS_QUEUE, durable=True)
 
     return channel
 
@@ -33,24 +46,176 @@ def test_rabbitmq_connection():
         traceback.print_exc()
 
 
-# Function to publish a message to the RabbitMQ queue
-def publish_order_created_message(order_data: dict):
-    """Publish an 'order created' message to RabbitMQ."""
-    channel = get_rabbitmq_channel()
-
-    # convert order data to a dict
-    message = json.dumps(order_data).encode('utf-8')
-
-    # Publish the message to the queue
-    channel.basic_publish(
-        exchange='',
-        routing_key='order_notifications_queue',  # Name of the queue
-        body=message,
-        properties=pika.BasicProperties(
-            delivery_mode=2,
+class PublishBackpressureError(Exception):
+    """Raised when the in-flight window stays full for longer than the backpressure timeout."""
+
+
+class PublisherStats:
+    """In-flight depth, confirm latency and nack counters of a confirm-mode publisher."""
+
+    def __init__(self) -> None:
+        self.published = 0
+        self.confirmed = 0
+        self.nacked = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.confirm_latency_sum = 0.0
+        self.confirm_latency_max = 0.0
+
+    def observe_confirm(self, latency: float) -> None:
+        self.confirmed += 1
+        self.confirm_latency_sum += latency
+        self.confirm_latency_max = max(self.confirm_latency_max, latency)
+
+    def as_dict(self) -> dict[str, Union[int, float]]:
+        return {
+            "published": self.published,
+            "confirmed": self.confirmed,
+            "nacked": self.nacked,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "confirm_latency_avg": self.confirm_latency_sum / self.confirmed if self.confirmed else 0.0,
+            "confirm_latency_max": self.confirm_latency_max,
+        }
+
+
+class OrderEventPublisher:
+    """
+    Long-lived, confirm-mode publisher for order events.
+
+    Keeps one robust (auto-reconnecting) AMQP connection and a small set of
+    channels in publisher-confirm mode for the lifetime of the app, and
+    declares the queue once. Publishes are pipelined: the frame is written
+    straight away and the broker's confirm, which it sends in batches with
+    `multiple=True`, resolves the pending message asynchronously. At most
+    `max_in_flight` messages may await a confirm; when the window is full
+    publishers wait up to `backpressure_timeout` seconds for a slot and then
+    get a PublishBackpressureError.
+    """
+
+    def __init__(
+            self,
+            url: str,
+            queue: str = ORDER_NOTIFICATIONS_QUEUE,
+            pool_size: int = 4,
+            max_in_flight: int = 1000,
+            backpressure_timeout: float = 5.0,
+    ) -> None:
+        self.url = url
+        self.queue = queue
+        self.pool_size = pool_size
+        self.backpressure_timeout = backpressure_timeout
+        self.connection: Union[AbstractRobustConnection, None] = None
+        self.channels: list[AbstractChannel] = []
+        self.stats = PublisherStats()
+        self._window = asyncio.Semaphore(max_in_flight)
+        self._next_channel = itertools.count()
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def is_started(self) -> bool:
+        return bool(self.channels)
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self.is_started:
+                return
+            self.connection = await aio_pika.connect_robust(self.url)
+            channels = [await self.connection.channel(publisher_confirms=True) for _ in range(self.pool_size)]
+            await channels[0].declare_queue(self.queue, durable=True)
+            self.channels = channels
+            log.info(f"RabbitMQ publisher connected, queue '{self.queue}' declared")
+
+    async def stop(self) -> None:
+        for channel in self.channels:
+            await channel.close()
+        self.channels = []
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def _acquire_slot(self) -> None:
+        try:
+            await asyncio.wait_for(self._window.acquire(), timeout=self.backpressure_timeout)
+        except asyncio.TimeoutError:
+            self.stats.rejected += 1
+            raise PublishBackpressureError(
+                f"{self.stats.in_flight} messages awaiting confirm, window full for {self.backpressure_timeout}s"
+            )
+        self.stats.in_flight += 1
+
+    # done callback of every send: runs even when the send was cancelled before it started
+    def _release_slot(self, future: asyncio.Future) -> None:
+        self.stats.in_flight -= 1
+        self._window.release()
+
+    async def _send(self, message: aio_pika.Message) -> None:
+        channel = self.channels[next(self._next_channel) % len(self.channels)]
+        started = time.perf_counter()
+        try:
+            await channel.default_exchange.publish(message, routing_key=self.queue)
+        except DeliveryError:
+            self.stats.nacked += 1
+            raise
+        except Exception:
+            self.stats.failed += 1
+            raise
+        else:
+            latency = time.perf_counter() - started
+            self.stats.observe_confirm(latency)
+            rabbitmq_publish_duration.observe(latency)
+
+    # write the message and return a future that resolves once the broker confirms it
+    async def publish_nowait(self, data: dict) -> asyncio.Future:
+        # the app lifespan starts the publisher; connect lazily if the broker was down then
+        if not self.is_started:
+            await self.start()
+
+        message = aio_pika.Message(
+            body=json.dumps(data).encode('utf-8'),
+            content_type='application/json',
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
         )
-    )
-    print(f"Published message to RabbitMQ: {message}")
-    channel.close()
+        await self._acquire_slot()
+        self.stats.published += 1
+        future = asyncio.ensure_future(self._send(message))
+        future.add_done_callback(self._release_slot)
+        return future
 
+    # publish one message and wait for its confirm
+    async def publish(self, data: dict) -> None:
+        await (await self.publish_nowait(data))
 
+    # publish messages back to back and wait for all confirms; one flag per message, in order
+    async def publish_batch(self, payloads: list[dict]) -> list[bool]:
+        pending = []
+        for data in payloads:
+            try:
+                pending.append(await self.publish_nowait(data))
+            except Exception as e:
+                log.warning(f"RabbitMQ publisher stopped batch early: {e}")
+                break
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        confirmed = [not isinstance(result, BaseException) for result in results]
+        return confirmed + [False] * (len(payloads) - len(confirmed))
+
+
+publisher = OrderEventPublisher(
+    settings.RABBITMQ_URL,
+    pool_size=settings.RABBITMQ_CHANNEL_POOL_SIZE,
+    max_in_flight=settings.RABBITMQ_MAX_IN_FLIGHT,
+    backpressure_timeout=settings.RABBITMQ_BACKPRESSURE_TIMEOUT,
+)
+registry.register_collector(lambda: stats_families(
+    "rabbitmq_publisher", "order event publisher", [({}, publisher.stats.as_dict())],
+    counters=("published", "confirmed", "nacked", "failed", "rejected"),
+))
+
+
+# Function to publish a message to the RabbitMQ queue
+async def publish_order_created_message(order_data: dict):
+    """Publish an 'order created' message to RabbitMQ."""
+    await publisher.publish(order_data)
+    log.debug(f"Published message to RabbitMQ: {order_data}")
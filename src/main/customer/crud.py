@@ -1,18 +1,21 @@
-import json
-
 from typing import Any, Union, Generic, Type, TypeVar
 from sqlalchemy.ext.asyncio import AsyncSession
-import redis.asyncio as redis
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import joinedload
 
 from src.main.customer import model as customer_model
 from src.main.customer import schema as customer_schema
 from ..database.base import Base
-from src.main.auth.jwt_security import get_password_hash
+from ..database.session import async_session_local
+from src.main.auth.jwt_security import get_password_hash_async
+from src.main.core.cache import QueryCache, TwoTierCache
+from src.main.core.pagination import keyset_query
+from src.main.config import Settings, get_settings
 from .model import Customer
 
+settings: Settings = get_settings()
+
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
@@ -21,6 +24,19 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 class CRUDCustomer(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]) -> None:
         self.model = model
+        cache_options = dict(
+            ttl=settings.CUSTOMER_CACHE_TTL,
+            stale_ttl=settings.CUSTOMER_CACHE_STALE_TTL,
+            local_ttl=settings.LOCAL_CACHE_TTL,
+            maxsize=settings.LOCAL_CACHE_MAXSIZE,
+        )
+        self.cache = TwoTierCache("customers", **cache_options)
+        self.list_cache = TwoTierCache("customers:list", **cache_options)
+
+    # drop cached reads affected by a write to the customer
+    async def invalidate_cache(self, customer_id: int) -> None:
+        await self.cache.invalidate(str(customer_id))
+        await self.list_cache.invalidate_all()
 
     # create customer
     async def create_customer(
@@ -28,21 +44,39 @@ class CRUDCustomer(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> customer_model.Customer:
         customer_data = obj_in.model_dump(exclude_unset=True)
         if customer_data.get("hashed_password"):
-            customer_data["hashed_password"] = get_password_hash(customer_data["hashed_password"])
+            customer_data["hashed_password"] = await get_password_hash_async(customer_data["hashed_password"])
 
         db_customer = self.model(**customer_data)
         async_db.add(db_customer)
         await async_db.commit()
         await async_db.refresh(db_customer)
+        await self.list_cache.invalidate_all()
         return db_customer
 
-    # function to get a customer
-    async def get_customer(self, async_db: AsyncSession, customer_id: int) -> customer_model.Customer | None:
+    # function to get a customer, from the cache when use_cache is set
+    async def get_customer(
+            self, async_db: AsyncSession, customer_id: int, use_cache: bool = False
+    ) -> customer_model.Customer | dict[str, Any] | None:
+        if use_cache:
+            return await self.cache.get(str(customer_id), lambda: self._load_customer(customer_id))
 
         result = await async_db.execute(select(self.model).where(self.model.id == customer_id))
         return result.scalars().first()
 
-    redis_client = redis.Redis.from_url("redis://localhost")
+    # cache loader, runs on its own session so it can outlive the request
+    async def _load_customer(self, customer_id: int) -> dict[str, Any] | None:
+        async with async_session_local() as session:
+            # the order summary comes with the customer, one primary key join
+            result = await session.execute(
+                select(self.model).options(joinedload(self.model.order_summary)).where(self.model.id == customer_id)
+            )
+            db_customer = result.scalars().first()
+            if db_customer is None:
+                return None
+            return customer_schema.CustomerWithSummary.model_validate({
+                **customer_schema.Customer.model_validate(db_customer).model_dump(),
+                "order_summary": db_customer.order_summary or customer_schema.CustomerOrderSummary(),
+            }).model_dump(mode="json")
 
     # Sorting, Pagination  and Filtering
     async def get_customers(
@@ -53,16 +87,37 @@ class CRUDCustomer(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             country: str = None,  # For filtering by country
             sort_by: str = "name",  # Sorting field
             order: str = "asc",  # Sorting direction
-            use_cache: bool = True,  # Caching control
-            cache_key: str = "customers"
+            cursor: str = None,  # Keyset position, replaces skip
+            use_cache: bool = True  # Caching control
     ) -> list[customer_model.Customer]:
+        params = {
+            "skip": skip, "limit": limit, "country": country, "sort_by": sort_by, "order": order, "cursor": cursor,
+        }
 
         # Check cache first
         if use_cache:
-            cached_data = await redis.get(cache_key)
-            if cached_data:
-                return json.loads(cached_data)
+            cache_key = QueryCache.canonical(params)
+            return await self.list_cache.get(cache_key, lambda: self._load_customers(**params))
+
+        return await self._query_customers(async_db, **params)
 
+    # cache loader for customer listings
+    async def _load_customers(self, **params: Any) -> list[dict[str, Any]]:
+        async with async_session_local() as session:
+            customers = await self._query_customers(session, **params)
+            return [customer_schema.Customer.model_validate(customer).model_dump(mode="json")
+                    for customer in customers]
+
+    async def _query_customers(
+            self,
+            async_db: AsyncSession,
+            skip: int = 0,
+            limit: int = 100,
+            country: str = None,
+            sort_by: str = "name",
+            order: str = "asc",
+            cursor: str = None
+    ) -> list[customer_model.Customer]:
         # Build the query
         query = select(self.model)
 
@@ -70,39 +125,33 @@ class CRUDCustomer(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if country:
             query = query.where(self.model.country == country)
 
-        # Apply sorting
-        if order == "desc":
-            query = query.order_by(getattr(self.model, sort_by).desc())
-        else:
-            query = query.order_by(getattr(self.model, sort_by).asc())
+        # Apply sorting, and the cursor position when paging by keyset
+        query = keyset_query(query, self.model, sort_by, order, cursor)
 
         # Pagination
-        query = query.offset(skip).limit(limit)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
 
         result = await async_db.execute(query)
-        customers = list(result.scalars().all())
-
-        # Cache the result
-        if use_cache:
-            await redis.set(cache_key, json.dumps([jsonable_encoder(customer) for customer in customers]), ex=60)
-
-        return customers
+        return list(result.scalars().all())
 
     # function to update a customer according to ID
     async def update_customer(
             self, async_db: AsyncSession, *, db_obj: customer_model.Customer,
             obj_in: Union[customer_schema.CustomerUpdate, dict[str, Any]]
     ) -> customer_model.Customer:
-        obj_data = jsonable_encoder(db_obj)
         update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
 
-        for field in obj_data:
+        # the mapped columns only: encoding the object would walk its orders if they were loaded
+        for field in inspect(db_obj).mapper.column_attrs.keys():
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
 
         async_db.add(db_obj)
         await async_db.commit()
         await async_db.refresh(db_obj)
+        await self.invalidate_cache(db_obj.id)
         return db_obj
 
     # Delete Customer
@@ -111,6 +160,7 @@ class CRUDCustomer(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if customer:
             await async_db.delete(customer)
             await async_db.commit()
+            await self.invalidate_cache(customer_id)
         return customer
 
 
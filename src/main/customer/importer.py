@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import csv
+import codecs
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Union
+
+import redis.asyncio as redis
+from pydantic import BaseModel, ValidationError
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.main.auth.jwt_security import get_bcrypt_rounds, get_password_hash
+from src.main.config import Settings, get_settings
+from src.main.core.cache import redis_client
+from src.main.database.session import async_session_local
+from . import schema as customer_schema
+from .crud import customer as customer_crud
+
+settings: Settings = get_settings()
+log = logging.getLogger("uvicorn")
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_COLUMNS = ("name", "email", "code", "country", "phone_number", "gender", "hashed_password")
+STAGING_TABLE = "customer_import"
+
+_hash_pool: Union[ProcessPoolExecutor, None] = None
+_hash_workers = settings.CUSTOMER_IMPORT_HASH_WORKERS or os.cpu_count() or 1
+
+
+class ImportReport(BaseModel):
+    processed: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    errors: list[str] = []
+
+    def reject(self, line: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < settings.CUSTOMER_IMPORT_MAX_ERRORS:
+            self.errors.append(f"line {line}: {reason}")
+
+
+class ImportJob(BaseModel):
+    id: str
+    status: str = "running"  # running, done or failed
+    report: ImportReport = ImportReport()
+    error: Union[str, None] = None
+
+
+# process pool for bcrypt, created on first import; spawned, as a forked worker
+# would inherit the server's event loop and database connections
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=_hash_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+# the cost is passed in: pool workers do not share the calibrated cost of this process
+def hash_passwords(passwords: list[str], rounds: int) -> list[str]:
+    return [get_password_hash(password, rounds) for password in passwords]
+
+
+# hash a batch of passwords across the process pool, a slice per worker
+async def hash_batch(passwords: list[str], pool: ProcessPoolExecutor) -> list[str]:
+    loop = asyncio.get_running_loop()
+    slice_size = max(1, -(-len(passwords) // _hash_workers))
+    slices = [passwords[start:start + slice_size] for start in range(0, len(passwords), slice_size)]
+    rounds = get_bcrypt_rounds()
+    hashed = await asyncio.gather(*(loop.run_in_executor(pool, hash_passwords, part, rounds) for part in slices))
+    return [value for part in hashed for value in part]
+
+
+# decode a byte stream into lines without holding more than one chunk in memory
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_records(chunks: AsyncIterable[bytes], fmt: str) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Yield (line number, record) for each row of a CSV or NDJSON stream.
+
+    CSV needs a header row naming the customer columns. A quoted CSV field may
+    span lines; a row that cannot be parsed is yielded as its error string.
+    """
+    header = None
+    pending, start = "", 0
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, f"invalid JSON: {e}"
+            continue
+
+        # keep reading while a quoted field is still open
+        pending = f"{pending}\n{line}" if pending else line
+        start = start or line_no
+        if pending.count('"') % 2:
+            continue
+        text_row, row_line = pending, start
+        pending, start = "", 0
+        if not text_row.strip():
+            continue
+        row = next(csv.reader([text_row]))
+        if header is None:
+            header = [column.strip() for column in row]
+            continue
+        if len(row) != len(header):
+            yield row_line, f"expected {len(header)} fields, got {len(row)}"
+            continue
+        yield row_line, dict(zip(header, row))
+    if pending:
+        yield start, "unterminated quoted field"
+
+
+async def _merge_batch(session: AsyncSession, records: list[tuple]) -> int:
+    # the staging table lives for one transaction
+    await session.execute(text(
+        f"CREATE TEMP TABLE {STAGING_TABLE} "
+        f"({', '.join(f'{column} varchar' for column in IMPORT_COLUMNS)}) ON COMMIT DROP"
+    ))
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        STAGING_TABLE, records=records, columns=list(IMPORT_COLUMNS)
+    )
+    columns = ", ".join(IMPORT_COLUMNS)
+    result = await session.execute(text(
+        f"INSERT INTO customers ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+        f"ON CONFLICT DO NOTHING"
+    ))
+    await session.commit()
+    return result.rowcount
+
+
+async def import_customers(
+        chunks: AsyncIterable[bytes],
+        fmt: str = "csv",
+        batch_size: int = None,
+        on_progress: Callable[[ImportReport], Union[Awaitable[None], None]] = None,
+) -> ImportReport:
+    """
+    Stream customers from a CSV or NDJSON upload into the customers table.
+
+    Rows are validated against CustomerCreate and gathered into batches. The
+    passwords of a batch are bcrypt-hashed in a process pool, and the batch is
+    COPYed into a transaction-scoped staging table and merged into customers
+    with ON CONFLICT DO NOTHING, so rows whose email or phone number already
+    exist are counted as duplicates rather than failing the import. Each batch
+    is committed on its own; `on_progress`, which may be a coroutine function,
+    is called after every batch.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format '{fmt}'")
+    batch_size = batch_size or settings.CUSTOMER_IMPORT_BATCH_SIZE
+    pool = get_hash_pool()
+    report = ImportReport()
+
+    async def flush(batch: list[customer_schema.CustomerCreate]) -> None:
+        hashed = await hash_batch([row.hashed_password for row in batch], pool)
+        records = [
+            (row.name, row.email, row.code, row.country, row.phone_number, row.gender, password)
+            for row, password in zip(batch, hashed)
+        ]
+        async with async_session_local() as session:
+            imported = await _merge_batch(session, records)
+        report.imported += imported
+        report.duplicates += len(records) - imported
+        log.info(
+            f"Customer import: {report.processed} processed, {report.imported} imported, "
+            f"{report.duplicates} duplicates, {report.rejected} rejected"
+        )
+        if on_progress and inspect.isawaitable(result := on_progress(report)):
+            await result
+
+    batch = []
+    async for line_no, record in iter_records(chunks, fmt):
+        report.processed += 1
+        if isinstance(record, str):
+            report.reject(line_no, record)
+            continue
+        if not isinstance(record, dict):
+            report.reject(line_no, "expected an object")
+            continue
+        try:
+            # absent and empty columns are stored as NULL
+            row = customer_schema.CustomerCreate.model_validate(
+                {column: record.get(column) if record.get(column) != "" else None for column in IMPORT_COLUMNS}
+            )
+        except ValidationError as e:
+            report.reject(line_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    if report.imported:
+        await customer_crud.list_cache.invalidate_all()
+    return report
+
+
+async def _read_file(path: str, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+class ImportJobs:
+    """
+    Customer imports started over HTTP, run in the background of the worker that received them.
+
+    The upload is spooled to a temporary file, so the request ends as soon as
+    the body is read rather than when the import finishes. Job status is kept
+    in Redis for `ttl` seconds, so any worker can report on it.
+    """
+
+    def __init__(self, ttl: int = 86400, client: redis.Redis = redis_client) -> None:
+        self.ttl = ttl
+        self.client = client
+        self._tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"customer_import:{job_id}"
+
+    async def _save(self, job: ImportJob) -> None:
+        try:
+            await self.client.set(self._key(job.id), job.model_dump_json(), ex=self.ttl)
+        except RedisError as e:
+            log.warning(f"Customer import {job.id}: could not save status: {e}")
+
+    async def get(self, job_id: str) -> Union[ImportJob, None]:
+        raw = await self.client.get(self._key(job_id))
+        return ImportJob.model_validate_json(raw) if raw is not None else None
+
+    async def start(self, chunks: AsyncIterable[bytes], fmt: str) -> ImportJob:
+        with tempfile.NamedTemporaryFile(prefix="customer-import-", delete=False) as spool:
+            async for chunk in chunks:
+                spool.write(chunk)
+        job = ImportJob(id=uuid.uuid4().hex)
+        await self._save(job)
+        task = asyncio.create_task(self._run(job, spool.name, fmt))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: ImportJob, path: str, fmt: str) -> None:
+        async def progress(report: ImportReport) -> None:
+            job.report = report
+            await self._save(job)
+
+        try:
+            job.report = await import_customers(_read_file(path), fmt, on_progress=progress)
+            job.status = "done"
+        except Exception as e:
+            log.exception(f"Customer import {job.id} failed")
+            job.status, job.error = "failed", str(e)
+        finally:
+            os.unlink(path)
+        await self._save(job)
+
+    # cancel the imports still running in this worker; their batches committed so far stay
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+import_jobs = ImportJobs(ttl=settings.CUSTOMER_IMPORT_JOB_TTL)
+
+
+# command line entry point: python -m src.main.customer.importer customers.csv
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import customers from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=settings.CUSTOMER_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if os.path.splitext(args.path)[1].lower() in (".ndjson", ".jsonl") else "csv")
+
+    def progress(report: ImportReport) -> None:
+        print(f"{report.processed} processed, {report.imported} imported, "
+              f"{report.duplicates} duplicates, {report.rejected} rejected", flush=True)
+
+    try:
+        report = asyncio.run(import_customers(_read_file(args.path), fmt, args.batch_size, on_progress=progress))
+    finally:
+        shutdown_hash_pool()
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from sqlalchemy import String
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from ..database.base import Base
@@ -16,4 +17,20 @@ class Customer(Base):
     gender: Mapped[str] = mapped_column(index=True, nullable=True)
     hashed_password: Mapped[str] = mapped_column(String)
 
-    orders = relationship("Order", back_populates="customer")
\ No newline at end of file
+    orders = relationship("Order", back_populates="customer")
+    # only ever loaded explicitly, with the customer it belongs to
+    order_summary = relationship("CustomerOrderSummary", uselist=False, lazy="raise", passive_deletes=True)
+
+    # keyset pagination walks (sort column, id) pairs
+    __table_args__ = (
+        Index("ix_customers_name_id", "name", "id"),
+    )
+
+
+class CustomerOrderSummary(Base):
+    __tablename__ = "customer_order_summaries"
+
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    order_count: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    total_amount: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    last_order_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing_extensions import List
 
 from . import crud as customer_crud, schema as customer_schema
+from .importer import IMPORT_FORMATS, ImportJob, import_jobs
 from ..auth import model, dependencies
-from ..core.dependencies import get_session
+from ..core.dependencies import get_read_session, get_session
+from ..core.pagination import NEXT_CURSOR_HEADER, next_cursor
 
 router = APIRouter()
 
@@ -27,14 +29,48 @@ async def create_customer(
     return created_customer
 
 
+# route to import customers from a CSV or NDJSON request body, streamed to disk and imported in the background
+@router.post("/customer/import", response_model=ImportJob, status_code=status.HTTP_202_ACCEPTED)
+async def import_customer_file(
+    request: Request,
+    format: str = "csv",
+    current_user: model.User = Depends(dependencies.get_current_user)
+):
+    if not current_user.email:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to import customers"
+        )
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of {', '.join(IMPORT_FORMATS)}"
+        )
+    return await import_jobs.start(request.stream(), format)
+
+
+# route to follow an import started with /customer/import
+@router.get("/customer/import/{job_id}", response_model=ImportJob)
+async def get_customer_import(
+    job_id: str,
+    current_user: model.User = Depends(dependencies.get_current_user)
+):
+    job = await import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
+
+
 # Gwt customer by ID
-@router.get("/customer/{customer_id}", response_model=customer_schema.Customer)
+@router.get("/customer/{customer_id}", response_model=customer_schema.CustomerWithSummary)
 async def get_customer_by_id(
     customer_id: int,
-    async_db: AsyncSession = Depends(get_session)
+    async_db: AsyncSession = Depends(get_read_session)
 ):
     async with async_db as session:
-        customer = await customer_crud.customer.get_customer(async_db=session, customer_id=customer_id)
+        customer = await customer_crud.customer.get_customer(
+            async_db=session, customer_id=customer_id, use_cache=True
+        )
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
@@ -43,13 +79,15 @@ async def get_customer_by_id(
 # Filter customer by country
 @router.get("/customer", response_model=List[customer_schema.Customer])
 async def get_customers(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     country: str = None,
     sort_by: str = "name",
     order: str = "asc",
+    cursor: str = None,
     use_cache: bool = True,
-    async_db: AsyncSession = Depends(get_session)
+    async_db: AsyncSession = Depends(get_read_session)
 ):
     async with async_db as session:
         customers = await customer_crud.customer.get_customers(
@@ -59,8 +97,13 @@ async def get_customers(
             country=country,
             sort_by=sort_by,
             order=order,
+            cursor=cursor,
             use_cache=use_cache
         )
+    # pass the cursor back to page on by keyset instead of skip
+    page_cursor = next_cursor(customers, sort_by, order, limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
     return customers
 
 
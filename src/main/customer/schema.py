@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Union
 from pydantic import BaseModel, EmailStr, ConfigDict
 
@@ -34,6 +35,20 @@ class Customer(CustomerInDBBase):
     pass
 
 
+# Order totals kept next to the customer
+class CustomerOrderSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    order_count: int = 0
+    total_amount: int = 0
+    last_order_at: Union[datetime, None] = None
+
+
+# Customer with their order totals
+class CustomerWithSummary(Customer):
+    order_summary: CustomerOrderSummary = CustomerOrderSummary()
+
+
 # properties stored in DB
 class CustomerInDB(CustomerInDBBase):
     pass
\ No newline at end of file
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Generic, Iterable, Type, TypeVar, Union
+from sqlalchemy import delete, func, insert as sa_insert, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .model import CustomerOrderSummary
+from ..database.base import Base
+from ..database.session import async_session_local
+from ..orders.model import Order
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+
+class CRUDCustomerSummary(Generic[ModelType]):
+    """
+    Per-customer order count, total amount and last order time.
+
+    Kept up to date in the transaction of every order write: count and amount
+    take the write's delta, and the last order time moves forward with new
+    orders. Removing an order cannot move a maximum back from a delta, so the
+    customers that lost an order re-read their latest order time from the
+    (customer_id, time) index instead.
+    """
+
+    def __init__(self, model: Type[ModelType]) -> None:
+        self.model = model
+
+    async def apply(self, async_db: AsyncSession, changes: Iterable[tuple[Any, int]]) -> None:
+        """Add `sign` (+1 or -1) times each order to its customer's summary."""
+        totals: dict[int, list] = defaultdict(lambda: [0, 0, None])
+        lost_orders = set()
+        for order, sign in changes:
+            total = totals[order.customer_id]
+            total[0] += sign
+            total[1] += sign * (order.amount or 0)
+            if sign > 0 and order.time is not None and (total[2] is None or order.time > total[2]):
+                total[2] = order.time
+            if sign < 0:
+                lost_orders.add(order.customer_id)
+        rows = [
+            {"customer_id": customer_id, "order_count": count, "total_amount": amount, "last_order_at": last}
+            for customer_id, (count, amount, last) in sorted(totals.items())
+            if count or amount or last
+        ]
+        if rows:
+            query = insert(self.model).values(rows)
+            query = query.on_conflict_do_update(
+                index_elements=["customer_id"],
+                set_={
+                    "order_count": self.model.order_count + query.excluded.order_count,
+                    "total_amount": self.model.total_amount + query.excluded.total_amount,
+                    "last_order_at": func.greatest(self.model.last_order_at, query.excluded.last_order_at),
+                },
+            )
+            await async_db.execute(query)
+        if lost_orders:
+            await async_db.flush()
+            await async_db.execute(
+                update(self.model)
+                .where(self.model.customer_id.in_(lost_orders))
+                .values(last_order_at=self._latest_order_time())
+            )
+
+    def _latest_order_time(self):
+        return (
+            select(func.max(Order.time))
+            .where(Order.customer_id == self.model.customer_id)
+            .scalar_subquery()
+        )
+
+    async def get_summary(self, async_db: AsyncSession, customer_id: int) -> Union[ModelType, None]:
+        return await async_db.get(self.model, customer_id)
+
+    async def rebuild(self, async_db: AsyncSession, customer_id: Union[int, None] = None) -> int:
+        """Recompute summaries from the orders table, for one customer or for all of them."""
+        query = delete(self.model)
+        source = (
+            select(Order.customer_id, func.count(), func.coalesce(func.sum(Order.amount), 0), func.max(Order.time))
+            .group_by(Order.customer_id)
+        )
+        if customer_id is not None:
+            query = query.where(self.model.customer_id == customer_id)
+            source = source.where(Order.customer_id == customer_id)
+        await async_db.execute(query)
+        result = await async_db.execute(
+            sa_insert(self.model).from_select(
+                ["customer_id", "order_count", "total_amount", "last_order_at"], source
+            )
+        )
+        await async_db.commit()
+        return result.rowcount
+
+
+customer_summary = CRUDCustomerSummary(CustomerOrderSummary)
+
+
+# repair job: python -m src.main.customer.summary [--customer-id ID]
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute customer order summaries from the orders table")
+    parser.add_argument("--customer-id", type=int, help="repair a single customer instead of all of them")
+    args = parser.parse_args()
+
+    async def run() -> int:
+        async with async_session_local() as session:
+            return await customer_summary.rebuild(session, args.customer_id)
+
+    started_at = datetime.now()
+    rebuilt = asyncio.run(run())
+    print(f"Rebuilt {rebuilt} customer summaries in {(datetime.now() - started_at).total_seconds():.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import time
+from typing import Union
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Checkout wait time, timeouts and connection churn of a connection pool."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_time_sum = 0.0
+        self.wait_time_max = 0.0
+
+    def observe_checkout(self, wait_time: float) -> None:
+        self.checkouts += 1
+        self.wait_time_sum += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+
+    def as_dict(self) -> dict[str, Union[int, float]]:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "waiting": self.waiting,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "wait_time_avg": self.wait_time_sum / self.checkouts if self.checkouts else 0.0,
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long each checkout waited for a connection.
+
+    The time is measured around taking a connection out of the queue, which
+    includes opening a new one while the pool can still overflow and waiting
+    up to `pool_timeout` once it cannot. Checkouts that time out are counted
+    instead.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    # keep the stats when the engine replaces its pool, e.g. after a disconnect
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        self.stats.waiting += 1
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.waiting -= 1
+        self.stats.observe_checkout(time.perf_counter() - started_at)
+        return record
+
+
+# count new and discarded connections of an engine built on InstrumentedQueuePool
+def instrument_pool(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        engine.pool.stats.connects += 1
+
+    @event.listens_for(engine.sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        engine.pool.stats.invalidations += 1
+
+
+# current occupancy of the engine's pool next to its cumulative stats
+def pool_status(engine: AsyncEngine) -> dict[str, Union[int, float]]:
+    pool = engine.pool
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.as_dict())
+    return status
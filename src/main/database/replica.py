@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import Union
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..config import Settings, get_settings
+from ..core.metrics import registry, stats_families
+from .session import async_session_local, replica_session_local
+
+settings: Settings = get_settings()
+log = logging.getLogger("uvicorn")
+
+# set on the response to a write; holds the time until which the client reads from the primary
+PRIMARY_COOKIE = "read_primary_until"
+
+# seconds the replica's replay is behind the primary; 0 on a caught-up replica or a plain database
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class RoutingStats:
+    """Where read sessions were routed and why the primary served them."""
+
+    def __init__(self) -> None:
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.lagging_reads = 0
+        self.lag: Union[float, None] = None
+
+    def as_dict(self) -> dict[str, Union[int, float, None]]:
+        return {
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "lagging_reads": self.lagging_reads,
+            "lag": self.lag,
+        }
+
+
+class ReplicaRouter:
+    """
+    Picks the database a read-only request is served from.
+
+    Reads go to the replica unless none is configured, the client wrote within
+    the read-your-writes window (tracked in a cookie set on its writes), or the
+    replica is more than `max_lag` seconds behind. Reads route on the last
+    measured lag; once it is `check_interval` seconds old a probe is started in
+    the background, so no request waits on it. A probe that fails or takes
+    longer than `check_timeout` seconds marks the replica as lagging until the
+    next one succeeds.
+    """
+
+    def __init__(
+            self,
+            primary: async_sessionmaker,
+            replica: Union[async_sessionmaker, None],
+            max_lag: float = 5.0,
+            check_interval: float = 2.0,
+            sticky_window: float = 10.0,
+            check_timeout: float = 1.0,
+    ) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_window = sticky_window
+        self.check_timeout = check_timeout
+        self.stats = RoutingStats()
+        self._checked_at = 0.0
+        self._probe: Union[asyncio.Task, None] = None
+
+    async def measure_lag(self) -> float:
+        async with self.replica() as session:
+            return float((await session.execute(LAG_QUERY)).scalar())
+
+    async def refresh_lag(self) -> None:
+        try:
+            self.stats.lag = await asyncio.wait_for(self.measure_lag(), timeout=self.check_timeout)
+        except Exception as e:
+            log.warning(f"Replica lag check failed: {e!r}")
+            self.stats.lag = None
+        finally:
+            self._checked_at = time.monotonic()
+
+    # the last measured lag, starting a probe in the background when it is due
+    def lag(self) -> Union[float, None]:
+        if self._probe is None and time.monotonic() - self._checked_at >= self.check_interval:
+            self._probe = asyncio.create_task(self.refresh_lag())
+            self._probe.add_done_callback(self._probe_done)
+        return self.stats.lag
+
+    def _probe_done(self, probe: asyncio.Task) -> None:
+        self._probe = None
+
+    # the client wrote recently enough that the replica may not have its write yet
+    def is_sticky(self, request: Request) -> bool:
+        try:
+            return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def mark_write(self, response: Response) -> None:
+        response.set_cookie(
+            PRIMARY_COOKIE, f"{time.time() + self.sticky_window:.3f}",
+            max_age=max(1, int(self.sticky_window)), httponly=True, samesite="lax"
+        )
+
+    async def sessionmaker_for(self, request: Request) -> async_sessionmaker:
+        if self.replica is None:
+            self.stats.primary_reads += 1
+            return self.primary
+        if self.is_sticky(request):
+            self.stats.sticky_reads += 1
+            self.stats.primary_reads += 1
+            return self.primary
+        lag = self.lag()
+        if lag is None or lag > self.max_lag:
+            self.stats.lagging_reads += 1
+            self.stats.primary_reads += 1
+            return self.primary
+        self.stats.replica_reads += 1
+        return self.replica
+
+    async def session_for(self, request: Request) -> AsyncSession:
+        return (await self.sessionmaker_for(request))()
+
+
+replica_router = ReplicaRouter(
+    async_session_local,
+    replica_session_local,
+    max_lag=settings.REPLICA_MAX_LAG,
+    check_interval=settings.REPLICA_LAG_CHECK_INTERVAL,
+    sticky_window=settings.READ_YOUR_WRITES_WINDOW,
+    check_timeout=settings.REPLICA_LAG_CHECK_TIMEOUT,
+)
+registry.register_collector(lambda: stats_families(
+    "replica_routing", "read session routing", [({}, replica_router.stats.as_dict())],
+    counters=("replica_reads", "primary_reads", "sticky_reads", "lagging_reads"),
+))
@@ -1,11 +1,57 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 
 from ..config import Settings, get_settings
+from ..core.metrics import instrument_engine, registry, stats_families
+from ..core.profiler import install_profiler
+from .pool import InstrumentedQueuePool, instrument_pool, pool_status
 
 settings: Settings = get_settings()
 
+
+# create an Asynchronous engine with the pool configured in settings; `name` labels its metrics
+def build_engine(url: str, name: str = "primary") -> AsyncEngine:
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args = {
+            # asyncpg's own statement cache and SQLAlchemy's cache of prepared statements per connection;
+            # set both to 0 behind a transaction-mode pgbouncer
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    instrument_pool(engine)
+    instrument_engine(engine.sync_engine, name)
+    if settings.QUERY_PROFILER_ENABLED:
+        install_profiler(engine.sync_engine)
+    return engine
+
+
 # create Asynchronous engine and session
-async_engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)  # type: ignore
+async_engine = build_engine(settings.SQLALCHEMY_DATABASE_URI)  # type: ignore
 async_session_local = async_sessionmaker(async_engine, expire_on_commit=False)
 
+# read-only engine and session on a streaming replica; without one, reads go to the primary
+replica_engine = build_engine(settings.SQLALCHEMY_REPLICA_URI, "replica") if settings.SQLALCHEMY_REPLICA_URI else None
+replica_session_local = async_sessionmaker(replica_engine, expire_on_commit=False) if replica_engine else None
+
+
+# rows read through a replica session may predate the latest write
+def is_replica_session(session: AsyncSession) -> bool:
+    return replica_engine is not None and session.bind is replica_engine
+
 
+registry.register_collector(lambda: stats_families(
+    "db_pool", "database connection pool",
+    [({"database": name}, pool_status(engine))
+     for name, engine in (("primary", async_engine), ("replica", replica_engine)) if engine is not None],
+    counters=("checkouts", "timeouts", "connects", "invalidations"),
+))
@@ -1,10 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+import logging
 import sys
 import os
 # from .routes import router as api_router
 # from customer.routes import router
 from src.main.database.session import async_session_local, async_engine
 from src.main.database.base import Base
+from src.main.database.replica import replica_router
+from src.main.core.metrics import MetricsMiddleware
+from src.main.core.profiler import QueryProfilerMiddleware
+from src.main.config import get_settings
+from src.main.core.rabbitmq import publisher
+from src.main.auth.jwt_security import password_hasher
+from src.main.outbox.relay import relay
+from src.main.orders.partitions import partition_maintainer
+from src.main.customer.importer import import_jobs, shutdown_hash_pool
 from src.main.customer.routes import router as customer_router
 from src.main.auth.routes import router as auth_router
 from src.main.orders.routes import router as order_router
@@ -16,21 +26,65 @@ from src.main.router.router import router as test
 # print(f"SECRET_KEY loaded from env: {os.getenv('SECRET_KEY')}")
 # # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+log = logging.getLogger("uvicorn")
+
 # Initialize the FastAPI application
 app = FastAPI(title="FastAPI Main Service")
 
+# latency, status and DB, Redis and bcrypt time per route, served on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# every statement of a request with its call site, and warnings about repeats, N+1 patterns and lazy loads
+if get_settings().QUERY_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware, n_plus_one_threshold=get_settings().QUERY_PROFILER_N_PLUS_ONE_THRESHOLD)
+
 app.include_router(auth_router, tags=["AUTH"])
 app.include_router(customer_router, tags=["CUSTOMERS"])
 app.include_router(order_router, tags=["ORDERS"])
 app.include_router(test, tags=["TEST"])
 
 
+# send a client's reads to the primary for a while after it writes, so it sees its own writes
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if replica_router.replica is not None and request.method not in ("GET", "HEAD", "OPTIONS") \
+            and response.status_code < 400:
+        replica_router.mark_write(response)
+    return response
+
+
 @app.on_event("startup")
 async def startup_event():
     # Use async engine directly to create tables
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # tune the bcrypt cost to this machine before serving logins
+    rounds = await password_hasher.calibrate()
+    log.info(f"bcrypt cost set to {rounds}")
+
+    # open the long-lived RabbitMQ connection; publishing reconnects lazily if this fails
+    try:
+        await publisher.start()
+    except Exception as e:
+        log.warning(f"Failed to connect to RabbitMQ: {e}")
+
+    # drain order events committed to the outbox
+    relay.start()
+
+    # keep monthly order partitions created ahead of time
+    partition_maintainer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await partition_maintainer.stop()
+    await import_jobs.stop()
+    shutdown_hash_pool()
+    await relay.stop()
+    await publisher.stop()
+
 
 if __name__ == '__main__':
     app.run("main:app", debug=True, host='0.0.0.0')
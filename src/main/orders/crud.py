@@ -1,17 +1,28 @@
-import json
-
+import logging
 from datetime import datetime
-from typing import Any, Union, Generic, Type, TypeVar
-from django.core.cache.backends import redis
-import redis.asyncio as redis
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Union, Generic, Type, TypeVar
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import func, insert, inspect, select
+from sqlalchemy.exc import SQLAlchemyError
 
 from .model import Order
 from . import model as order_model, schema as order_schema
 from src.main.database import Base
+from src.main.customer.model import Customer
+from src.main.core.cache import QueryCache
+from src.main.core.pagination import keyset_query
+from src.main.outbox.crud import outbox as outbox_crud, ORDER_CREATED
+from src.main.analytics.crud import order_rollup as rollup_crud
+from src.main.customer.crud import customer as customer_crud
+from src.main.customer.summary import customer_summary as summary_crud
+from src.main.database.session import is_replica_session
+from src.main.config import Settings, get_settings
+
+settings: Settings = get_settings()
+log = logging.getLogger("uvicorn")
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -21,6 +32,7 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 class CRUDOrder(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]) -> None:
         self.model = model
+        self.cache = QueryCache("orders", ttl=settings.ORDERS_CACHE_TTL)
 
     # Create order
     async def create_order(
@@ -34,28 +46,166 @@ class CRUDOrder(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         async with async_db as session:
             db_order = self.model(**order_data)
             session.add(db_order)
+            await session.flush()
+
+            # the order-created event is committed atomically with the order
+            outbox_crud.add_event(session, event_type=ORDER_CREATED, payload=self.event_payload(db_order))
+            await rollup_crud.apply(session, [(db_order, 1)])
+            await summary_crud.apply(session, [(db_order, 1)])
             await session.commit()
             await session.refresh(db_order)
+            await self.invalidate_customers({db_order.customer_id})
             return db_order
 
+    # Create many orders of `current_user`, one multi-row INSERT ... RETURNING per chunk
+    async def create_orders_bulk(
+        self, *, async_db: AsyncSession, objs_in: list[order_schema.OrderCreate], current_user: Any,
+        chunk_size: int = None
+    ) -> list[order_schema.BulkOrderResult]:
+        chunk_size = chunk_size or settings.ORDERS_BULK_CHUNK_SIZE
+        rows = [obj_in.model_dump(exclude_unset=True) for obj_in in objs_in]
+        results: list[Union[order_schema.BulkOrderResult, None]] = [None] * len(rows)
+        touched_customers = set()
+
+        async with async_db as session:
+            # check each distinct customer once instead of once per order; only the user's own orders are created
+            owned = {row["customer_id"] for row in rows if row["customer_id"] == current_user.id}
+            found = await session.execute(select(Customer.id).where(Customer.id.in_(owned)))
+            known_customers = set(found.scalars().all())
+
+            valid = []
+            for index, row in enumerate(rows):
+                if row["customer_id"] != current_user.id:
+                    results[index] = order_schema.BulkOrderResult(
+                        index=index, success=False,
+                        error=f"You do not have permission to create an order for customer {row['customer_id']}"
+                    )
+                elif row["customer_id"] in known_customers:
+                    valid.append(index)
+                else:
+                    results[index] = order_schema.BulkOrderResult(
+                        index=index, success=False, error=f"Customer {row['customer_id']} not found"
+                    )
+
+            for start in range(0, len(valid), chunk_size):
+                chunk = valid[start:start + chunk_size]
+                try:
+                    # a savepoint per chunk, so one failing chunk does not undo the others
+                    async with session.begin_nested():
+                        created = (await session.scalars(
+                            insert(self.model).returning(self.model, sort_by_parameter_order=True),
+                            [rows[index] for index in chunk],
+                        )).all()
+                        await outbox_crud.add_events(
+                            session, event_type=ORDER_CREATED, payloads=[self.event_payload(o) for o in created]
+                        )
+                        await rollup_crud.apply(session, [(db_order, 1) for db_order in created])
+                        await summary_crud.apply(session, [(db_order, 1) for db_order in created])
+                except SQLAlchemyError:
+                    # the database error may name tables and constraints, so it stays in the log
+                    log.exception(f"Bulk insert of orders {chunk[0]}-{chunk[-1]} failed")
+                    for index in chunk:
+                        results[index] = order_schema.BulkOrderResult(
+                            index=index, success=False, error="could not insert order"
+                        )
+                    continue
+
+                for index, db_order in zip(chunk, created):
+                    results[index] = order_schema.BulkOrderResult(
+                        index=index, success=True, order=order_schema.Order.model_validate(db_order)
+                    )
+                    touched_customers.add(db_order.customer_id)
+                # commit per chunk so the rollup and summary rows are not locked for the whole batch
+                await session.commit()
+
+        await self.invalidate_customers(touched_customers)
+        return results
+
+    # drop cached order listings and customer summaries after orders of these customers changed
+    async def invalidate_customers(self, customer_ids: set[int]) -> None:
+        for customer_id in customer_ids:
+            await self.cache.invalidate(customer_id)
+            await customer_crud.cache.invalidate(str(customer_id))
+
+    # the fields rollups are keyed on, as they are now
+    @staticmethod
+    def rollup_snapshot(db_order: order_model.Order) -> SimpleNamespace:
+        return SimpleNamespace(
+            time=db_order.time, customer_id=db_order.customer_id, item=db_order.item, amount=db_order.amount
+        )
+
+    # order data for the order-created message
+    @staticmethod
+    def event_payload(db_order: order_model.Order) -> dict[str, Any]:
+        return {
+            "order_id": db_order.id,
+            "item": db_order.item,
+            "amount": db_order.amount,
+            "phone_number": db_order.phone_number
+        }
+
     # get orders bt date range
     async def get_orders_by_date_range(
             self,
             *,
-            async_db: AsyncSession, start_date: datetime, end_date: datetime, skip: int = 0, limit: int = 100
+            async_db: AsyncSession, start_date: datetime, end_date: datetime, skip: int = 0, limit: int = 100,
+            cursor: str = None
     ) -> list[order_model.Order]:
         query = select(self.model).where(self.model.time.between(start_date, end_date))
-        query = query.offset(skip).limit(limit)
+        query = keyset_query(query, self.model, "time", "asc", cursor)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
         result = await async_db.execute(query)
         return list(result.scalars().all())
 
+    # stream orders in a date range through a server-side cursor, `batch_size` rows per fetch
+    async def stream_orders_by_date_range(
+            self, *, async_db: AsyncSession, start_date: datetime, end_date: datetime, batch_size: int = 1000
+    ) -> AsyncIterator[dict[str, Any]]:
+        columns = [self.model.id, self.model.item, self.model.amount, self.model.time,
+                   self.model.phone_number, self.model.customer_id]
+        query = (
+            select(*columns)
+            .where(self.model.time.between(start_date, end_date))
+            .order_by(self.model.time, self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await async_db.stream(query)
+        async for row in result.mappings():
+            yield row
+
+    # LIKE pattern for an item search, with the user's wildcards taken literally
+    @staticmethod
+    def item_pattern(q: str, prefix: bool = False) -> str:
+        escaped = q.replace("/", "//").replace("%", "/%").replace("_", "/_")
+        return f"{escaped}%" if prefix else f"%{escaped}%"
+
+    # search items by substring, or by prefix, best matches first
+    async def search_items(
+            self,
+            *,
+            async_db: AsyncSession,
+            q: str,
+            prefix: bool = False,
+            customer_id: int = None,
+            skip: int = 0,
+            limit: int = 20
+    ) -> list[tuple[order_model.Order, float]]:
+        # both patterns are answered by the pg_trgm GIN index on item; similarity ranks the matches
+        rank = func.similarity(self.model.item, q).label("rank")
+        query = select(self.model, rank).where(self.model.item.ilike(self.item_pattern(q, prefix), escape="/"))
+        if customer_id:
+            query = query.where(self.model.customer_id == customer_id)
+        query = query.order_by(rank.desc(), self.model.id).offset(skip).limit(limit)
+        result = await async_db.execute(query)
+        return [(row[0], row[1]) for row in result.all()]
+
     # get order by order id
     async def get_order(self, async_db: AsyncSession, order_id: int) -> order_model.Order | None:
         result = await async_db.execute(select(self.model).where(self.model.id == order_id))
         return result.scalars().first()
 
-    redis_client = redis.Redis.from_url("redis://localhost")
-
     # Catching, Pagination and Sorting
     async def get_orders(
             self,
@@ -67,15 +217,23 @@ class CRUDOrder(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             item: str = None,
             sort_by: str = "time",
             order: str = "asc",
-            use_cache: bool = True,
-            cache_key: str = "orders"
+            cursor: str = None,
+            item_prefix: bool = False,
+            use_cache: bool = True
     ) -> list[order_model.Order]:
 
-        # Check cache first
+        # Check cache first, keyed by every filter and paging parameter
+        cache_key = None
         if use_cache:
-            cached_data = await redis.get(cache_key)
-            if cached_data:
-                return json.loads(cached_data)
+            params = {
+                "skip": skip, "limit": limit, "customer_id": customer_id, "item": item,
+                "item_prefix": item_prefix, "sort_by": sort_by, "order": order, "cursor": cursor,
+            }
+            cache_key = await self.cache.build_key(params, scope=customer_id)
+            if cache_key:
+                cached_data = await self.cache.get(cache_key)
+                if cached_data is not None:
+                    return cached_data
 
         # Start building the query
         query = select(self.model)
@@ -84,24 +242,23 @@ class CRUDOrder(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if customer_id:
             query = query.where(self.model.customer_id == customer_id)
         if item:
-            query = query.where(self.model.item.ilike(f"%{item}%"))
+            query = query.where(self.model.item.ilike(self.item_pattern(item, item_prefix), escape="/"))
 
-        # Apply sorting
-        if order == "desc":
-            query = query.order_by(getattr(self.model, sort_by).desc())
-        else:
-            query = query.order_by(getattr(self.model, sort_by).asc())
+        # Apply sorting, and the cursor position when paging by keyset
+        query = keyset_query(query, self.model, sort_by, order, cursor)
 
         # Add pagination
-        query = query.offset(skip).limit(limit)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
 
         result = await async_db.execute(query)
         orders = list(result.scalars().all())
 
-        # Cache the result if caching is enabled
-        if use_cache:
-            await redis.set(cache_key, json.dumps([jsonable_encoder(order) for order in orders]),
-                            ex=60)  # Cache for 60 seconds
+        # Cache the result if caching is enabled; only primary reads, or a lagging replica
+        # would store rows from before a write under the generation that write started
+        if cache_key and not is_replica_session(async_db):
+            await self.cache.set(cache_key, [jsonable_encoder(order) for order in orders])
 
         return orders
 
@@ -109,16 +266,21 @@ class CRUDOrder(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     async def update_order(
             self, async_db: AsyncSession, db_obj: order_model.Order, obj_in: Union[order_schema.OrderUpdate, dict[str, Any]]
     ) -> order_model.Order:
-        obj_data = jsonable_encoder(db_obj)
         update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        previous = self.rollup_snapshot(db_obj)
 
-        for field in obj_data:
+        # the mapped columns only: encoding the object would walk any relationship already loaded on it
+        for field in inspect(db_obj).mapper.column_attrs.keys():
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
 
+        # move the order's contribution from its old buckets to its new ones
         async_db.add(db_obj)
+        await rollup_crud.apply(async_db, [(previous, -1), (db_obj, 1)])
+        await summary_crud.apply(async_db, [(previous, -1), (db_obj, 1)])
         await async_db.commit()
         await async_db.refresh(db_obj)
+        await self.invalidate_customers({previous.customer_id, db_obj.customer_id})
         return db_obj
 
     # delete oder by id
@@ -126,7 +288,10 @@ class CRUDOrder(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         order = await self.get_order(async_db, order_id)
         if order:
             await async_db.delete(order)
+            await rollup_crud.apply(async_db, [(self.rollup_snapshot(order), -1)])
+            await summary_crud.apply(async_db, [(self.rollup_snapshot(order), -1)])
             await async_db.commit()
+            await self.invalidate_customers({order.customer_id})
         return order
 
 
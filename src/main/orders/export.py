@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_COLUMNS = ("id", "item", "amount", "time", "phone_number", "customer_id")
+
+# bytes gathered before a chunk is sent to the client
+CHUNK_SIZE = 64 * 1024
+
+
+async def _chunked(lines: AsyncIterable[str]) -> AsyncIterator[bytes]:
+    buffer, size = [], 0
+    async for line in lines:
+        data = line.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def _ndjson_lines(rows: AsyncIterable[dict[str, Any]]) -> AsyncIterator[str]:
+    async for row in rows:
+        yield json.dumps(jsonable_encoder(row), separators=(",", ":")) + "\n"
+
+
+async def _csv_lines(rows: AsyncIterable[dict[str, Any]]) -> AsyncIterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_COLUMNS)
+    async for row in rows:
+        writer.writerow(
+            row[column].isoformat() if hasattr(row[column], "isoformat") else row[column]
+            for column in EXPORT_COLUMNS
+        )
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue()
+
+
+def encode_rows(rows: AsyncIterable[dict[str, Any]], fmt: str) -> AsyncIterator[bytes]:
+    lines = _ndjson_lines(rows) if fmt == "ndjson" else _csv_lines(rows)
+    return _chunked(lines)
+
+
+# gzip a byte stream chunk by chunk
+async def gzip_stream(chunks: AsyncIterable[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import ForeignKey, TIMESTAMP
+from sqlalchemy import DDL, ForeignKey, Index, TIMESTAMP, event
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 
 from ..database.base import Base
@@ -11,9 +11,25 @@ class Order(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     item: Mapped[str] = mapped_column(index=True, nullable=True)
     amount: Mapped[int] = mapped_column(index=True, nullable=True)
-    time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), index=True, nullable=True)
-    phone_number: Mapped[int] = mapped_column(index=True)
+    # partition key of the orders table (see alembic revision 0004)
+    time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), index=True)
+    phone_number: Mapped[str] = mapped_column(index=True)
     customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id"), index=True)
 
     customer = relationship("Customer", back_populates="orders") #  relationship between customer and order table
 
+    # keyset pagination walks (sort column, id) pairs
+    __table_args__ = (
+        Index("ix_orders_time_id", "time", "id"),
+        Index("ix_orders_customer_id_time_id", "customer_id", "time", "id"),
+        # serves ILIKE '%x%' and similarity ranking on item
+        Index("ix_orders_item_trgm", "item", postgresql_using="gin", postgresql_ops={"item": "gin_trgm_ops"}),
+    )
+
+
+# the trigram index needs pg_trgm before create_all builds the table
+event.listen(
+    Order.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.main.config import Settings, get_settings
+from src.main.database.session import async_engine
+
+settings: Settings = get_settings()
+log = logging.getLogger("uvicorn")
+
+PARENT_TABLE = "orders"
+DEFAULT_PARTITION = "orders_default"
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT_TABLE}_y{start.year:04d}m{start.month:02d}"
+
+
+# the monthly partitions needed to cover `months_ahead` months past `now`, after `covered_until`
+def missing_months(now: datetime, months_ahead: int, covered_until: Union[datetime, None]) -> list[datetime]:
+    first = month_start(now)
+    if covered_until is not None and covered_until > first:
+        first = month_start(covered_until)
+        # a bound inside a month leaves the rest of that month to its own partition
+        if first < covered_until:
+            first = add_months(first, 1)
+    last = add_months(month_start(now), months_ahead)
+    months = []
+    while first <= last:
+        months.append(first)
+        first = add_months(first, 1)
+    return months
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+    ), {"table": PARENT_TABLE})
+    return result.scalar() is not None
+
+
+# end of the range covered by the existing partitions, the default partition aside
+async def covered_until(conn: AsyncConnection) -> Union[datetime, None]:
+    result = await conn.execute(text(
+        "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": PARENT_TABLE})
+    bounds = []
+    for (expression,) in result.all():
+        match = _UPPER_BOUND.search(expression or "")
+        if match:
+            bounds.append(datetime.fromisoformat(match.group(1)))
+    return max(bounds, default=None)
+
+
+async def _default_has_rows(conn: AsyncConnection, start: datetime, end: datetime) -> bool:
+    if (await conn.execute(text("SELECT to_regclass(:table)"), {"table": DEFAULT_PARTITION})).scalar() is None:
+        return False
+    result = await conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE time >= :start AND time < :end)"),
+        {"start": start, "end": end},
+    )
+    return bool(result.scalar())
+
+
+async def create_partition(conn: AsyncConnection, start: datetime) -> str:
+    """
+    Create the partition of orders for the month starting at `start`.
+
+    Order times come from clients, so the default partition may already hold
+    rows of that month, and Postgres refuses a partition whose range the
+    default partition has rows in. Those rows are moved into a table of the
+    new partition's shape first, which is then attached, all in the caller's
+    transaction.
+    """
+    name = partition_name(start)
+    end = add_months(start, 1)
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    if not await _default_has_rows(conn, start, end):
+        await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+        return name
+
+    params = {"start": start, "end": end}
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = await conn.execute(
+        text(f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE time >= :start AND time < :end RETURNING *) "
+             f"INSERT INTO {name} SELECT * FROM moved"),
+        params,
+    )
+    # the range constraint lets ATTACH skip scanning the table it was just filled from
+    await conn.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_range CHECK (time >= '{start.isoformat()}' AND time < '{end.isoformat()}')"
+    ))
+    await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+    await conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_range"))
+    log.info(f"Moved {moved.rowcount} orders from {DEFAULT_PARTITION} into {name}")
+    return name
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int = 3) -> list[str]:
+    """
+    Create the monthly partitions of orders from the current month to `months_ahead` months out.
+
+    Partitions are created back to back from the end of the range already
+    covered, so they never overlap the partition the migration made of the
+    pre-existing rows. Returns the names of the partitions created; does
+    nothing when orders is not partitioned yet.
+    """
+    if not await is_partitioned(conn):
+        return []
+    created = []
+    for start in missing_months(datetime.now(timezone.utc), months_ahead, await covered_until(conn)):
+        created.append(await create_partition(conn, start))
+    return created
+
+
+class PartitionMaintainer:
+    """Background task that keeps future monthly partitions of orders in place, checking every `interval` seconds."""
+
+    def __init__(self, engine: AsyncEngine, months_ahead: int = 3, interval: float = 6 * 3600) -> None:
+        self.engine = engine
+        self.months_ahead = months_ahead
+        self.interval = interval
+        self._task: Union[asyncio.Task, None] = None
+
+    async def run_once(self) -> list[str]:
+        async with self.engine.begin() as conn:
+            created = await ensure_partitions(conn, self.months_ahead)
+        if created:
+            log.info(f"Created order partitions: {', '.join(created)}")
+        return created
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                log.error(f"Order partition maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+partition_maintainer = PartitionMaintainer(async_engine, months_ahead=settings.ORDERS_PARTITION_MONTHS_AHEAD)
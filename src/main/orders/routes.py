@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing_extensions import List
 
 from . import crud as order_crud, schema as order_schema
-from ..core.dependencies import get_session
-from src.main.core.rabbitmq import publish_order_created_message
+from .export import EXPORT_FORMATS, encode_rows, gzip_stream
+from ..core.dependencies import get_read_session, get_session
+from ..database.replica import replica_router
+from ..analytics import schema as analytics_schema
+from ..analytics.crud import GRAINS, order_rollup
+from ..core.pagination import NEXT_CURSOR_HEADER, next_cursor
+from src.main.outbox.relay import relay
 from src.main.auth import dependencies
 from src.main.auth import model
+from src.main.config import Settings, get_settings
+
+settings: Settings = get_settings()
 
 router = APIRouter()
 
@@ -27,39 +36,143 @@ async def create_order(
             )
         order = await order_crud.order.create_order(async_db=session, obj_in=order)
 
-        # order data for rabbitMQ message
-        order_event_data = {
-            "order_id": order.id,
-            "item": order.item,
-            "amount": order.amount,
-            "phone_number": order.phone_number
-        }
-        # publish the order created event to RabbitMQ
-        publish_order_created_message(order_event_data)
+        # the order created event was written to the outbox with the order; wake the relay
+        relay.notify()
     return order
 
 
+# create many orders at once, reporting the outcome of each
+@router.post("/orders/bulk", response_model=order_schema.BulkOrderResponse)
+async def create_orders_bulk(
+        orders: List[order_schema.OrderCreate], async_db: AsyncSession = Depends(get_session),
+        current_user: model.User = Depends(dependencies.get_current_user)
+):
+    if not current_user.email:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to create an order"
+        )
+    if len(orders) > settings.ORDERS_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.ORDERS_BULK_MAX_ITEMS} orders per request"
+        )
+    async with async_db as session:
+        results = await order_crud.order.create_orders_bulk(
+            async_db=session, objs_in=orders, current_user=current_user
+        )
+
+    # the events were written to the outbox in the same transaction; the relay publishes them as one batch
+    created = sum(1 for result in results if result.success)
+    if created:
+        relay.notify()
+    return order_schema.BulkOrderResponse(created=created, failed=len(results) - created, results=results)
+
+
 # Get order by date range
 @router.get("/orders/search", response_model=List[order_schema.Order])
 async def get_orders_by_date_range(
     start_date: datetime,
     end_date: datetime,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    async_db: AsyncSession = Depends(get_session)
+    cursor: str = None,
+    async_db: AsyncSession = Depends(get_read_session)
 ):
     async with async_db as session:
         orders = await order_crud.order.get_orders_by_date_range(
-            async_db=session, start_date=start_date, end_date=end_date, skip=skip, limit=limit
+            async_db=session, start_date=start_date, end_date=end_date, skip=skip, limit=limit, cursor=cursor
     )
+    # pass the cursor back to page on by keyset instead of skip
+    page_cursor = next_cursor(orders, "time", "asc", limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
     return orders
 
 
+# Search order items by substring or prefix, best matches first
+@router.get("/orders/search/items", response_model=List[order_schema.OrderSearchResult])
+async def search_order_items(
+    q: str,
+    prefix: bool = False,
+    customer_id: int = None,
+    skip: int = 0,
+    limit: int = 20,
+    async_db: AsyncSession = Depends(get_read_session)
+):
+    if not q.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="q must not be empty")
+    async with async_db as session:
+        matches = await order_crud.order.search_items(
+            async_db=session, q=q, prefix=prefix, customer_id=customer_id, skip=skip, limit=limit
+        )
+        return [
+            order_schema.OrderSearchResult(**order_schema.Order.model_validate(db_order).model_dump(), rank=rank)
+            for db_order, rank in matches
+        ]
+
+
+# Order count and revenue per hour or day, optionally per customer or item, from the rollup tables
+@router.get("/orders/stats", response_model=List[analytics_schema.OrderStatsBucket])
+async def get_order_stats(
+    bucket: str = "day",
+    group_by: str = None,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    key: str = None,
+    limit: int = 1000,
+    async_db: AsyncSession = Depends(get_read_session)
+):
+    if bucket not in GRAINS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="bucket must be hour or day")
+    if group_by not in (None, "customer", "item"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="group_by must be customer or item")
+    async with async_db as session:
+        return await order_rollup.get_stats(
+            session, bucket=bucket, group_by=group_by, start_date=start_date, end_date=end_date,
+            key=key, limit=limit
+        )
+
+
+# Export every order in a date range as NDJSON or CSV, streamed as it is read
+@router.get("/orders/export")
+async def export_orders(
+    request: Request,
+    start_date: datetime,
+    end_date: datetime,
+    format: str = "ndjson"
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of {', '.join(EXPORT_FORMATS)}"
+        )
+
+    # the session has to outlive this handler, so the stream opens its own
+    session_local = await replica_router.sessionmaker_for(request)
+
+    async def rows():
+        async with session_local() as session:
+            async for row in order_crud.order.stream_orders_by_date_range(
+                async_db=session, start_date=start_date, end_date=end_date,
+                batch_size=settings.ORDERS_EXPORT_BATCH_SIZE
+            ):
+                yield row
+
+    body = encode_rows(rows(), format)
+    headers = {"Content-Disposition": f'attachment; filename="orders.{format}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format], headers=headers)
+
+
 # Get order by id
 @router.get("/orders/{order_id}", response_model=order_schema.Order)
 async def get_order_by_id(
     order_id: int,
-    async_db: AsyncSession = Depends(get_session)
+    async_db: AsyncSession = Depends(get_read_session)
 ):
     async with async_db as session:
         order = await order_crud.order.get_order(async_db=session, order_id=order_id)
@@ -71,26 +184,34 @@ async def get_order_by_id(
 # get order by customer id
 @router.get("/orders", response_model=List[order_schema.Order])
 async def get_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     customer_id: int = None,
     item: str = None,
+    item_prefix: bool = False,
     sort_by: str = "time",
     order: str = "asc",
+    cursor: str = None,
     use_cache: bool = True,
-    async_db: AsyncSession = Depends(get_session)
+    async_db: AsyncSession = Depends(get_read_session)
 ):
     async with async_db as session:
         orders = await order_crud.order.get_orders(
-            session,
+            async_db=session,
             skip=skip,
             limit=limit,
             customer_id=customer_id,
             item=item,
+            item_prefix=item_prefix,
             sort_by=sort_by,
             order=order,
+            cursor=cursor,
             use_cache=use_cache
         )
+    page_cursor = next_cursor(orders, sort_by, order, limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
     return orders
 
 
@@ -106,8 +227,7 @@ async def update_order(
         db_order = await order_crud.order.get_order(session, order_id=order_id)
         if not db_order:
             raise HTTPException(status_code=404, detail="Order not found")
-        order = await order_crud.order.get_order(async_db=session, order_id=order_id)
-        if order.customer_id != current_user.id:
+        if db_order.customer_id != current_user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                                 detail="You do not have permission to update this order")
 
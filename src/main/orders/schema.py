@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+from typing import Optional
 
 
 # shared properties
@@ -32,6 +33,26 @@ class Order(OrderInDBBase):
     pass
 
 
+# Order matched by an item search, with its similarity to the query
+class OrderSearchResult(Order):
+    rank: float
+
+
 # properties stored in DB
 class OrderInDB(OrderInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+
+# Outcome of one item of a bulk order upload
+class BulkOrderResult(BaseModel):
+    index: int
+    success: bool
+    order: Optional[Order] = None
+    error: Optional[str] = None
+
+
+# Properties to return to client after a bulk order upload
+class BulkOrderResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkOrderResult]
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Generic, Type, TypeVar
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .model import OutboxEvent
+from ..database.base import Base
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+ORDER_CREATED = "order.created"
+
+
+class CRUDOutbox(Generic[ModelType]):
+    def __init__(self, model: Type[ModelType]) -> None:
+        self.model = model
+
+    # stage an event in the caller's transaction; it is committed with the caller's writes
+    def add_event(self, async_db: AsyncSession, *, event_type: str, payload: dict[str, Any]) -> OutboxEvent:
+        event = self.model(event_type=event_type, payload=payload)
+        async_db.add(event)
+        return event
+
+    # stage many events with one multi-row INSERT in the caller's transaction
+    async def add_events(self, async_db: AsyncSession, *, event_type: str, payloads: list[dict[str, Any]]) -> None:
+        if not payloads:
+            return
+        await async_db.execute(
+            insert(self.model).values([{"event_type": event_type, "payload": payload} for payload in payloads])
+        )
+
+    # lock a batch of unsent events, skipping rows already claimed by another relay
+    async def claim_batch(self, async_db: AsyncSession, limit: int = 100) -> list[OutboxEvent]:
+        query = (
+            select(self.model)
+            .where(self.model.sent_at.is_(None))
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await async_db.execute(query)
+        return list(result.scalars().all())
+
+    async def mark_sent(self, async_db: AsyncSession, event_ids: list[int]) -> None:
+        if not event_ids:
+            return
+        await async_db.execute(
+            update(self.model)
+            .where(self.model.id.in_(event_ids))
+            .values(sent_at=datetime.now(timezone.utc))
+        )
+
+    # delete events that were sent more than `retention` ago
+    async def purge_sent(self, async_db: AsyncSession, retention: timedelta) -> int:
+        result = await async_db.execute(
+            delete(self.model).where(self.model.sent_at < datetime.now(timezone.utc) - retention)
+        )
+        return result.rowcount
+
+
+outbox = CRUDOutbox(OutboxEvent)
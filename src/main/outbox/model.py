@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Any
+from sqlalchemy import JSON, DateTime, Index, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database.base import Base
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    event_type: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON)
+    sent_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    last_error: Mapped[str] = mapped_column(nullable=True)
+
+    # the relay only ever scans unsent rows
+    __table_args__ = (
+        Index("ix_outbox_unsent", "id", postgresql_where=text("sent_at IS NULL")),
+    )
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Union
+
+from src.main.config import Settings, get_settings
+from src.main.core.rabbitmq import OrderEventPublisher, publisher
+from src.main.database.session import async_session_local
+from .crud import outbox as outbox_crud
+
+settings: Settings = get_settings()
+log = logging.getLogger("uvicorn")
+
+
+class OutboxRelay:
+    """
+    Background task that moves committed outbox events to RabbitMQ.
+
+    Each pass claims a batch of unsent rows with FOR UPDATE SKIP LOCKED,
+    publishes them, and marks the ones the broker confirmed as sent in the
+    same transaction, so several app replicas can drain the outbox in
+    parallel without sending a row twice.
+    Writers call `notify()` after committing to wake the relay immediately;
+    otherwise it polls every `poll_interval` seconds.
+    """
+
+    purge_interval = 3600
+
+    def __init__(
+            self,
+            event_publisher: OrderEventPublisher,
+            batch_size: int = 100,
+            poll_interval: float = 1.0,
+            retention: timedelta = timedelta(hours=24),
+    ) -> None:
+        self.publisher = event_publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._wakeup = asyncio.Event()
+        self._task: Union[asyncio.Task, None] = None
+        self._last_purge = 0.0
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # publish one batch of pending events, returns how many the broker confirmed
+    async def drain_once(self) -> int:
+        async with async_session_local() as session:
+            async with session.begin():
+                events = await outbox_crud.claim_batch(session, limit=self.batch_size)
+                if not events:
+                    return 0
+                confirmed = await self.publisher.publish_batch([event.payload for event in events])
+                sent_ids = []
+                for event, ok in zip(events, confirmed):
+                    if ok:
+                        sent_ids.append(event.id)
+                    else:
+                        # left unsent; a later pass retries it
+                        event.attempts += 1
+                        event.last_error = "not confirmed by the broker"
+                await outbox_crud.mark_sent(session, sent_ids)
+        if len(sent_ids) < len(events):
+            log.warning(f"Outbox relay: {len(events) - len(sent_ids)} of {len(events)} events not confirmed")
+        return len(sent_ids)
+
+    async def _purge(self) -> None:
+        if time.monotonic() - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = time.monotonic()
+        async with async_session_local() as session:
+            async with session.begin():
+                purged = await outbox_crud.purge_sent(session, self.retention)
+        if purged:
+            log.info(f"Outbox relay purged {purged} sent events")
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                sent = await self.drain_once()
+                await self._purge()
+            except Exception as e:
+                log.error(f"Outbox relay pass failed: {e}")
+                sent = 0
+            # a full batch means more rows are probably waiting
+            if sent == self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+relay = OutboxRelay(
+    publisher,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    retention=timedelta(hours=settings.OUTBOX_RETENTION_HOURS),
+)
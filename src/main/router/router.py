@@ -1,5 +1,12 @@
 from fastapi import APIRouter
-from src.main.core.rabbitmq import test_rabbitmq_connection
+from fastapi.responses import PlainTextResponse
+from src.main.core.rabbitmq import test_rabbitmq_connection, publisher
+from src.main.core.cache import cache_stats
+from src.main.core.metrics import CONTENT_TYPE, registry
+from src.main.auth.jwt_security import password_hasher
+from src.main.database.pool import pool_status
+from src.main.database.replica import replica_router
+from src.main.database.session import async_engine, replica_engine
 
 router = APIRouter()
 
@@ -9,3 +16,42 @@ router = APIRouter()
 def test_rabbitmq_route():
     test_rabbitmq_connection()
     return {"message": "Check console for RabbitMQ connection result"}
+
+
+# hit, miss and invalidation counters of the Redis caches in this process
+@router.get("/cache-stats")
+def get_cache_stats():
+    return cache_stats()
+
+
+# in-flight depth, confirm latency and nack count of the order event publisher
+@router.get("/publisher-stats")
+def get_publisher_stats():
+    return publisher.stats.as_dict()
+
+
+# queue time and concurrency of bcrypt hashing off the event loop
+@router.get("/password-hashing-stats")
+def get_password_hashing_stats():
+    return password_hasher.stats.as_dict()
+
+
+# occupancy, checkout wait time and timeouts of the database connection pool
+@router.get("/db-pool-stats")
+def get_db_pool_stats():
+    return {
+        "primary": pool_status(async_engine),
+        "replica": pool_status(replica_engine) if replica_engine is not None else None,
+    }
+
+
+# reads served by the replica and the primary, and the replica lag last measured
+@router.get("/replica-stats")
+def get_replica_stats():
+    return replica_router.stats.as_dict()
+
+
+# every metric of this process in the Prometheus text format
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(registry.expose(), media_type=CONTENT_TYPE)
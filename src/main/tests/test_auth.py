@@ -0,0 +1,139 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.main.auth import jwt_security
+from src.main.auth.dependencies import get_current_user
+from src.main.auth.principal import PrincipalCache
+
+USER = SimpleNamespace(id=7, username="jane", email="jane@example.com", password="hash")
+
+
+def mock_session_factory():
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock()
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+@patch('src.main.auth.dependencies.principal_cache', new_callable=PrincipalCache)
+@patch('src.main.auth.dependencies.async_session_local', new_callable=mock_session_factory)
+@patch('src.main.auth.dependencies.crud')
+def test_get_current_user_queries_once_per_token(mock_crud, mock_session_local, mock_cache):
+    mock_crud.user.get_user = AsyncMock(return_value=[USER])
+    token = jwt_security.create_token(USER.id)
+
+    first = asyncio.run(get_current_user(token))
+    second = asyncio.run(get_current_user(token))
+
+    assert first.email == second.email == "jane@example.com"
+    assert not hasattr(first, "password")
+    mock_crud.user.get_user.assert_called_once()
+    assert mock_crud.user.get_user.call_args.kwargs["user_id"] == 7
+    assert mock_cache.stats.hits == 1
+
+
+def test_principal_cache_respects_token_expiry():
+    cache = PrincipalCache(ttl=60)
+    cache.set("token", SimpleNamespace(id=1), token_exp=time.time() - 1)
+
+    assert cache.get("token") is None
+
+
+def test_principal_cache_invalidates_every_token_of_a_user():
+    cache = PrincipalCache(ttl=60)
+    cache.set("a", SimpleNamespace(id=1))
+    cache.set("b", SimpleNamespace(id=1))
+    cache.set("c", SimpleNamespace(id=2))
+
+    cache.invalidate_user(1)
+
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c").id == 2
+
+
+def test_password_hasher_keeps_event_loop_responsive():
+    hasher = jwt_security.PasswordHasher(max_workers=2)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        hashes = await asyncio.gather(*(hasher.hash(f"secret{i}") for i in range(4)))
+        checks = await asyncio.gather(hasher.verify("secret0", hashes[0]), hasher.verify("wrong", hashes[0]))
+        task.cancel()
+        return ticks, checks
+
+    ticks, checks = asyncio.run(run())
+
+    assert checks == [True, False]
+    assert ticks > 1
+    stats = hasher.stats.as_dict()
+    assert stats["calls"] == 6
+    assert stats["waiting"] == stats["running"] == 0
+    assert stats["queue_time_max"] > 0
+
+
+@patch('src.main.auth.crud.needs_rehash', new=MagicMock(return_value=False))
+@patch('src.main.auth.crud.verify_password_async', new_callable=AsyncMock)
+def test_authenticate_returns_user_only_for_matching_password(mock_verify):
+    from src.main.auth.crud import user as user_crud
+
+    with patch.object(user_crud, "get_user_by_email", AsyncMock(return_value=[USER])):
+        mock_verify.return_value = True
+        assert asyncio.run(user_crud.authenticate(MagicMock(), email=USER.email, password="pw")) is USER
+        mock_verify.return_value = False
+        assert asyncio.run(user_crud.authenticate(MagicMock(), email=USER.email, password="pw")) is None
+
+
+def test_calibration_stays_within_bounds():
+    rounds = jwt_security.calibrate_bcrypt_rounds(target_ms=0, min_rounds=4, max_rounds=6)
+    assert rounds == 4
+    assert jwt_security.calibrate_bcrypt_rounds(target_ms=10 ** 6, min_rounds=4, max_rounds=6) == 6
+
+
+def test_hash_uses_configured_cost():
+    hashed = jwt_security.get_password_hash("secret", rounds=5)
+
+    assert jwt_security.hash_rounds(hashed) == 5
+    assert jwt_security.verify_password("secret", hashed)
+    with patch.object(jwt_security, "_bcrypt_rounds", 5):
+        assert not jwt_security.needs_rehash(hashed, tolerance=0)
+    with patch.object(jwt_security, "_bcrypt_rounds", 6):
+        assert jwt_security.needs_rehash(hashed, tolerance=0)
+
+
+def test_rehash_only_upgrades_beyond_tolerance():
+    hashed = jwt_security.get_password_hash("secret", rounds=5)
+
+    with patch.object(jwt_security, "_bcrypt_rounds", 4):
+        assert not jwt_security.needs_rehash(hashed, tolerance=0)
+    with patch.object(jwt_security, "_bcrypt_rounds", 6):
+        assert not jwt_security.needs_rehash(hashed, tolerance=1)
+    with patch.object(jwt_security, "_bcrypt_rounds", 7):
+        assert jwt_security.needs_rehash(hashed, tolerance=1)
+
+
+@patch('src.main.auth.crud.verify_password_async', new=AsyncMock(return_value=True))
+@patch('src.main.auth.crud.needs_rehash', new=MagicMock(return_value=True))
+def test_authenticate_rehashes_in_background():
+    from src.main.auth.crud import user as user_crud
+
+    async def run():
+        with patch.object(user_crud, "get_user_by_email", AsyncMock(return_value=[USER])), \
+                patch.object(user_crud, "rehash_password", AsyncMock(return_value=True)) as mock_rehash:
+            authenticated = await user_crud.authenticate(MagicMock(), email=USER.email, password="pw")
+            await asyncio.gather(*user_crud._rehash_tasks)
+        return authenticated, mock_rehash
+
+    authenticated, mock_rehash = asyncio.run(run())
+
+    assert authenticated is USER
+    mock_rehash.assert_called_once_with(USER.id, USER.password, "pw")
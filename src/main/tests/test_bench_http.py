@@ -0,0 +1,47 @@
+import asyncio
+
+from src.main.benchmarks.bench_http import compare, percentile, summarize
+from src.main.benchmarks.http_app import install_local_broker
+from src.main.core.rabbitmq import OrderEventPublisher
+
+
+def test_summarize_reports_throughput_and_percentiles():
+    latencies = [n / 1000 for n in range(1, 101)]
+
+    result = summarize(latencies, errors=2, duration=10.0)
+
+    assert result["requests"] == 100
+    assert result["errors"] == 2
+    assert result["throughput"] == 10.0
+    assert (result["p50_ms"], result["p95_ms"], result["p99_ms"], result["max_ms"]) == (50.0, 95.0, 99.0, 100.0)
+    assert percentile([], 0.5) == 0.0
+
+
+def test_compare_flags_throughput_drops_and_p95_rises_beyond_tolerance():
+    baseline = {"scenarios": {
+        "login": {"throughput": 100.0, "p95_ms": 20.0},
+        "list_orders": {"throughput": 1000.0, "p95_ms": 5.0},
+    }}
+    report = {"scenarios": {
+        "login": {"throughput": 85.0, "p95_ms": 21.0},
+        "list_orders": {"throughput": 950.0, "p95_ms": 6.0},
+        "date_search": {"throughput": 10.0, "p95_ms": 50.0},
+    }}
+
+    regressions = compare(baseline, report, tolerance=0.10)
+
+    assert regressions == ["login: throughput 100.0 -> 85.0 req/s", "list_orders: p95 5.0 -> 6.0 ms"]
+
+
+def test_local_broker_confirms_without_rabbitmq():
+    async def run():
+        event_publisher = OrderEventPublisher("amqp://unused", pool_size=2)
+        install_local_broker(event_publisher, latency=0.0)
+        confirmed = await event_publisher.publish_batch([{"order": n} for n in range(5)])
+        return confirmed, event_publisher
+
+    confirmed, event_publisher = asyncio.run(run())
+
+    assert confirmed == [True] * 5
+    assert event_publisher.stats.confirmed == 5
+    assert sum(channel.default_exchange.published for channel in event_publisher.channels) == 5
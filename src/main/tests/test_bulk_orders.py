@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.main.database.base import Base
+from src.main.customer.model import Customer
+from src.main.orders import crud as order_crud, schema as order_schema
+from src.main.orders.model import Order
+from src.main.outbox.model import OutboxEvent
+
+
+def new_order(customer_id, item="Laptop"):
+    return order_schema.OrderCreate(
+        item=item, amount=100, time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        phone_number="254700000000", customer_id=customer_id,
+    )
+
+
+async def bulk_create(objs_in, chunk_size, user_id=1):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_local = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_local() as session:
+        session.add_all([
+            Customer(id=1, name="Jane", hashed_password="x"), Customer(id=3, name="Tom", hashed_password="x")
+        ])
+        await session.commit()
+
+    try:
+        results = await order_crud.order.create_orders_bulk(
+            async_db=session_local(), objs_in=objs_in, current_user=SimpleNamespace(id=user_id),
+            chunk_size=chunk_size
+        )
+        async with session_local() as session:
+            orders = (await session.execute(select(func.count()).select_from(Order))).scalar()
+            events = (await session.scalars(select(OutboxEvent).order_by(OutboxEvent.id))).all()
+    finally:
+        await engine.dispose()
+    return results, orders, events
+
+
+@patch.object(order_crud.summary_crud, "apply", new_callable=AsyncMock)
+@patch.object(order_crud.order, "invalidate_customers", new_callable=AsyncMock)
+def test_bulk_create_reports_each_item(mock_invalidate, mock_summary):
+    objs_in = [new_order(1, "a"), new_order(2, "b"), new_order(1, "c"), new_order(1, "d")]
+
+    results, orders, events = asyncio.run(bulk_create(objs_in, chunk_size=2))
+
+    assert [result.success for result in results] == [True, False, True, True]
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert results[1].error == "You do not have permission to create an order for customer 2"
+    assert [result.order.item for result in results if result.success] == ["a", "c", "d"]
+    assert orders == 3
+    assert [event.payload["order_id"] for event in events] == [r.order.id for r in results if r.success]
+    mock_invalidate.assert_called_once_with({1})
+    assert mock_summary.call_count == 2
+
+
+@patch.object(order_crud.order, "invalidate_customers", new_callable=AsyncMock)
+def test_bulk_create_hides_database_errors(mock_invalidate):
+    failure = OperationalError("INSERT ...", {}, Exception('relation "customer_summaries" is locked'))
+    objs_in = [new_order(1, "a"), new_order(1, "b"), new_order(1, "c")]
+
+    with patch.object(order_crud.summary_crud, "apply", AsyncMock(side_effect=[failure, None])):
+        results, orders, events = asyncio.run(bulk_create(objs_in, chunk_size=2))
+
+    assert [result.success for result in results] == [False, False, True]
+    assert {result.error for result in results[:2]} == {"could not insert order"}
+    assert orders == 1
+
+
+@patch.object(order_crud.summary_crud, "apply", new_callable=AsyncMock)
+@patch.object(order_crud.order, "invalidate_customers", new_callable=AsyncMock)
+def test_bulk_create_rejects_orders_of_other_customers(mock_invalidate, mock_summary):
+    objs_in = [new_order(1, "a"), new_order(3, "b"), new_order(1, "c")]
+
+    results, orders, events = asyncio.run(bulk_create(objs_in, chunk_size=10))
+
+    assert [result.success for result in results] == [True, False, True]
+    assert results[1].error == "You do not have permission to create an order for customer 3"
+    assert orders == 2
+    assert [event.payload["item"] for event in events] == ["a", "c"]
+
+
+@patch.object(order_crud.order, "invalidate_customers", new_callable=AsyncMock)
+def test_bulk_create_reports_missing_customer(mock_invalidate):
+    results, orders, events = asyncio.run(bulk_create([new_order(4)], chunk_size=10, user_id=4))
+
+    assert results[0].error == "Customer 4 not found"
+    assert orders == 0
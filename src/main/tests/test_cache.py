@@ -0,0 +1,262 @@
+import asyncio
+import time
+
+from src.main.core.cache import LRUCache, QueryCache, SingleFlight, TwoTierCache
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __getattr__(self, command):
+        return lambda *args, **kwargs: self.commands.append((command, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.client, command)(*args, **kwargs) for command, args, kwargs in self.commands]
+
+
+# In-memory stand-in for the subset of redis.asyncio.Redis used by the caches
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, nx=False, px=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value.encode("utf-8") if isinstance(value, str) else value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    async def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+    async def expire(self, key, seconds):
+        return key in self.store
+
+    # only the compare-and-delete of TwoTierCache locks
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token.encode("utf-8"):
+            del self.store[key]
+            return 1
+        return 0
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+def test_query_cache_key_is_canonical():
+    async def run():
+        cache = QueryCache("test-orders-canonical", client=FakeRedis())
+        first = await cache.build_key({"skip": 0, "limit": 10, "item": "Laptop"})
+        second = await cache.build_key({"item": "Laptop", "limit": 10, "skip": 0})
+        other = await cache.build_key({"item": "Laptop", "limit": 10, "skip": 10})
+        assert first == second
+        assert first != other
+
+    asyncio.run(run())
+
+
+def test_query_cache_hit_and_miss_counts():
+    async def run():
+        cache = QueryCache("test-orders-counts", client=FakeRedis())
+        key = await cache.build_key({"customer_id": 1}, scope=1)
+        assert await cache.get(key) is None
+        await cache.set(key, [{"id": 1}])
+        assert await cache.get(key) == [{"id": 1}]
+        assert cache.stats.as_dict()["hits"] == 1
+        assert cache.stats.as_dict()["misses"] == 1
+
+    asyncio.run(run())
+
+
+def test_query_cache_invalidation_is_scoped():
+    async def run():
+        cache = QueryCache("test-orders-scoped", client=FakeRedis())
+        customer_1 = await cache.build_key({"customer_id": 1}, scope=1)
+        customer_2 = await cache.build_key({"customer_id": 2}, scope=2)
+        unscoped = await cache.build_key({})
+
+        await cache.invalidate(1)
+
+        assert await cache.build_key({"customer_id": 1}, scope=1) != customer_1
+        assert await cache.build_key({"customer_id": 2}, scope=2) == customer_2
+        assert await cache.build_key({}) != unscoped
+        assert cache.stats.invalidations == 1
+
+    asyncio.run(run())
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("a") == 1
+    assert lru.get("b") is None
+    assert len(lru) == 2
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", load) for _ in range(10)))
+        assert results == ["value"] * 10
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_two_tier_cache_loads_once_and_serves_locally():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    async def run():
+        cache = TwoTierCache("test-customers-load", client=FakeRedis())
+        results = await asyncio.gather(*(cache.get("1", load) for _ in range(5)))
+        assert results == [{"id": 1}] * 5
+        assert await cache.get("1", load) == {"id": 1}
+        assert cache.stats.local_hits == 1
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_two_tier_cache_serves_stale_while_refreshing():
+    values = iter([{"name": "old"}, {"name": "new"}])
+
+    async def load():
+        return next(values)
+
+    async def run():
+        cache = TwoTierCache("test-customers-stale", ttl=60, client=FakeRedis())
+        assert await cache.get("1", load) == {"name": "old"}
+
+        # age the entry past its fresh window
+        value, _, local_until = cache.local.get("1")
+        cache.local.set("1", (value, time.time() - 1, local_until))
+
+        assert await cache.get("1", load) == {"name": "old"}
+        await asyncio.gather(*cache._refresh_tasks)
+        assert await cache.get("1", load) == {"name": "new"}
+        assert cache.stats.stale_served == 1
+        assert cache.stats.refreshes == 1
+
+    asyncio.run(run())
+
+
+def test_two_tier_cache_invalidation_drops_both_tiers():
+    values = iter([{"name": "old"}, {"name": "new"}])
+
+    async def load():
+        return next(values)
+
+    async def run():
+        client = FakeRedis()
+        cache = TwoTierCache("test-customers-invalidate", client=client)
+        await cache.get("1", load)
+        await cache.invalidate("1")
+        assert await cache.get("1", load) == {"name": "new"}
+
+        await cache.invalidate_all()
+        assert len(cache.local) == 0
+
+    asyncio.run(run())
+
+
+def test_single_flight_survives_cancelled_leader():
+    async def load():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def run():
+        flight = SingleFlight()
+        leader = asyncio.create_task(flight.do("key", load))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "value"
+
+
+def test_two_tier_cache_miss_during_refresh_loads_value():
+    async def run():
+        refresh_started = asyncio.Event()
+        release_refresh = asyncio.Event()
+        values = iter([{"name": "old"}])
+
+        async def first_load():
+            return next(values)
+
+        async def slow_refresh():
+            refresh_started.set()
+            await release_refresh.wait()
+            return {"name": "refreshed"}
+
+        async def load_after_invalidate():
+            return {"name": "new"}
+
+        cache = TwoTierCache("test-customers-refresh-miss", client=FakeRedis())
+        await cache.get("1", first_load)
+        value, _, local_until = cache.local.get("1")
+        cache.local.set("1", (value, time.time() - 1, local_until))
+        await cache.get("1", slow_refresh)
+        await refresh_started.wait()
+
+        await cache.invalidate("1")
+        after_invalidate = await asyncio.wait_for(cache.get("1", load_after_invalidate), timeout=2)
+        release_refresh.set()
+        await asyncio.gather(*cache._refresh_tasks)
+        # the refresh started before the invalidation, so its value is dropped
+        assert cache.local.get("1")[0] == {"name": "new"}
+        return after_invalidate
+
+    assert asyncio.run(run()) == {"name": "new"}
+
+
+def test_two_tier_cache_keeps_lock_of_other_worker():
+    async def load():
+        return {"id": 1}
+
+    async def run():
+        client = FakeRedis()
+        cache = TwoTierCache("test-customers-foreign-lock", client=client)
+        cache.lock_wait_attempts = 1
+        lock_key = f"{await cache._redis_key('1')}:lock"
+        client.store[lock_key] = b"other-worker"
+
+        # the wait runs out and the value is loaded anyway, but the lock stays with its owner
+        assert await cache.get("1", load) == {"id": 1}
+        assert client.store[lock_key] == b"other-worker"
+
+        await cache.get("2", load)
+        assert f"{await cache._redis_key('2')}:lock" not in client.store
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.main.customer.importer import ImportJobs, ImportReport, import_customers, iter_records
+from src.main.tests.test_cache import FakeRedis
+
+CSV_UPLOAD = (
+    b"name,email,code,country,phone_number,gender,hashed_password\r\n"
+    b'"Doe, Jane",jane@example.com,C1,KE,254700000001,F,secret1\r\n'
+    b'"John\nSmith",john@example.com,C2,KE,254700000002,M,secret2\r\n'
+    b"Bad,bad@example.com,C3,KE\r\n"
+    b"No Password,np@example.com,C4,KE,254700000004,F,\r\n"
+)
+
+
+async def stream(data, chunk_size=7):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+async def collect(chunks, fmt):
+    return [record async for record in iter_records(chunks, fmt)]
+
+
+def test_iter_records_parses_csv_across_chunks():
+    records = asyncio.run(collect(stream(CSV_UPLOAD), "csv"))
+
+    assert records[0] == (2, {
+        "name": "Doe, Jane", "email": "jane@example.com", "code": "C1", "country": "KE",
+        "phone_number": "254700000001", "gender": "F", "hashed_password": "secret1",
+    })
+    assert records[1][0] == 3
+    assert records[1][1]["name"] == "John\nSmith"
+    assert records[2] == (5, "expected 7 fields, got 4")
+
+
+def test_iter_records_reports_bad_ndjson_lines():
+    data = b'{"name": "Jane"}\n\nnot json\n{"name": "John"}'
+
+    records = asyncio.run(collect(stream(data), "ndjson"))
+
+    assert records[0] == (1, {"name": "Jane"})
+    assert records[1][0] == 3 and records[1][1].startswith("invalid JSON")
+    assert records[2] == (4, {"name": "John"})
+
+
+@patch('src.main.customer.importer.customer_crud')
+@patch('src.main.customer.importer.async_session_local')
+@patch('src.main.customer.importer._merge_batch', new_callable=AsyncMock)
+@patch('src.main.customer.importer.hash_passwords', new=lambda passwords, rounds: [f"hashed:{p}" for p in passwords])
+def test_import_counts_imported_duplicates_and_rejects(mock_merge, mock_session_local, mock_crud):
+    mock_session_local.return_value.__aenter__ = AsyncMock()
+    mock_session_local.return_value.__aexit__ = AsyncMock(return_value=False)
+    mock_crud.list_cache.invalidate_all = AsyncMock()
+    # the second customer already exists
+    mock_merge.return_value = 1
+    progress = MagicMock()
+
+    with ThreadPoolExecutor(2) as pool, patch('src.main.customer.importer.get_hash_pool', return_value=pool):
+        report = asyncio.run(import_customers(stream(CSV_UPLOAD), "csv", on_progress=progress))
+
+    assert (report.processed, report.imported, report.duplicates, report.rejected) == (4, 1, 1, 2)
+    assert report.errors[0] == "line 5: expected 7 fields, got 4"
+    records = mock_merge.call_args.args[1]
+    assert [record[-1] for record in records] == ["hashed:secret1", "hashed:secret2"]
+    progress.assert_called_once_with(report)
+    mock_crud.list_cache.invalidate_all.assert_called_once()
+
+
+def test_import_job_runs_in_background_and_reports_status():
+    uploads = []
+
+    async def fake_import(chunks, fmt, on_progress=None):
+        uploads.append(b"".join([chunk async for chunk in chunks]))
+        report = ImportReport(processed=2, imported=2)
+        await on_progress(report)
+        return report
+
+    async def run():
+        jobs = ImportJobs(client=FakeRedis())
+        with patch('src.main.customer.importer.import_customers', new=fake_import), \
+                patch('src.main.customer.importer.os.unlink', wraps=os.unlink) as unlink:
+            job = await jobs.start(stream(CSV_UPLOAD), "csv")
+            started = await jobs.get(job.id)
+            await asyncio.gather(*jobs._tasks)
+        return started, await jobs.get(job.id), unlink.call_args.args[0]
+
+    started, finished, spool_path = asyncio.run(run())
+
+    assert started.status == "running"
+    assert (finished.status, finished.report.imported) == ("done", 2)
+    assert uploads == [CSV_UPLOAD]
+    assert not os.path.exists(spool_path)
@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from sqlalchemy.dialects import postgresql
+
+from src.main.customer.summary import customer_summary
+
+
+def order(customer_id=1, amount=100, day=1):
+    return SimpleNamespace(customer_id=customer_id, amount=amount, time=datetime(2024, 1, day, tzinfo=timezone.utc))
+
+
+def compiled(call):
+    statement = call.args[0]
+    return str(statement.compile(dialect=postgresql.dialect())), statement.compile(dialect=postgresql.dialect()).params
+
+
+def test_new_orders_upsert_count_amount_and_latest_time():
+    session = SimpleNamespace(execute=AsyncMock(), flush=AsyncMock())
+
+    asyncio.run(customer_summary.apply(session, [(order(day=3), 1), (order(amount=50, day=2), 1)]))
+
+    session.execute.assert_called_once()
+    sql, params = compiled(session.execute.call_args)
+    assert "ON CONFLICT (customer_id) DO UPDATE" in sql
+    assert "greatest(customer_order_summaries.last_order_at, excluded.last_order_at)" in sql
+    assert params["order_count_m0"] == 2
+    assert params["total_amount_m0"] == 150
+    assert params["last_order_at_m0"] == datetime(2024, 1, 3, tzinfo=timezone.utc)
+
+
+def test_removed_orders_recompute_last_order_time():
+    session = SimpleNamespace(execute=AsyncMock(), flush=AsyncMock())
+
+    asyncio.run(customer_summary.apply(session, [(order(day=3), -1)]))
+
+    assert session.execute.call_count == 2
+    session.flush.assert_called_once()
+    sql, _ = compiled(session.execute.call_args_list[1])
+    assert "SET last_order_at=(SELECT max(orders.time)" in sql
+    assert "WHERE orders.customer_id = customer_order_summaries.customer_id" in sql
@@ -0,0 +1,60 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from src.main.main import app
+from src.main.orders.export import encode_rows, gzip_stream
+
+ROWS = [
+    {"id": i, "item": "Laptop", "amount": 100 * i, "time": datetime(2024, 1, i, tzinfo=timezone.utc),
+     "phone_number": "254700000000", "customer_id": 1}
+    for i in range(1, 4)
+]
+
+
+async def rows():
+    for row in ROWS:
+        yield row
+
+
+async def read(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_encode_rows_ndjson():
+    lines = asyncio.run(read(encode_rows(rows(), "ndjson"))).decode().splitlines()
+
+    assert len(lines) == 3
+    assert json.loads(lines[0])["time"] == "2024-01-01T00:00:00+00:00"
+
+
+def test_encode_rows_csv_gzipped():
+    data = gzip.decompress(asyncio.run(read(gzip_stream(encode_rows(rows(), "csv")))))
+
+    lines = data.decode().splitlines()
+    assert lines[0] == "id,item,amount,time,phone_number,customer_id"
+    assert lines[3] == "3,Laptop,300,2024-01-03T00:00:00+00:00,254700000000,1"
+
+
+@patch('src.main.orders.routes.replica_router')
+@patch('src.main.orders.routes.order_crud')
+def test_export_route_streams_rows(mock_crud, mock_router):
+    mock_session_local = MagicMock()
+    mock_router.sessionmaker_for = AsyncMock(return_value=mock_session_local)
+    mock_session_local.return_value.__aenter__ = AsyncMock()
+    mock_session_local.return_value.__aexit__ = AsyncMock(return_value=False)
+    mock_crud.order.stream_orders_by_date_range = MagicMock(side_effect=lambda **kwargs: rows())
+
+    response = TestClient(app).get(
+        "/orders/export",
+        params={"start_date": "2024-01-01T00:00:00Z", "end_date": "2024-02-01T00:00:00Z", "format": "csv"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 4
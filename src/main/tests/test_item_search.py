@@ -0,0 +1,24 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from src.main.orders.crud import order as order_crud
+from src.main.orders.model import Order
+
+
+def test_item_pattern_escapes_wildcards():
+    assert order_crud.item_pattern("50%_off/") == "%50/%/_off//%"
+    assert order_crud.item_pattern("lap", prefix=True) == "lap%"
+
+
+def test_item_filter_compiles_to_trigram_indexable_ilike():
+    query = select(Order).where(Order.item.ilike(order_crud.item_pattern("board"), escape="/"))
+
+    sql = str(query.compile(dialect=postgresql.dialect()))
+
+    assert "orders.item ILIKE %(item_1)s ESCAPE '/'" in sql
+
+
+def test_trigram_index_is_declared():
+    index = next(index for index in Order.__table__.indexes if index.name == "ix_orders_item_trgm")
+    assert index.dialect_options["postgresql"]["using"] == "gin"
+    assert index.dialect_options["postgresql"]["ops"] == {"item": "gin_trgm_ops"}
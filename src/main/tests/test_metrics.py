@@ -0,0 +1,86 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.main.core.metrics import (
+    MetricsMiddleware, Registry, current_request, http_request_db_queries, http_requests,
+    instrument_engine, observe_redis, stats_families,
+)
+from src.main.main import app
+
+
+def test_histogram_exposes_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/orders")
+
+    lines = registry.expose().splitlines()
+
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/orders",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/orders",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/orders",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/orders"} 3.65' in lines
+    assert 'latency_seconds_count{route="/orders"} 4' in lines
+
+
+def test_stats_families_from_snapshots():
+    registry = Registry()
+    registry.register_collector(lambda: stats_families(
+        "cache", "cache lookups", [({"cache": 'a"b'}, {"hits": 3, "hit_ratio": 0.75, "lag": None})],
+        counters=("hits",),
+    ))
+
+    lines = registry.expose().splitlines()
+
+    assert "# TYPE cache_hits_total counter" in lines
+    assert 'cache_hits_total{cache="a\\"b"} 3' in lines
+    assert 'cache_hit_ratio{cache="a\\"b"} 0.75' in lines
+    assert not any(line.startswith("cache_lag") for line in lines)
+
+
+def test_middleware_attributes_queries_and_redis_time_to_route():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine.sync_engine, "test")
+    service = FastAPI()
+    service.add_middleware(MetricsMiddleware)
+    seen = {}
+
+    @service.get("/widgets/{widget_id}")
+    async def get_widget(widget_id: int):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+        observe_redis("GET", 0.002)
+        seen["timings"] = current_request.get()
+        return {"id": widget_id}
+
+    route = "/widgets/{widget_id}"
+    before = http_request_db_queries.count(route)
+    try:
+        client = TestClient(service)
+        assert client.get("/widgets/1").status_code == 200
+        assert client.get("/widgets/2").status_code == 200
+        assert client.get("/nowhere").status_code == 404
+    finally:
+        asyncio.run(engine.dispose())
+
+    assert seen["timings"].db_queries == 2
+    assert seen["timings"].redis_calls == 1
+    assert http_requests.value("GET", route, 200) >= 2
+    assert http_requests.value("GET", "unmatched", 404) >= 1
+    assert http_request_db_queries.count(route) == before + 2
+    assert current_request.get() is None
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert "# TYPE password_hashing_calls_total counter" in response.text
@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.main.outbox.relay import OutboxRelay
+
+
+def mock_session_factory():
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    session.begin.return_value.__aenter__ = AsyncMock()
+    session.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(return_value=session)
+
+
+def pending_events(count):
+    return [SimpleNamespace(id=i, payload={"order_id": i}, attempts=0, last_error=None) for i in range(1, count + 1)]
+
+
+@patch('src.main.outbox.relay.outbox_crud')
+@patch('src.main.outbox.relay.async_session_local', new_callable=mock_session_factory)
+def test_relay_publishes_and_marks_batch_sent(mock_session_local, mock_outbox_crud):
+    events = pending_events(3)
+    mock_outbox_crud.claim_batch = AsyncMock(return_value=events)
+    mock_outbox_crud.mark_sent = AsyncMock()
+    publisher = MagicMock()
+    publisher.publish_batch = AsyncMock(return_value=[True, True, True])
+
+    sent = asyncio.run(OutboxRelay(publisher, batch_size=10).drain_once())
+
+    assert sent == 3
+    publisher.publish_batch.assert_called_once_with([e.payload for e in events])
+    mock_outbox_crud.mark_sent.assert_called_once()
+    assert mock_outbox_crud.mark_sent.call_args.args[1] == [1, 2, 3]
+
+
+@patch('src.main.outbox.relay.outbox_crud')
+@patch('src.main.outbox.relay.async_session_local', new_callable=mock_session_factory)
+def test_relay_leaves_unconfirmed_events_unsent(mock_session_local, mock_outbox_crud):
+    events = pending_events(3)
+    mock_outbox_crud.claim_batch = AsyncMock(return_value=events)
+    mock_outbox_crud.mark_sent = AsyncMock()
+    publisher = MagicMock()
+    publisher.publish_batch = AsyncMock(return_value=[True, False, True])
+
+    sent = asyncio.run(OutboxRelay(publisher, batch_size=10).drain_once())
+
+    assert sent == 2
+    assert mock_outbox_crud.mark_sent.call_args.args[1] == [1, 3]
+    assert events[1].attempts == 1
+    assert events[1].last_error
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from src.main.core.pagination import decode_cursor, encode_cursor, keyset_query, next_cursor
+from src.main.orders.model import Order
+
+
+def compiled(query):
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"s": "time", "o": "asc", "v": datetime(2024, 1, 2, tzinfo=timezone.utc), "id": 7})
+
+    position = decode_cursor(cursor, "time", "asc")
+
+    assert position["id"] == 7
+    assert position["v"] == "2024-01-02T00:00:00+00:00"
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor", "time", "asc")
+    assert exc.value.status_code == 400
+
+
+def test_cursor_for_other_sort_is_rejected():
+    cursor = encode_cursor({"s": "time", "o": "asc", "v": None, "id": 1})
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "amount", "asc")
+    assert exc.value.status_code == 400
+
+
+def test_keyset_query_seeks_past_cursor():
+    cursor = encode_cursor({"s": "time", "o": "desc", "v": "2024-01-02T00:00:00+00:00", "id": 7})
+
+    sql = compiled(keyset_query(select(Order), Order, "time", "desc", cursor))
+
+    assert "(orders.time, orders.id) < (" in sql
+    assert "ORDER BY orders.time DESC, orders.id DESC" in sql
+    assert "OFFSET" not in sql
+
+
+@pytest.mark.parametrize("sort_by, value", [("time", "yesterday"), ("time", 12), ("amount", "lots"), ("amount", [1])])
+def test_keyset_query_rejects_cursor_value_of_wrong_type(sort_by, value):
+    cursor = encode_cursor({"s": sort_by, "o": "asc", "v": value, "id": 7})
+
+    with pytest.raises(HTTPException) as exc:
+        keyset_query(select(Order), Order, sort_by, "asc", cursor)
+    assert exc.value.status_code == 400
+
+
+def test_keyset_query_rejects_unknown_column():
+    with pytest.raises(HTTPException) as exc:
+        keyset_query(select(Order), Order, "customer", "asc")
+    assert exc.value.status_code == 400
+
+
+def test_next_cursor_only_for_full_pages():
+    rows = [SimpleNamespace(id=i, amount=i * 10) for i in range(1, 4)]
+
+    assert next_cursor(rows, "amount", "asc", limit=5) is None
+    position = decode_cursor(next_cursor(rows, "amount", "asc", limit=3), "amount", "asc")
+    assert position == {"s": "amount", "o": "asc", "v": 30, "id": 3}
+    assert decode_cursor(next_cursor([{"id": 2, "amount": 5}], "amount", "asc", limit=1), "amount", "asc")["id"] == 2
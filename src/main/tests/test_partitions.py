@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from src.main.orders.partitions import add_months, create_partition, missing_months, partition_name, _UPPER_BOUND
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_add_months_crosses_years():
+    assert add_months(utc(2024, 11, 1), 3) == utc(2025, 2, 1)
+    assert partition_name(utc(2025, 2, 1)) == "orders_y2025m02"
+
+
+def test_missing_months_start_after_covered_range():
+    months = missing_months(utc(2024, 3, 15), months_ahead=3, covered_until=utc(2024, 5, 1))
+
+    assert months == [utc(2024, 5, 1), utc(2024, 6, 1)]
+
+
+def test_missing_months_without_partitions_start_this_month():
+    months = missing_months(utc(2024, 12, 31, 23), months_ahead=1, covered_until=None)
+
+    assert months == [utc(2024, 12, 1), utc(2025, 1, 1)]
+
+
+def test_upper_bound_is_read_from_partition_expression():
+    expression = "FOR VALUES FROM (MINVALUE) TO ('2024-05-01 03:00:00+03')"
+
+    bound = datetime.fromisoformat(_UPPER_BOUND.search(expression).group(1))
+
+    assert bound == utc(2024, 5, 1)
+
+
+class RecordingConnection:
+    """Records the SQL run on it; EXISTS checks on the default partition answer `default_has_rows`."""
+
+    def __init__(self, default_has_rows):
+        self.default_has_rows = default_has_rows
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        result = MagicMock(rowcount=2)
+        result.scalar.return_value = self.default_has_rows if "EXISTS" in sql else "orders_default"
+        return result
+
+
+def test_create_partition_without_default_rows_creates_it_in_place():
+    conn = RecordingConnection(default_has_rows=False)
+
+    name = asyncio.run(create_partition(conn, utc(2024, 5, 1)))
+
+    assert name == "orders_y2024m05"
+    assert conn.statements[-1].startswith("CREATE TABLE IF NOT EXISTS orders_y2024m05 PARTITION OF orders")
+
+
+def test_create_partition_moves_default_rows_before_attaching():
+    conn = RecordingConnection(default_has_rows=True)
+
+    asyncio.run(create_partition(conn, utc(2024, 5, 1)))
+
+    create, move, check, attach, drop = conn.statements[-5:]
+    assert create.startswith("CREATE TABLE orders_y2024m05 (LIKE orders")
+    assert "DELETE FROM orders_default" in move and "INSERT INTO orders_y2024m05" in move
+    assert "CHECK" in check
+    assert attach.startswith("ALTER TABLE orders ATTACH PARTITION orders_y2024m05 FOR VALUES")
+    assert "DROP CONSTRAINT" in drop
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.main.database.pool import InstrumentedQueuePool, instrument_pool, pool_status
+from src.main.database.session import build_engine
+
+
+def make_engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    instrument_pool(engine)
+    return engine
+
+
+def test_pool_status_counts_checkouts_and_timeouts():
+    async def run():
+        engine = make_engine()
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                held = pool_status(engine)
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+            return held, pool_status(engine)
+        finally:
+            await engine.dispose()
+
+    held, released = asyncio.run(run())
+
+    assert held["checked_out"] == 1
+    assert held["overflow"] == 0
+    assert released["checked_out"] == 0
+    assert released["checkouts"] == 1
+    assert released["timeouts"] == 1
+    assert released["connects"] == 1
+    assert released["waiting"] == 0
+
+
+def test_stats_survive_pool_recreate():
+    async def run():
+        engine = make_engine()
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            stats = engine.pool.stats
+            return stats, engine.pool.recreate().stats
+        finally:
+            await engine.dispose()
+
+    stats, recreated = asyncio.run(run())
+
+    assert recreated is stats
+    assert stats.checkouts == 1
+
+
+def test_build_engine_works_without_asyncpg():
+    async def run():
+        # the asyncpg statement cache arguments would be rejected by aiosqlite
+        engine = build_engine("sqlite+aiosqlite://", "test")
+        try:
+            async with engine.connect() as conn:
+                return (await conn.execute(text("SELECT 1"))).scalar()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == 1
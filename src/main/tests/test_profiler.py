@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.main.core.profiler import (
+    QUERY_COUNT_HEADER, QueryProfilerMiddleware, assert_max_queries, install_profiler, profile_queries,
+)
+from src.main.customer.model import Customer
+from src.main.database.base import Base
+from src.main.orders.model import Order
+
+
+def seeded_engine():
+    # one shared connection, so routes run in the threadpool see the same in-memory database
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    install_profiler(engine)
+    with Session(engine) as session:
+        for customer_id in range(1, 7):
+            session.add(Customer(id=customer_id, name=f"Customer {customer_id}", hashed_password="x"))
+            session.add(Order(
+                id=customer_id, item="Laptop", amount=100, time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                phone_number=f"25470000000{customer_id}", customer_id=customer_id,
+            ))
+        session.commit()
+    return engine
+
+
+def test_lazy_loads_are_tagged_and_flagged_as_n_plus_one():
+    engine = seeded_engine()
+    with Session(engine) as session, profile_queries("orders") as profile:
+        orders = session.scalars(select(Order)).all()
+        names = [order.customer.name for order in orders]
+
+    assert len(names) == 6
+    assert profile.count == 7
+    assert [query.lazy_load for query in profile.lazy_loads()] == ["Order.customer"] * 6
+    assert profile.n_plus_one() == [(profile.lazy_loads()[0].statement, 6)]
+    assert profile.queries[0].call_site.startswith("tests/test_profiler.py:")
+    assert "possible N+1, run 6x" in profile.report()
+
+
+def test_identical_statements_are_reported_as_repeated():
+    engine = seeded_engine()
+    with Session(engine) as session, profile_queries() as profile:
+        session.execute(select(Order).where(Order.id == 1)).all()
+        session.execute(select(Order).where(Order.id == 1)).all()
+        session.execute(select(Order).where(Order.id == 2)).all()
+
+    assert len(profile.repeated()) == 1
+    assert profile.repeated()[0][1] == 2
+    assert profile.flagged
+
+
+def test_call_site_of_async_session_is_the_awaiting_code():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        install_profiler(engine.sync_engine)
+        try:
+            with profile_queries() as profile:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            return profile
+        finally:
+            await engine.dispose()
+
+    profile = asyncio.run(run())
+
+    assert profile.count == 1
+    assert profile.queries[0].call_site.startswith("tests/test_profiler.py:")
+    assert profile.queries[0].call_site.endswith("in run")
+
+
+def test_assert_max_queries_per_endpoint():
+    engine = seeded_engine()
+    service = FastAPI()
+    service.add_middleware(QueryProfilerMiddleware)
+
+    @service.get("/customers/{customer_id}/orders")
+    def customer_orders(customer_id: int):
+        with Session(engine) as session:
+            customer = session.get(Customer, customer_id)
+            return [order.item for order in customer.orders]
+
+    client = TestClient(service)
+    with assert_max_queries(2) as profiles:
+        response = client.get("/customers/1/orders")
+
+    assert response.json() == ["Laptop"]
+    assert response.headers[QUERY_COUNT_HEADER] == "2"
+    assert profiles[0].lazy_loads()[0].lazy_load == "Customer.orders"
+    with pytest.raises(AssertionError, match="expected at most 1 queries"):
+        with assert_max_queries(1):
+            client.get("/customers/1/orders")
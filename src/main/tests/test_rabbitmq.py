@@ -1,20 +1,126 @@
-from unittest.mock import patch
-from src.main.core.rabbitmq import publish_order_created_message
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+from aio_pika.exceptions import DeliveryError
 
-@patch('main.core.rabbitmq.pika.BlockingConnection')
-def test_publish_order_to_rabbitmq(mock_blocking_connection):
+from src.main.core.rabbitmq import OrderEventPublisher, PublishBackpressureError
+
+
+def mock_connection():
+    channel = MagicMock()
+    channel.declare_queue = AsyncMock()
+    channel.close = AsyncMock()
+    channel.default_exchange.publish = AsyncMock()
+    connection = MagicMock()
+    connection.channel = AsyncMock(return_value=channel)
+    connection.close = AsyncMock()
+    return connection, channel
+
+
+@patch('src.main.core.rabbitmq.aio_pika.connect_robust', new_callable=AsyncMock)
+def test_publish_order_to_rabbitmq(mock_connect_robust):
+    connection, channel = mock_connection()
+    mock_connect_robust.return_value = connection
     order_data = {
         "order_id": 10,
         "item": "Laptop",
         "amount": 35000
     }
 
-    # RabbitMQ publisher function
-    publish_order_created_message(order_data)
+    async def run():
+        publisher = OrderEventPublisher("amqp://localhost")
+        await publisher.start()
+        await publisher.publish(order_data)
+        await publisher.publish(order_data)
+        await publisher.stop()
+
+    asyncio.run(run())
+
+    # one connection and one queue declaration serve every publish
+    mock_connect_robust.assert_called_once()
+    assert connection.channel.call_args.kwargs == {"publisher_confirms": True}
+    channel.declare_queue.assert_called_once_with('order_notifications_queue', durable=True)
+    assert channel.default_exchange.publish.call_count == 2
+    message = channel.default_exchange.publish.call_args.args[0]
+    assert json.loads(message.body) == order_data
+    assert channel.default_exchange.publish.call_args.kwargs == {"routing_key": "order_notifications_queue"}
+    connection.close.assert_called_once()
+
+
+@patch('src.main.core.rabbitmq.aio_pika.connect_robust', new_callable=AsyncMock)
+def test_publisher_connects_lazily(mock_connect_robust):
+    connection, channel = mock_connection()
+    mock_connect_robust.return_value = connection
+
+    async def run():
+        publisher = OrderEventPublisher("amqp://localhost")
+        await publisher.publish({"order_id": 1})
+
+    asyncio.run(run())
+
+    mock_connect_robust.assert_called_once()
+    channel.default_exchange.publish.assert_called_once()
+
+
+@patch('src.main.core.rabbitmq.aio_pika.connect_robust', new_callable=AsyncMock)
+def test_publish_batch_reports_nacks(mock_connect_robust):
+    connection, channel = mock_connection()
+    channel.default_exchange.publish.side_effect = [None, DeliveryError(None, None), None]
+    mock_connect_robust.return_value = connection
+
+    async def run():
+        publisher = OrderEventPublisher("amqp://localhost")
+        return publisher, await publisher.publish_batch([{"order_id": i} for i in range(3)])
+
+    publisher, confirmed = asyncio.run(run())
+
+    assert confirmed == [True, False, True]
+    assert publisher.stats.confirmed == 2
+    assert publisher.stats.nacked == 1
+    assert publisher.stats.in_flight == 0
+
+
+@patch('src.main.core.rabbitmq.aio_pika.connect_robust', new_callable=AsyncMock)
+def test_publisher_pushes_back_when_window_is_full(mock_connect_robust):
+    connection, channel = mock_connection()
+    mock_connect_robust.return_value = connection
+
+    async def never_confirmed(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    channel.default_exchange.publish.side_effect = never_confirmed
+
+    async def run():
+        publisher = OrderEventPublisher("amqp://localhost", max_in_flight=2, backpressure_timeout=0.01)
+        pending = [await publisher.publish_nowait({"order_id": i}) for i in range(2)]
+        assert publisher.stats.in_flight == 2
+        with pytest.raises(PublishBackpressureError):
+            await publisher.publish_nowait({"order_id": 3})
+        for future in pending:
+            future.cancel()
+        return publisher
+
+    publisher = asyncio.run(run())
+    assert publisher.stats.rejected == 1
+
+
+@patch('src.main.core.rabbitmq.aio_pika.connect_robust', new_callable=AsyncMock)
+def test_cancelled_publish_returns_its_window_slot(mock_connect_robust):
+    connection, channel = mock_connection()
+    mock_connect_robust.return_value = connection
+
+    async def run():
+        publisher = OrderEventPublisher("amqp://localhost", max_in_flight=1, backpressure_timeout=0.01)
+        # cancelled before the send task ever runs, e.g. at shutdown
+        (await publisher.publish_nowait({"order_id": 1})).cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert publisher.stats.in_flight == 0
+        await publisher.publish({"order_id": 2})
+        return publisher
 
-    # RabbitMQ connection and channel
-    mock_blocking_connection.assert_called_once()
-    channel = mock_blocking_connection.return_value.channel.return_value
-    channel.queue_declare.assert_called_once_with(queue='order_notifications_queue', durable=True)
-    channel.basic_publish.assert_called_once()
+    publisher = asyncio.run(run())
+    assert publisher.stats.in_flight == 0
+    assert publisher.stats.rejected == 0
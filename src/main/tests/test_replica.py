@@ -0,0 +1,149 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.main.database.replica import PRIMARY_COOKIE, ReplicaRouter
+from src.main.orders import crud as order_crud
+
+
+class SqliteReplicaRouter(ReplicaRouter):
+    """Router whose lag is set by the test; sqlite has no replication to measure."""
+
+    replica_lag = 0.0
+
+    async def measure_lag(self) -> float:
+        if self.replica_lag == "hang":
+            await asyncio.sleep(60)
+        if self.replica_lag is None:
+            raise ConnectionError("replica unreachable")
+        return self.replica_lag
+
+
+def make_request(cookie: str = None) -> Request:
+    headers = [(b"cookie", f"{PRIMARY_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/orders", "headers": headers})
+
+
+def run_with_databases(tmp_path, check):
+    # two local databases: the primary and its stand-in replica, told apart by a marker row
+    async def run():
+        engines = {
+            name: create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db") for name in ("primary", "replica")
+        }
+        try:
+            for name, engine in engines.items():
+                async with engine.begin() as conn:
+                    await conn.execute(text("CREATE TABLE marker (name TEXT)"))
+                    await conn.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+            router = SqliteReplicaRouter(
+                async_sessionmaker(engines["primary"]), async_sessionmaker(engines["replica"]),
+                max_lag=5.0, check_interval=3600, sticky_window=10.0, check_timeout=0.05
+            )
+            await router.refresh_lag()
+
+            async def served_by(request: Request) -> str:
+                async with await router.session_for(request) as session:
+                    return (await session.execute(text("SELECT name FROM marker"))).scalar()
+
+            return await check(router, served_by)
+        finally:
+            for engine in engines.values():
+                await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_reads_go_to_caught_up_replica(tmp_path):
+    async def check(router, served_by):
+        return await served_by(make_request()), router.stats.as_dict()
+
+    served, stats = run_with_databases(tmp_path, check)
+
+    assert served == "replica"
+    assert stats["replica_reads"] == 1
+    assert stats["lag"] == 0.0
+
+
+def test_lagging_or_unreachable_replica_falls_back_to_primary(tmp_path):
+    async def check(router, served_by):
+        router.replica_lag = 30.0
+        await router.refresh_lag()
+        lagging = await served_by(make_request())
+        router.replica_lag = None
+        await router.refresh_lag()
+        unreachable = await served_by(make_request())
+        router.replica_lag = 1.0
+        await router.refresh_lag()
+        recovered = await served_by(make_request())
+        return lagging, unreachable, recovered, router.stats.as_dict()
+
+    lagging, unreachable, recovered, stats = run_with_databases(tmp_path, check)
+
+    assert (lagging, unreachable, recovered) == ("primary", "primary", "replica")
+    assert stats["lagging_reads"] == 2
+
+
+def test_lag_probe_runs_in_background_and_times_out(tmp_path):
+    async def check(router, served_by):
+        router.replica_lag = "hang"
+        router.check_interval = 0.0
+        router.check_timeout = 1.0
+        started_at = time.monotonic()
+        # served on the last measured lag while the probe hangs
+        first = await served_by(make_request())
+        waited = time.monotonic() - started_at
+        await router._probe
+        after_timeout = await served_by(make_request())
+        return first, waited, after_timeout
+
+    first, waited, after_timeout = run_with_databases(tmp_path, check)
+
+    assert first == "replica"
+    assert waited < 0.5
+    assert after_timeout == "primary"
+
+
+def test_client_reads_its_writes_from_primary(tmp_path):
+    async def check(router, served_by):
+        response = Response()
+        router.mark_write(response)
+        cookie = response.headers["set-cookie"].split(";")[0].split("=", 1)[1]
+        after_write = await served_by(make_request(cookie))
+        expired = await served_by(make_request(f"{time.time() - 1:.3f}"))
+        garbage = await served_by(make_request("not-a-time"))
+        return after_write, expired, garbage, router.stats.as_dict()
+
+    after_write, expired, garbage, stats = run_with_databases(tmp_path, check)
+
+    assert after_write == "primary"
+    assert (expired, garbage) == ("replica", "replica")
+    assert stats["sticky_reads"] == 1
+
+
+def test_without_replica_reads_use_primary():
+    primary = object()
+    router = ReplicaRouter(primary, None)
+
+    assert asyncio.run(router.sessionmaker_for(make_request())) is primary
+    assert router.stats.primary_reads == 1
+
+
+def test_orders_read_from_replica_are_not_cached():
+    async def run(replica: bool):
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=MagicMock(scalars=lambda: MagicMock(all=lambda: [])))
+        with patch.object(order_crud.order, "cache") as cache, \
+                patch.object(order_crud, "is_replica_session", return_value=replica):
+            cache.build_key = AsyncMock(return_value="orders:key")
+            cache.get = AsyncMock(return_value=None)
+            cache.set = AsyncMock()
+            await order_crud.order.get_orders(async_db=db, customer_id=1)
+            return cache.set.await_count
+
+    assert asyncio.run(run(replica=True)) == 0
+    assert asyncio.run(run(replica=False)) == 1
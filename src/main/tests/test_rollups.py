@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from src.main.analytics.crud import bucket_starts, order_rollup
+
+ORDER_TIME = datetime(2024, 3, 5, 14, 37, tzinfo=timezone(timedelta(hours=3)))
+
+
+def order(**fields):
+    return SimpleNamespace(**{"time": ORDER_TIME, "customer_id": 7, "item": "Laptop", "amount": 500, **fields})
+
+
+def test_buckets_are_utc_hour_and_day():
+    starts = bucket_starts(ORDER_TIME)
+
+    assert starts["hour"] == datetime(2024, 3, 5, 11, tzinfo=timezone.utc)
+    assert starts["day"] == datetime(2024, 3, 5, tzinfo=timezone.utc)
+    assert len(order_rollup.buckets_of(order())) == 6
+    assert order_rollup.buckets_of(order(time=None)) == []
+
+
+def test_deltas_net_out_per_bucket():
+    rows = order_rollup.deltas([(order(), 1), (order(amount=300), 1), (order(item="Phone"), -1)])
+
+    totals = {(row["grain"], row["dimension"], row["key"]): (row["order_count"], row["revenue"]) for row in rows}
+    assert totals[("day", "total", "")] == (1, 300)
+    assert totals[("hour", "item", "Laptop")] == (2, 800)
+    assert totals[("day", "item", "Phone")] == (-1, -500)
+    assert totals[("day", "customer", "7")] == (1, 300)
+
+
+def test_apply_upserts_increments():
+    session = SimpleNamespace(execute=AsyncMock())
+
+    asyncio.run(order_rollup.apply(session, [(order(), 1)]))
+
+    sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (grain, dimension, key, bucket_start, shard) DO UPDATE" in sql
+    assert "order_count = (order_rollups.order_count + excluded.order_count)" in sql
+
+
+def test_apply_skips_changes_that_cancel_out():
+    session = SimpleNamespace(execute=AsyncMock())
+
+    asyncio.run(order_rollup.apply(session, [(order(), -1), (order(), 1)]))
+
+    session.execute.assert_not_called()
+
+
+def test_only_total_buckets_are_sharded():
+    rows = order_rollup.deltas([(order(), 1)], shard=3)
+
+    assert {(row["dimension"], row["shard"]) for row in rows} == {("total", 3), ("customer", 0), ("item", 0)}
+
+
+def test_stats_sum_the_shards():
+    result = MagicMock()
+    result.mappings.return_value.all.return_value = []
+    session = SimpleNamespace(execute=AsyncMock(return_value=result))
+
+    asyncio.run(order_rollup.get_stats(session, bucket="hour"))
+
+    sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "sum(order_rollups.order_count)" in sql
+    assert "GROUP BY order_rollups.bucket_start, order_rollups.key" in sql